@@ -5,8 +5,6 @@ from PyQt5.QtWidgets import (
 from PyQt5.QtCore import Qt, QThread, pyqtSignal, pyqtSlot
 from PyQt5.QtGui import QIcon
 import sys
-import traceback
-import time
 import pandas as pd
 from datetime import datetime
 import os
@@ -20,129 +18,71 @@ from gui import (
 )
 
 from trading_bot import CryptoTradingBot
+from trading_bot.live_runner import LiveRunner
+from trading_bot.job_process import BotJob
 
-class BotWorker(QThread):
-    """Clase para ejecutar el bot en un hilo separado"""
-    update_log = pyqtSignal(str)
-    trade_executed = pyqtSignal(dict)
-    price_update = pyqtSignal(float, dict)
+class ProcessWorker(QThread):
+    """
+    Ejecuta un método del bot en un proceso aparte
     
-    def __init__(self, bot, interval, simulation_mode):
+    El cálculo no comparte el GIL con la interfaz: este hilo solo espera
+    los mensajes del proceso y los reenvía como señales Qt. El valor que
+    devuelve el método se emite tal cual en `result_ready`.
+    """
+    update_progress = pyqtSignal(int, int)
+    log_message = pyqtSignal(str)
+    job_failed = pyqtSignal(str)
+    result_ready = pyqtSignal(object)
+    
+    def __init__(self, bot, method, kwargs):
         super().__init__()
-        self.bot = bot
-        self.interval = interval
-        self.simulation_mode = simulation_mode
-        self.running = False
+        self.job = BotJob(bot.get_settings(), method, kwargs)
+        self.cancelled = False
     
     def run(self):
-        """Ejecuta el bucle principal del bot"""
-        self.running = True
-        while self.running:
-            try:
-                # Obtener datos actualizados
-                df = self.bot.fetch_ohlcv_data(limit=100)
-                if df is None or df.empty:
-                    self.update_log.emit("No se pudieron obtener datos. Reintentando...")
-                    time.sleep(self.interval)
-                    continue
-                
-                # Añadir indicadores y obtener señal actual
-                df = self.bot.add_indicators(df)
-                current_price = df['close'].iloc[-1]
-                current_signal = df['signal'].iloc[-1]
-                
-                # Crear diccionario de indicadores para la interfaz
-                indicators = {
-                    'ma_fast': df['ma_fast'].iloc[-1],
-                    'ma_slow': df['ma_slow'].iloc[-1],
-                    'rsi': df['rsi'].iloc[-1], 
-                    'bb_upper': df['bb_upper'].iloc[-1],
-                    'bb_middle': df['bb_middle'].iloc[-1],
-                    'bb_lower': df['bb_lower'].iloc[-1],
-                    'signal': df['signal'].iloc[-1]
-                }
-                
-                # Emitir actualización de precio e indicadores
-                self.price_update.emit(current_price, indicators)
-                
-                # Ejecutar operación si hay señal (en modo simulación o real)
-                if self.bot.execute_trade(current_signal, current_price, df, is_backtest=self.simulation_mode):
-                    self.update_log.emit("Operación ejecutada exitosamente")
-                
-                # Esperar hasta el próximo intervalo
-                time.sleep(self.interval)
-                
-            except Exception as e:
-                error_msg = f"Error en el bucle principal: {str(e)}\n{traceback.format_exc()}"
-                self.update_log.emit(error_msg)
-                time.sleep(self.interval)
+        """Arranca el proceso y reenvía su progreso, sus mensajes y el resultado"""
+        if self.cancelled:
+            return
+        self.job.start()
+        for message in self.job.messages():
+            if self.cancelled:
+                break
+            kind = message[0]
+            if kind == 'progress':
+                self.update_progress.emit(message[1], message[2])
+            elif kind == 'log':
+                self.log_message.emit(message[1])
+            elif kind == 'result':
+                self.result_ready.emit(message[1])
+            else:
+                self.job_failed.emit(message[1])
     
-    def stop(self):
-        """Detiene el hilo"""
-        self.running = False
+    def cancel(self):
+        """Termina el proceso y espera al hilo"""
+        self.cancelled = True
+        self.job.cancel()
         self.wait()
 
-class BacktestWorker(QThread):
-    """Clase para ejecutar backtesting en un hilo separado"""
-    update_progress = pyqtSignal(int, int)
-    backtest_completed = pyqtSignal(dict, pd.DataFrame)
+class BacktestWorker(ProcessWorker):
+    """Clase para ejecutar backtesting en un proceso separado; emite (resultados, df)"""
     
     def __init__(self, bot, start_date, end_date, initial_capital):
-        super().__init__()
-        self.bot = bot
-        self.start_date = start_date
-        self.end_date = end_date
-        self.initial_capital = initial_capital
-    
-    def run(self):
-        """Ejecuta el backtesting"""
-        # Conectar señales temporalmente
-        self.bot.signal_backtest_progress.connect(self.update_progress)
-        
-        # Ejecutar backtest
-        results, df = self.bot.backtest(
-            start_date=self.start_date,
-            end_date=self.end_date,
-            initial_balance=self.initial_capital
-        )
-        
-        # Emitir resultados
-        self.backtest_completed.emit(results, df)
-        
-        # Desconectar señales
-        self.bot.signal_backtest_progress.disconnect(self.update_progress)
+        super().__init__(bot, 'backtest', {
+            'start_date': start_date,
+            'end_date': end_date,
+            'initial_balance': initial_capital
+        })
 
-class OptimizationWorker(QThread):
-    """Clase para ejecutar optimización en un hilo separado"""
-    update_progress = pyqtSignal(int, int)
-    optimization_completed = pyqtSignal(dict, pd.DataFrame)
-    
-    def __init__(self, bot, param_grid, start_date, end_date, initial_capital):
-        super().__init__()
-        self.bot = bot
-        self.param_grid = param_grid
-        self.start_date = start_date
-        self.end_date = end_date
-        self.initial_capital = initial_capital
+class OptimizationWorker(ProcessWorker):
+    """Clase para ejecutar optimización en un proceso separado; emite (mejores parámetros, resultados)"""
     
-    def run(self):
-        """Ejecuta la optimización"""
-        # Conectar señales temporalmente
-        self.bot.signal_optimization_progress.connect(self.update_progress)
-        
-        # Ejecutar optimización
-        best_params, results_df = self.bot.optimize_parameters(
-            param_grid=self.param_grid,
-            start_date=self.start_date,
-            end_date=self.end_date,
-            initial_balance=self.initial_capital
-        )
-        
-        # Emitir resultados
-        self.optimization_completed.emit(best_params, results_df)
-        
-        # Desconectar señales
-        self.bot.signal_optimization_progress.disconnect(self.update_progress)
+    def __init__(self, bot, param_grid, start_date, end_date, initial_capital, search_options=None):
+        super().__init__(bot, 'optimize_parameters', dict({
+            'param_grid': param_grid,
+            'start_date': start_date,
+            'end_date': end_date,
+            'initial_balance': initial_capital
+        }, **(search_options or {})))
 
 class CryptoBotGUI(QMainWindow):
     """Ventana principal de la aplicación"""
@@ -160,8 +100,10 @@ class CryptoBotGUI(QMainWindow):
         self.bot.signal_optimization_completed.connect(self.handle_optimization_completed)
         self.bot.signal_price_update.connect(self.handle_price_update)
         
+        # Bucle asíncrono compartido para los bots en vivo
+        self.live_runner = LiveRunner()
+        
         # Variables para los hilos de trabajo
-        self.bot_worker = None
         self.backtest_worker = None
         self.optimization_worker = None
         
@@ -241,6 +183,10 @@ class CryptoBotGUI(QMainWindow):
     def update_bot_config(self, config):
         """Actualiza la configuración del bot"""
         try:
+            # Detener el bot en vivo anterior antes de sustituirlo
+            self.live_runner.remove_bot(self.bot)
+            self.bot.balance.stop()
+            
             # Recrear bot con nueva configuración
             self.bot = CryptoTradingBot(**config)
             
@@ -260,16 +206,8 @@ class CryptoBotGUI(QMainWindow):
     @pyqtSlot(int, bool)
     def start_bot(self, interval, simulation_mode):
         """Inicia el bot de trading"""
-        # Si ya hay un hilo en ejecución, detenerlo
-        if self.bot_worker is not None and self.bot_worker.isRunning():
-            self.bot_worker.stop()
-        
-        # Crear y iniciar nuevo hilo
-        self.bot_worker = BotWorker(self.bot, interval, simulation_mode)
-        self.bot_worker.update_log.connect(self.update_log)
-        self.bot_worker.trade_executed.connect(self.handle_trade_executed)
-        self.bot_worker.price_update.connect(self.handle_price_update)
-        self.bot_worker.start()
+        # La señal se evalúa al cierre de cada vela; el intervalo solo refresca el precio
+        self.live_runner.add_bot(self.bot, simulation_mode, quote_interval=interval)
         
         mode_str = "simulación" if simulation_mode else "tiempo real"
         self.update_status(f"Bot iniciado en modo {mode_str}")
@@ -277,27 +215,35 @@ class CryptoBotGUI(QMainWindow):
     @pyqtSlot()
     def stop_bot(self):
         """Detiene el bot de trading"""
-        if self.bot_worker is not None and self.bot_worker.isRunning():
-            self.bot_worker.stop()
+        if self.live_runner.is_running(self.bot):
+            self.live_runner.remove_bot(self.bot)
             self.update_status("Bot detenido")
     
     @pyqtSlot(str, str, float)
     def run_backtest(self, start_date, end_date, initial_capital):
-        """Ejecuta el backtest en un hilo separado"""
-        # Si ya hay un hilo en ejecución, detenerlo
+        """Ejecuta el backtest en un proceso separado"""
+        # Si ya hay un backtest en ejecución, cancelarlo
         if self.backtest_worker is not None and self.backtest_worker.isRunning():
-            self.backtest_worker.wait()
+            self.backtest_worker.cancel()
         
-        # Crear y iniciar nuevo hilo
+        # Crear e iniciar nuevo proceso
         self.backtest_worker = BacktestWorker(
             self.bot, start_date, end_date, initial_capital
         )
         self.backtest_worker.update_progress.connect(self.backtest_tab.update_progress)
-        self.backtest_worker.backtest_completed.connect(self.handle_backtest_completed)
+        self.backtest_worker.log_message.connect(self.update_log)
+        self.backtest_worker.job_failed.connect(self.handle_job_failed)
+        self.backtest_worker.result_ready.connect(self.handle_backtest_result)
         self.backtest_worker.start()
         
         self.update_status(f"Ejecutando backtest desde {start_date} hasta {end_date}...")
     
+    @pyqtSlot(object)
+    def handle_backtest_result(self, result):
+        """Desempaqueta el resultado de `backtest` devuelto por el proceso"""
+        results, df = result
+        self.handle_backtest_completed(results or {}, df if df is not None else pd.DataFrame())
+    
     @pyqtSlot(dict, pd.DataFrame)
     def handle_backtest_completed(self, results, df):
         """Maneja la finalización del backtest"""
@@ -310,23 +256,32 @@ class CryptoBotGUI(QMainWindow):
         
         self.update_status(result_msg)
     
-    @pyqtSlot(dict, str, str, float)
-    def run_optimization(self, param_grid, start_date, end_date, initial_capital):
-        """Ejecuta la optimización en un hilo separado"""
-        # Si ya hay un hilo en ejecución, detenerlo
+    @pyqtSlot(dict, str, str, float, dict)
+    def run_optimization(self, param_grid, start_date, end_date, initial_capital, search_options):
+        """Ejecuta la optimización en un proceso separado"""
+        # Si ya hay una optimización en ejecución, cancelarla
         if self.optimization_worker is not None and self.optimization_worker.isRunning():
-            self.optimization_worker.wait()
+            self.optimization_worker.cancel()
         
-        # Crear y iniciar nuevo hilo
+        # Crear e iniciar nuevo proceso
         self.optimization_worker = OptimizationWorker(
-            self.bot, param_grid, start_date, end_date, initial_capital
+            self.bot, param_grid, start_date, end_date, initial_capital, search_options
         )
         self.optimization_worker.update_progress.connect(self.optimize_tab.update_progress)
-        self.optimization_worker.optimization_completed.connect(self.handle_optimization_completed)
+        self.optimization_worker.log_message.connect(self.update_log)
+        self.optimization_worker.job_failed.connect(self.handle_job_failed)
+        self.optimization_worker.result_ready.connect(self.handle_optimization_result)
         self.optimization_worker.start()
         
         self.update_status("Ejecutando optimización...")
     
+    @pyqtSlot(object)
+    def handle_optimization_result(self, result):
+        """Desempaqueta el resultado de `optimize_parameters` devuelto por el proceso"""
+        best_params, results_df = result
+        self.handle_optimization_completed(best_params or {},
+                                           results_df if results_df is not None else pd.DataFrame())
+    
     @pyqtSlot(dict, pd.DataFrame)
     def handle_optimization_completed(self, best_params, results_df):
         """Maneja la finalización de la optimización"""
@@ -340,6 +295,12 @@ class CryptoBotGUI(QMainWindow):
         
         self.update_status(result_msg)
     
+    @pyqtSlot(str)
+    def handle_job_failed(self, error):
+        """Maneja un backtest u optimización que terminó con error"""
+        self.update_log(f"ERROR: {error}")
+        self.update_status("La tarea terminó con error")
+    
     @pyqtSlot(dict)
     def apply_best_params(self, params):
         """Aplica los mejores parámetros encontrados"""
@@ -375,13 +336,13 @@ class CryptoBotGUI(QMainWindow):
     def closeEvent(self, event):
         """Maneja el cierre de la aplicación"""
         # Detener todos los hilos antes de cerrar
-        if self.bot_worker is not None and self.bot_worker.isRunning():
-            self.bot_worker.stop()
+        self.live_runner.shutdown()
+        self.bot.balance.stop()
         
         if self.backtest_worker is not None and self.backtest_worker.isRunning():
-            self.backtest_worker.wait()
+            self.backtest_worker.cancel()
         
         if self.optimization_worker is not None and self.optimization_worker.isRunning():
-            self.optimization_worker.wait()
+            self.optimization_worker.cancel()
         
         event.accept()
\ No newline at end of file
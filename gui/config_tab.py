@@ -111,6 +111,36 @@ class ConfigTab(QWidget):
         risk_group.setLayout(risk_layout)
         main_layout.addWidget(risk_group)
         
+        # Sección de Costes de los backtests
+        costs_group = QGroupBox("Costes de Backtest")
+        costs_layout = QFormLayout()
+        
+        # Comisiones, slippage y spread en % del precio
+        self.taker_fee_spin = self._percent_spin(5.0)
+        costs_layout.addRow("Comisión Taker (%):", self.taker_fee_spin)
+        
+        self.maker_fee_spin = self._percent_spin(5.0)
+        costs_layout.addRow("Comisión Maker (%):", self.maker_fee_spin)
+        
+        self.slippage_spin = self._percent_spin(5.0)
+        costs_layout.addRow("Slippage Fijo (%):", self.slippage_spin)
+        
+        self.spread_spin = self._percent_spin(5.0)
+        costs_layout.addRow("Spread Fijo (%):", self.spread_spin)
+        
+        # Slippage en proporción al rango de la vela
+        self.volatility_slippage_spin = QDoubleSpinBox()
+        self.volatility_slippage_spin.setRange(0, 1)
+        self.volatility_slippage_spin.setSingleStep(0.01)
+        self.volatility_slippage_spin.setDecimals(3)
+        costs_layout.addRow("Slippage por Rango de Vela:", self.volatility_slippage_spin)
+        
+        self.estimate_spread_checkbox = QCheckBox("Estimar spread con máximos y mínimos")
+        costs_layout.addRow("", self.estimate_spread_checkbox)
+        
+        costs_group.setLayout(costs_layout)
+        main_layout.addWidget(costs_group)
+        
         # Botones
         buttons_layout = QHBoxLayout()
         
@@ -129,6 +159,15 @@ class ConfigTab(QWidget):
         
         self.setLayout(main_layout)
     
+    @staticmethod
+    def _percent_spin(maximum):
+        """Campo de un coste en %"""
+        spin = QDoubleSpinBox()
+        spin.setRange(0, maximum)
+        spin.setSingleStep(0.01)
+        spin.setDecimals(3)
+        return spin
+    
     def apply_config(self):
         """Aplica la configuración actual y emite señal"""
         config = self.get_current_config()
@@ -148,6 +187,12 @@ class ConfigTab(QWidget):
         self.bb_period_spin.setValue(20)
         self.bb_std_spin.setValue(2.0)
         self.risk_per_trade_spin.setValue(0.02)
+        self.taker_fee_spin.setValue(0)
+        self.maker_fee_spin.setValue(0)
+        self.slippage_spin.setValue(0)
+        self.spread_spin.setValue(0)
+        self.volatility_slippage_spin.setValue(0)
+        self.estimate_spread_checkbox.setChecked(False)
         
         self.apply_config()
     
@@ -165,7 +210,15 @@ class ConfigTab(QWidget):
             'rsi_oversold': self.rsi_oversold_spin.value(),
             'bb_period': self.bb_period_spin.value(),
             'bb_std': self.bb_std_spin.value(),
-            'risk_per_trade': self.risk_per_trade_spin.value()
+            'risk_per_trade': self.risk_per_trade_spin.value(),
+            'costs': {
+                'taker_fee': self.taker_fee_spin.value() / 100,
+                'maker_fee': self.maker_fee_spin.value() / 100,
+                'slippage': self.slippage_spin.value() / 100,
+                'spread': self.spread_spin.value() / 100,
+                'volatility_slippage': self.volatility_slippage_spin.value(),
+                'estimate_spread': self.estimate_spread_checkbox.isChecked()
+            }
         }
     
     def update_from_settings(self, settings):
@@ -208,4 +261,13 @@ class ConfigTab(QWidget):
             self.bb_std_spin.setValue(settings['bb_std'])
         
         if 'risk_per_trade' in settings:
-            self.risk_per_trade_spin.setValue(settings['risk_per_trade'])
\ No newline at end of file
+            self.risk_per_trade_spin.setValue(settings['risk_per_trade'])
+        
+        if 'costs' in settings:
+            costs = settings['costs']
+            self.taker_fee_spin.setValue(costs.get('taker_fee', 0) * 100)
+            self.maker_fee_spin.setValue(costs.get('maker_fee', 0) * 100)
+            self.slippage_spin.setValue(costs.get('slippage', 0) * 100)
+            self.spread_spin.setValue(costs.get('spread', 0) * 100)
+            self.volatility_slippage_spin.setValue(costs.get('volatility_slippage', 0))
+            self.estimate_spread_checkbox.setChecked(costs.get('estimate_spread', False))
@@ -2,7 +2,7 @@ from PyQt5.QtWidgets import (
     QWidget, QVBoxLayout, QHBoxLayout, QFormLayout, 
     QLabel, QSpinBox, QDoubleSpinBox, QPushButton, QGroupBox, 
     QDateEdit, QProgressBar, QTableWidget, QTableWidgetItem,
-    QHeaderView, QCheckBox, QGridLayout, QSplitter
+    QHeaderView, QCheckBox, QGridLayout, QSplitter, QComboBox
 )
 from PyQt5.QtCore import pyqtSignal, Qt, QDate
 from PyQt5.QtGui import QColor
@@ -12,7 +12,7 @@ from datetime import datetime
 
 class OptimizeTab(QWidget):
     """Pestaña para optimizar parámetros del bot"""
-    run_optimization_signal = pyqtSignal(dict, str, str, float)
+    run_optimization_signal = pyqtSignal(dict, str, str, float, dict)
     apply_best_params_signal = pyqtSignal(dict)
     
     def __init__(self, parent=None):
@@ -50,6 +50,37 @@ class OptimizeTab(QWidget):
         date_form.addRow("Capital Inicial ($):", self.initial_capital_spin)
         
         date_layout.addLayout(date_form)
+        
+        # Método de búsqueda y presupuesto
+        search_form = QFormLayout()
+        self.method_combo = QComboBox()
+        self.method_combo.addItem("Grid completo", 'grid')
+        self.method_combo.addItem("Aleatoria", 'random')
+        self.method_combo.addItem("Successive halving", 'halving')
+        self.method_combo.addItem("Bayesiana (TPE)", 'tpe')
+        self.method_combo.currentIndexChanged.connect(self.update_budget_controls)
+        search_form.addRow("Método:", self.method_combo)
+        
+        self.max_evals_spin = QSpinBox()
+        self.max_evals_spin.setRange(1, 1000000)
+        self.max_evals_spin.setValue(500)
+        self.max_evals_spin.setSingleStep(100)
+        search_form.addRow("Evaluaciones máx.:", self.max_evals_spin)
+        
+        self.time_budget_spin = QSpinBox()
+        self.time_budget_spin.setRange(0, 86400)
+        self.time_budget_spin.setValue(0)
+        self.time_budget_spin.setSingleStep(60)
+        self.time_budget_spin.setSpecialValueText("Sin límite")
+        search_form.addRow("Tiempo máx. (s):", self.time_budget_spin)
+        
+        self.constraints_check = QCheckBox("Descartar combinaciones sin sentido")
+        self.constraints_check.setToolTip("No evaluar Fast MA >= Slow MA ni RSI Sobreventa >= RSI Sobrecompra")
+        self.constraints_check.setChecked(True)
+        search_form.addRow(self.constraints_check)
+        
+        date_layout.addLayout(search_form)
+        self.update_budget_controls()
         config_layout.addLayout(date_layout)
         
         # Grid de parámetros a optimizar
@@ -243,6 +274,12 @@ class OptimizeTab(QWidget):
         
         self.setLayout(main_layout)
     
+    def update_budget_controls(self):
+        """El presupuesto solo se aplica a los métodos distintos del grid completo"""
+        budgeted = self.method_combo.currentData() != 'grid'
+        self.max_evals_spin.setEnabled(budgeted)
+        self.time_budget_spin.setEnabled(budgeted)
+    
     def run_optimization(self):
         """Inicia el proceso de optimización"""
         self.run_button.setEnabled(False)
@@ -310,8 +347,16 @@ class OptimizeTab(QWidget):
         end_date = self.end_date_edit.date().toString("yyyy-MM-dd")
         initial_capital = self.initial_capital_spin.value()
         
+        # Método de búsqueda y presupuesto
+        search_options = {'method': self.method_combo.currentData()}
+        if not self.constraints_check.isChecked():
+            search_options['constraints'] = []
+        if search_options['method'] != 'grid':
+            search_options['max_evals'] = self.max_evals_spin.value()
+            search_options['time_budget'] = self.time_budget_spin.value() or None
+        
         # Emitir señal para iniciar optimización
-        self.run_optimization_signal.emit(param_grid, start_date, end_date, initial_capital)
+        self.run_optimization_signal.emit(param_grid, start_date, end_date, initial_capital, search_options)
     
     def update_progress(self, current, total):
         """Actualiza la barra de progreso"""
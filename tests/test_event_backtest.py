@@ -0,0 +1,147 @@
+import numpy as np
+import pytest
+
+from trading_bot.backtest_engine import (
+    AMBIGUITY_RULES,
+    compute_backtest_metrics,
+    level_exit_table,
+    run_event_backtest,
+    run_vectorized_backtest
+)
+from trading_bot.batch_engine import run_batch_backtest
+
+CASES = 2000
+
+
+def reference_backtest(open_, high, low, close, signal, stop_loss, take_profit, ambiguity,
+                       entry_factor=1.0, exit_factor=1.0, target_factor=1.0):
+    """
+    Backtest vela a vela, como `execute_trade`: referencia de `run_event_backtest`
+
+    Returns:
+        list: Tuplas (entrada, salida, precio de entrada, precio de salida, motivo)
+    """
+    n = len(close)
+    entry_factor = np.broadcast_to(entry_factor, n)
+    exit_factor = np.broadcast_to(exit_factor, n)
+    trades = []
+    entry = None
+    for bar in range(n):
+        if entry is None:
+            if signal[bar] == 1:
+                entry = bar
+                if bar == n - 1:
+                    # Una compra en la última vela se cierra en ella
+                    trades.append((bar, bar, close[bar] * entry_factor[bar], close[bar] * exit_factor[bar], 'end'))
+            continue
+
+        stop, target = stop_loss[entry], take_profit[entry]
+        stop_hit, target_hit = low[bar] <= stop, high[bar] >= target
+        if stop_hit and target_hit:
+            # Hueco en la apertura más allá de un nivel: se ejecuta ese; si no, la regla
+            if open_[bar] <= stop:
+                target_hit = False
+            elif open_[bar] >= target:
+                stop_hit = False
+            elif ambiguity == 'target':
+                stop_hit = False
+            elif ambiguity == 'nearest':
+                stop_hit = open_[bar] - stop <= target - open_[bar]
+                target_hit = not stop_hit
+            else:
+                target_hit = False
+
+        if stop_hit:
+            exit_price, reason = min(open_[bar], stop) * exit_factor[bar], 'stop_loss'
+        elif target_hit:
+            exit_price, reason = max(open_[bar], target) * target_factor, 'take_profit'
+        elif signal[bar] == -1:
+            exit_price, reason = close[bar] * exit_factor[bar], 'signal'
+        elif bar == n - 1:
+            exit_price, reason = close[bar] * exit_factor[bar], 'end'
+        else:
+            continue
+        trades.append((entry, bar, close[entry] * entry_factor[entry], exit_price, reason))
+        entry = None
+    return trades
+
+
+def random_case(rng):
+    """Velas, señales y niveles aleatorios con empates, huecos y niveles NaN"""
+    n = int(rng.integers(1, 60))
+    # Precios en múltiplos de 0.5 para que haya mínimos y máximos justo en los niveles
+    close = 100 + np.cumsum(rng.integers(-4, 5, n)) / 2
+    open_ = close + rng.integers(-6, 7, n) / 2
+    high = np.maximum(open_, close) + rng.integers(0, 4, n) / 2
+    low = np.minimum(open_, close) - rng.integers(0, 4, n) / 2
+    signal = rng.choice([-1, 0, 0, 1], size=n).astype(np.int8)
+    stop_loss = close - rng.integers(0, 6, n) / 2
+    take_profit = close + rng.integers(0, 6, n) / 2
+    stop_loss[rng.random(n) < 0.1] = np.nan
+    take_profit[rng.random(n) < 0.1] = np.nan
+    return open_, high, low, close, signal, stop_loss, take_profit
+
+
+def random_costs(rng, n):
+    """Multiplicadores de entrada y salida por vela o escalares, y el de los take profit"""
+    if rng.random() < 0.5:
+        return 1.0, 1.0, 1.0
+    entry_factor = 1 + rng.uniform(0, 0.01, n) if rng.random() < 0.5 else 1.001
+    exit_factor = 1 - rng.uniform(0, 0.01, n) if rng.random() < 0.5 else 0.999
+    return entry_factor, exit_factor, 0.9998
+
+
+@pytest.mark.parametrize('ambiguity', AMBIGUITY_RULES)
+def test_event_backtest_matches_reference(ambiguity):
+    rng = np.random.default_rng(AMBIGUITY_RULES.index(ambiguity))
+    for _ in range(CASES):
+        case = random_case(rng)
+        costs = random_costs(rng, len(case[0]))
+        result = run_event_backtest(*case, 1000, ambiguity, *costs)
+        trades = reference_backtest(*case, ambiguity, *costs)
+
+        assert result['entry_idx'].tolist() == [trade[0] for trade in trades]
+        assert result['exit_idx'].tolist() == [trade[1] for trade in trades]
+        assert result['entry_price'].tolist() == [trade[2] for trade in trades]
+        assert result['exit_price'].tolist() == [trade[3] for trade in trades]
+        assert result['exit_reason'].tolist() == [trade[4] for trade in trades]
+        growth = [exit_price / entry_price for _, _, entry_price, exit_price, _ in trades]
+        np.testing.assert_allclose(result['balance'], 1000 * np.cumprod(growth), rtol=1e-12)
+
+
+def test_event_backtest_without_levels_matches_vectorized():
+    rng = np.random.default_rng(10)
+    for _ in range(CASES):
+        open_, high, low, close, signal, _, _ = random_case(rng)
+        entry_factor, exit_factor, target_factor = random_costs(rng, len(close))
+        missing = np.full(len(close), np.nan)
+        event = run_event_backtest(open_, high, low, close, signal, missing, missing, 1000, 'stop',
+                                   entry_factor, exit_factor, target_factor)
+        vectorized = run_vectorized_backtest(close, signal, 1000, entry_factor, exit_factor)
+
+        for key in ('state', 'entry_idx', 'exit_idx', 'entry_price', 'exit_price', 'balance'):
+            np.testing.assert_array_equal(event[key], vectorized[key], err_msg=key)
+        np.testing.assert_array_equal(compute_backtest_metrics(close, event)['equity'],
+                                      compute_backtest_metrics(close, vectorized)['equity'])
+
+
+@pytest.mark.parametrize('ambiguity', AMBIGUITY_RULES)
+def test_level_exit_table_matches_event_backtest(ambiguity):
+    # Cada columna del motor matricial con la tabla de salidas equivale a un backtest por eventos
+    rng = np.random.default_rng(20 + AMBIGUITY_RULES.index(ambiguity))
+    for _ in range(CASES // 10):
+        open_, high, low, close, _, stop_loss, take_profit = random_case(rng)
+        n = len(close)
+        entry_factor, exit_factor, target_factor = random_costs(rng, n)
+        signals = rng.choice([-1, 0, 0, 1], size=(n, 8)).astype(np.int8)
+        table = level_exit_table(open_, high, low, stop_loss, take_profit, ambiguity, exit_factor, target_factor)
+        batch = run_batch_backtest(close, signals, 1000, entry_factor, exit_factor, table)
+
+        for column in range(signals.shape[1]):
+            result = run_event_backtest(open_, high, low, close, signals[:, column], stop_loss, take_profit,
+                                        1000, ambiguity, entry_factor, exit_factor, target_factor)
+            metrics = compute_backtest_metrics(close, result, 1000)
+            assert batch['total_trades'][column] == metrics['total_trades']
+            assert batch['total_return_pct'][column] == metrics['total_return_pct']
+            assert batch['win_rate'][column] == metrics['win_rate']
+            assert batch['max_drawdown'][column] == metrics['max_drawdown']
@@ -0,0 +1,28 @@
+from trading_bot import CryptoTradingBot
+from trading_bot.job_process import BotJob
+
+
+def test_cancel_before_start():
+    job = BotJob({}, 'backtest')
+    job.cancel()
+    job.start()
+
+    assert job.process.pid is None
+    assert list(job.messages(poll_interval=0.01))[0][0] == 'error'
+
+
+def test_process_worker_cancel_before_run(tmp_path, monkeypatch):
+    # La interfaz puede cancelar antes de que el hilo llegue a arrancar el proceso
+    monkeypatch.setenv('QT_QPA_PLATFORM', 'offscreen')
+    monkeypatch.chdir(tmp_path)
+    from crypto_bot_gui import ProcessWorker
+
+    worker = ProcessWorker(CryptoTradingBot(), 'backtest', {})
+    failures = []
+    worker.job_failed.connect(failures.append)
+    worker.cancel()
+    worker.start()
+    assert worker.wait(5000)
+
+    assert worker.job.process.pid is None
+    assert failures == []
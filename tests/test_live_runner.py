@@ -0,0 +1,95 @@
+import asyncio
+
+import ccxt
+import numpy as np
+
+from trading_bot.backfill import backfill_store
+from trading_bot.data_store import OHLCVStore, index_to_ms
+from trading_bot.live_runner import _evaluate_bot
+
+from test_optimizer import make_ohlcv
+
+TIMEFRAME_MS = 3600 * 1000
+
+
+class FakeExchange:
+    """Exchange síncrono con un histórico fijo de velas horarias"""
+
+    id = 'fake'
+    rateLimit = 0
+
+    def __init__(self, n=700):
+        df = make_ohlcv(n)
+        self.rows = np.column_stack([index_to_ms(df.index), df.to_numpy()])
+
+    def parse_timeframe(self, timeframe):
+        return ccxt.Exchange.parse_timeframe(timeframe)
+
+    def milliseconds(self):
+        return int(self.rows[-1, 0]) + TIMEFRAME_MS // 2
+
+    def fetch_ohlcv(self, symbol, timeframe='1h', since=None, limit=None, params={}):
+        limit = limit or 1000
+        if since is None:
+            return self.rows[-limit:].tolist()
+        return self.rows[self.rows[:, 0] >= since][:limit].tolist()
+
+
+class FakeBot:
+    """Lo mínimo de CryptoTradingBot que usa el runner para evaluar una vela"""
+
+    exchange_id = 'fake'
+    symbol = 'BTC/USDT'
+    timeframe = '1h'
+
+    def __init__(self, store, exchange):
+        self.data_store = store
+        self.exchange = exchange
+        self.errors = []
+
+    def process_live_candles(self, candles, simulation_mode=True):
+        return False
+
+    def log_error(self, message):
+        self.errors.append(message)
+
+
+def test_restart_with_stale_store_fills_gap(tmp_path):
+    exchange = FakeExchange()
+    store = OHLCVStore(str(tmp_path))
+    store.write('fake', 'BTC/USDT', '1h', exchange.rows[:110])
+    bot = FakeBot(store, exchange)
+
+    # Al arrancar, la ventana en memoria solo tiene las últimas 100 velas cerradas
+    window = exchange.rows[-101:-1]
+    asyncio.run(_evaluate_bot(bot, window, True, None, TIMEFRAME_MS))
+
+    assert bot.errors == []
+    np.testing.assert_array_equal(store.load('fake', 'BTC/USDT', '1h'), exchange.rows[:-1])
+
+
+def test_backfill_store_fills_interior_gaps(tmp_path):
+    exchange = FakeExchange()
+    store = OHLCVStore(str(tmp_path))
+    store.write('fake', 'BTC/USDT', '1h', np.concatenate([exchange.rows[:110], exchange.rows[601:]]))
+
+    downloaded = backfill_store(store, exchange, 'BTC/USDT', '1h', int(exchange.rows[0, 0]),
+                                int(exchange.rows[-1, 0]), page_limit=200)
+
+    assert downloaded >= 491
+    np.testing.assert_array_equal(store.load('fake', 'BTC/USDT', '1h'), exchange.rows)
+
+
+def test_store_catches_up_from_its_last_candle(tmp_path):
+    # Las velas nuevas se cuentan desde el almacén, no desde la evaluación anterior del runner
+    exchange = FakeExchange()
+    store = OHLCVStore(str(tmp_path))
+    store.write('fake', 'BTC/USDT', '1h', exchange.rows[:650])
+    bot = FakeBot(store, exchange)
+
+    for stop in (680, 681, 681):
+        window = exchange.rows[stop - 100:stop]
+        asyncio.run(_evaluate_bot(bot, window, True, None, TIMEFRAME_MS))
+
+    assert bot.errors == []
+    np.testing.assert_array_equal(store.load('fake', 'BTC/USDT', '1h'), exchange.rows[:681])
@@ -0,0 +1,108 @@
+import numpy as np
+import pandas as pd
+import pytest
+from ta.momentum import RSIIndicator
+from ta.trend import EMAIndicator, SMAIndicator
+from ta.volatility import BollingerBands
+
+from trading_bot import CryptoTradingBot, kernels
+from trading_bot.costs import CostModel
+from trading_bot.optimizer import LevelExits, batch_grid_search, evaluate_parameters, expand_grid
+from trading_bot.strategy import StrategyParams
+
+GRID = {
+    'fast_ma': [5, 12, 20],
+    'slow_ma': [30, 50],
+    'rsi_period': [7, 14],
+    'rsi_oversold': [25, 35],
+    'bb_std': [1.5, 2],
+    'use_ema': [True, False],
+    'stop_atr': [1.5, 2],
+    'atr_period': [10, 14]
+}
+COSTS = {
+    'sin costes': None,
+    'con costes': CostModel(maker_fee=0.0002, taker_fee=0.001, slippage=0.0005, volatility_slippage=0.05,
+                            estimate_spread=True)
+}
+
+
+def make_ohlcv(n=3000, seed=0):
+    """Velas aleatorias (paseo aleatorio) con índice horario"""
+    rng = np.random.default_rng(seed)
+    close = 30000 * np.exp(np.cumsum(rng.normal(0, 0.01, n)))
+    open_ = np.concatenate(([close[0]], close[:-1])) * (1 + rng.normal(0, 0.002, n))
+    high = np.maximum(open_, close) * (1 + rng.uniform(0, 0.006, n))
+    low = np.minimum(open_, close) * (1 - rng.uniform(0, 0.006, n))
+    volume = rng.uniform(1, 10, n)
+    index = pd.date_range('2020-01-01', periods=n, freq='1h', name='timestamp')
+    return pd.DataFrame({'open': open_, 'high': high, 'low': low, 'close': close, 'volume': volume}, index=index)
+
+
+@pytest.mark.parametrize('costs', COSTS.values(), ids=COSTS.keys())
+@pytest.mark.parametrize('ambiguity', [None, 'stop', 'nearest'], ids=['señal', 'stop', 'nearest'])
+def test_batch_grid_search_matches_evaluate_parameters(costs, ambiguity):
+    df = make_ohlcv()
+    close = df['close'].to_numpy()
+    base_params = StrategyParams().to_dict()
+    combinations = expand_grid(GRID, ('fast_ma < slow_ma',), base_params)
+    fill_factors = None if costs is None else costs.fill_factors(df['high'].to_numpy(), df['low'].to_numpy(), close)
+    level_exits = None
+    if ambiguity is not None:
+        level_exits = LevelExits(df['open'], df['high'], df['low'], close, ambiguity, costs)
+
+    # Lotes pequeños para que haya varios, y cada uno con columnas de distintos niveles
+    results = batch_grid_search(close, combinations, base_params, 1000, 300, 2800, max_cells=2500 * 40,
+                                fill_factors=fill_factors, level_exits=level_exits)
+    for index, params, result in results:
+        assert params is combinations[index]
+        expected = evaluate_parameters(close, dict(base_params, **params), 1000, 300, 2800,
+                                       fill_factors=fill_factors, level_exits=level_exits)
+        assert result == expected, params
+
+
+def test_batch_grid_search_without_trades():
+    close = make_ohlcv(60)['close'].to_numpy()
+    base_params = StrategyParams().to_dict()
+    for _, params, result in batch_grid_search(close, [{'slow_ma': 100}], base_params):
+        assert result == evaluate_parameters(close, dict(base_params, **params))
+        assert result['trades'] == 0
+
+
+# 5 y 10: ventanas en las que 2 / (window + 1) redondea distinto que `ewm(span=window)`
+@pytest.mark.parametrize('window', [2, 5, 9, 10, 14, 50])
+def test_kernels_match_ta(window):
+    close = make_ohlcv()['close']
+    values = close.to_numpy()
+
+    np.testing.assert_array_equal(kernels.ema(values, window),
+                                  EMAIndicator(close=close, window=window).ema_indicator().to_numpy())
+    np.testing.assert_array_equal(kernels.sma(values, window),
+                                  SMAIndicator(close=close, window=window).sma_indicator().to_numpy())
+    np.testing.assert_array_equal(kernels.rsi(values, window),
+                                  RSIIndicator(close=close, window=window).rsi().to_numpy())
+
+    bands = BollingerBands(close=close, window=window, window_dev=2)
+    upper, middle, lower = kernels.bollinger_bands(values, window, 2)
+    np.testing.assert_array_equal(upper, bands.bollinger_hband().to_numpy())
+    np.testing.assert_array_equal(middle, bands.bollinger_mavg().to_numpy())
+    np.testing.assert_array_equal(lower, bands.bollinger_lband().to_numpy())
+
+
+@pytest.mark.parametrize('params', [
+    StrategyParams(),
+    StrategyParams(fast_ma=5, slow_ma=30, rsi_period=7, bb_std=1.5),
+    StrategyParams(fast_ma=12, slow_ma=60, use_ema=False, rsi_oversold=35, rsi_overbought=65, bb_period=10)
+])
+def test_add_indicators_backends_match(params, tmp_path, monkeypatch):
+    # El bot crea sus carpetas (logs, data) en el directorio actual
+    monkeypatch.chdir(tmp_path)
+    bot = CryptoTradingBot()
+    df = make_ohlcv()
+    with_numpy = bot.add_indicators(df.copy(), backend='numpy', params=params)
+    with_ta = bot.add_indicators(df.copy(), backend='ta', params=params)
+
+    assert list(with_numpy.columns) == list(with_ta.columns)
+    for column in with_ta.columns:
+        np.testing.assert_array_equal(with_numpy[column].to_numpy(dtype=np.float64),
+                                      with_ta[column].to_numpy(dtype=np.float64), err_msg=column)
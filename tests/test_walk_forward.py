@@ -0,0 +1,50 @@
+import numpy as np
+import pytest
+
+from trading_bot.costs import CostModel
+from trading_bot.indicator_cache import IndicatorCache
+from trading_bot.optimizer import LevelExits, expand_grid
+from trading_bot.strategy import StrategyParams
+from trading_bot.walk_forward import evaluate_fold, walk_forward, walk_forward_windows
+
+from test_optimizer import make_ohlcv
+
+GRID = {'fast_ma': [5, 10, 20], 'slow_ma': [30, 60], 'rsi_oversold': [25, 35], 'stop_atr': [1.5, 2]}
+
+
+@pytest.mark.parametrize('intrabar_stops', [False, True], ids=['señal', 'sl/tp'])
+def test_walk_forward_pool_matches_single_process(intrabar_stops):
+    df = make_ohlcv(4000)
+    base_params = StrategyParams().to_dict()
+    combinations = expand_grid(GRID, (), base_params)
+    windows = walk_forward_windows(300, len(df), 1200, 600)
+    costs = CostModel(taker_fee=0.001, maker_fee=0.0002, estimate_spread=True)
+
+    single = dict(walk_forward(df, windows, combinations, base_params, max_workers=1, cache=IndicatorCache(),
+                               costs=costs, intrabar_stops=intrabar_stops, ambiguity='nearest'))
+    pool = dict(walk_forward(df, windows, combinations, base_params, max_workers=2, costs=costs,
+                             intrabar_stops=intrabar_stops, ambiguity='nearest'))
+
+    assert sorted(pool) == list(range(len(windows)))
+    for index, result in single.items():
+        assert pool[index]['params'] == result['params']
+        assert pool[index]['train'] == result['train']
+        assert pool[index]['test'] == result['test']
+        np.testing.assert_array_equal(pool[index]['equity'], result['equity'])
+
+
+def test_walk_forward_matches_evaluate_fold():
+    # Las señales y tablas compartidas dan lo mismo que calcular cada ventana por separado
+    df = make_ohlcv(4000)
+    close = df['close'].to_numpy()
+    base_params = StrategyParams().to_dict()
+    combinations = expand_grid(GRID, (), base_params)
+    windows = walk_forward_windows(300, len(df), 1200, 600, anchored=True)
+    level_exits = LevelExits(df['open'], df['high'], df['low'], close, 'stop')
+
+    results = dict(walk_forward(df, windows, combinations, base_params, intrabar_stops=True))
+    for index, window in enumerate(windows):
+        expected = evaluate_fold(close, window, combinations, base_params, level_exits=level_exits)
+        assert results[index]['params'] == expected['params']
+        assert results[index]['test'] == expected['test']
+        np.testing.assert_array_equal(results[index]['equity'], expected['equity'])
@@ -1,4 +1,6 @@
 from .bot import CryptoTradingBot
+from .strategy import StrategyParams
+from .costs import CostModel
 from .utils import (
     get_available_exchanges,
     get_available_timeframes,
@@ -15,6 +17,8 @@ from .utils import (
 
 __all__ = [
     'CryptoTradingBot',
+    'StrategyParams',
+    'CostModel',
     'get_available_exchanges',
     'get_available_timeframes',
     'format_price',
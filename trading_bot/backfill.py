@@ -0,0 +1,147 @@
+import time
+import threading
+from concurrent.futures import ThreadPoolExecutor
+import numpy as np
+from .data_store import ROW_WIDTH, deduplicate_candles, find_gaps
+
+
+class RateLimiter:
+    """
+    Limitador de peticiones compartido entre hilos
+
+    Reparte turnos separados por `interval_ms` milisegundos, de forma que
+    varias descargas concurrentes respeten el rateLimit del exchange.
+    """
+
+    def __init__(self, interval_ms):
+        self.interval = interval_ms / 1000.0
+        self._next_slot = 0.0
+        self._lock = threading.Lock()
+
+    def wait(self):
+        """Bloquea hasta que corresponde el siguiente turno"""
+        with self._lock:
+            now = time.monotonic()
+            slot = max(now, self._next_slot)
+            self._next_slot = slot + self.interval
+        delay = slot - now
+        if delay > 0:
+            time.sleep(delay)
+
+
+def plan_pages(since_ms, until_ms, timeframe_ms, page_limit=1000):
+    """
+    Divide un rango de fechas en páginas de como máximo `page_limit` velas
+
+    Returns:
+        list: Tuplas (inicio, fin) en ms; el fin de cada página es exclusivo
+    """
+    since_ms = int(since_ms) - int(since_ms) % timeframe_ms
+    page_span = timeframe_ms * page_limit
+    return [
+        (start, min(start + page_span, int(until_ms) + 1))
+        for start in range(since_ms, int(until_ms) + 1, page_span)
+    ]
+
+
+def _fetch_page(exchange, symbol, timeframe, start_ms, end_ms, timeframe_ms, page_limit, limiter):
+    """Descarga una página, continuando si el exchange devuelve menos velas de las pedidas"""
+    chunks = []
+    since = start_ms
+    while since < end_ms:
+        limiter.wait()
+        ohlcv = exchange.fetch_ohlcv(symbol, timeframe, since=since, limit=page_limit)
+        if not ohlcv:
+            break
+        chunks.append(ohlcv)
+        next_since = ohlcv[-1][0] + timeframe_ms
+        if next_since <= since:
+            break
+        since = next_since
+
+    if not chunks:
+        return np.zeros((0, ROW_WIDTH), dtype=np.float64)
+
+    rows = np.concatenate([np.asarray(chunk, dtype=np.float64).reshape(-1, ROW_WIDTH) for chunk in chunks])
+    return rows[(rows[:, 0] >= start_ms) & (rows[:, 0] < end_ms)]
+
+
+def backfill_ohlcv(exchange, symbol, timeframe, since_ms, until_ms, page_limit=1000, max_workers=4):
+    """
+    Descarga el histórico de velas de un rango de fechas en paralelo
+
+    El rango se divide en páginas basadas en `since` que se descargan de
+    forma concurrente respetando el rateLimit del exchange. Las velas
+    repetidas entre páginas se eliminan y el resultado se devuelve como un
+    único array contiguo ordenado por timestamp.
+
+    Args:
+        exchange: Instancia de ccxt
+        symbol (str): Par de trading
+        timeframe (str): Timeframe de las velas
+        since_ms (int): Inicio del rango (ms)
+        until_ms (int): Fin del rango (ms, incluido)
+        page_limit (int): Velas por petición
+        max_workers (int): Peticiones simultáneas
+
+    Returns:
+        np.ndarray: Velas (N, 6)
+    """
+    timeframe_ms = int(exchange.parse_timeframe(timeframe) * 1000)
+    pages = plan_pages(since_ms, until_ms, timeframe_ms, page_limit)
+    if not pages:
+        return np.zeros((0, ROW_WIDTH), dtype=np.float64)
+
+    # Cargar mercados antes de lanzar los hilos para no hacerlo en paralelo
+    if hasattr(exchange, 'load_markets'):
+        exchange.load_markets()
+
+    limiter = RateLimiter(getattr(exchange, 'rateLimit', 0) or 0)
+    with ThreadPoolExecutor(max_workers=max(1, min(max_workers, len(pages)))) as executor:
+        results = list(executor.map(
+            lambda page: _fetch_page(exchange, symbol, timeframe, page[0], page[1],
+                                     timeframe_ms, page_limit, limiter),
+            pages
+        ))
+
+    return deduplicate_candles(np.concatenate(results))
+
+
+def backfill_store(store, exchange, symbol, timeframe, since_ms, until_ms, page_limit=1000, max_workers=4):
+    """
+    Completa el almacén local para cubrir un rango de fechas
+
+    Solo se descargan los tramos que faltan: antes de la primera vela,
+    después de la última y los huecos entre velas almacenadas dentro del
+    rango (por ejemplo, si el bot en vivo estuvo parado).
+
+    Returns:
+        int: Número de velas descargadas
+    """
+    stored = store.load(exchange.id, symbol, timeframe)
+    if len(stored) == 0:
+        missing = [(since_ms, until_ms)]
+    else:
+        timeframe_ms = int(exchange.parse_timeframe(timeframe) * 1000)
+        timestamps = stored[:, 0]
+        first_ts, last_ts = int(timestamps[0]), int(timestamps[-1])
+        missing = []
+        if since_ms < first_ts:
+            missing.append((since_ms, first_ts - 1))
+        # Huecos entre la vela anterior a `since_ms` y la posterior a `until_ms`
+        start = max(np.searchsorted(timestamps, since_ms, side='right') - 1, 0)
+        stop = np.searchsorted(timestamps, until_ms, side='left') + 1
+        missing.extend(find_gaps(timestamps[start:stop], timeframe_ms))
+        if until_ms > last_ts:
+            # La última vela se vuelve a pedir por si estaba abierta
+            missing.append((last_ts, until_ms))
+        del timestamps
+    del stored
+
+    downloaded = 0
+    for start_ms, end_ms in missing:
+        rows = backfill_ohlcv(exchange, symbol, timeframe, start_ms, end_ms,
+                              page_limit=page_limit, max_workers=max_workers)
+        store.write(exchange.id, symbol, timeframe, rows)
+        downloaded += len(rows)
+    return downloaded
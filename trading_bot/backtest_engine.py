@@ -0,0 +1,457 @@
+import numpy as np
+import pandas as pd
+
+
+def compute_position_state(signal):
+    """
+    Calcula el estado de la posición (1 = long, 0 = fuera) en cada vela
+
+    Replica la máquina de estados del backtest: una señal de compra abre la
+    posición si no hay una abierta y una señal de venta la cierra si existe.
+    Por tanto, el estado tras cada vela es 1 si la última señal distinta de
+    cero fue de compra.
+
+    Args:
+        signal (np.ndarray): Señales por vela (1 = compra, -1 = venta, 0 = mantener)
+
+    Returns:
+        np.ndarray: Estado de la posición por vela (int8)
+    """
+    signal = np.asarray(signal)
+    n = len(signal)
+    if n == 0:
+        return np.zeros(0, dtype=np.int8)
+
+    # Índice de la última señal distinta de cero en cada vela
+    has_event = signal != 0
+    last_event = np.where(has_event, np.arange(n), -1)
+    np.maximum.accumulate(last_event, out=last_event)
+
+    state = np.zeros(n, dtype=np.int8)
+    valid = last_event >= 0
+    state[valid] = signal[last_event[valid]] > 0
+    return state
+
+
+def extract_trade_indices(state):
+    """
+    Obtiene los índices de entrada y salida a partir del estado de la posición
+
+    Si la última posición queda abierta se cierra en la última vela,
+    igual que hace el backtest.
+
+    Returns:
+        tuple: (entry_idx, exit_idx) como arrays de enteros del mismo tamaño
+    """
+    n = len(state)
+    if n == 0:
+        empty = np.zeros(0, dtype=np.int64)
+        return empty, empty
+
+    prev = np.concatenate(([0], state[:-1]))
+    entry_idx = np.flatnonzero((state == 1) & (prev == 0))
+    exit_idx = np.flatnonzero((state == 0) & (prev == 1))
+
+    if len(exit_idx) < len(entry_idx):
+        exit_idx = np.append(exit_idx, n - 1)
+
+    return entry_idx, exit_idx
+
+
+def fill_at(factor, index):
+    """Multiplicadores de precio (array por vela o escalar) en las velas `index`"""
+    return factor[index] if np.ndim(factor) else factor
+
+
+def run_vectorized_backtest(close, signal, initial_balance=1000, entry_factor=1.0, exit_factor=1.0):
+    """
+    Ejecuta el backtest long-only sobre arrays de precios y señales
+
+    Toda la lógica se resuelve con operaciones vectorizadas de NumPy:
+    el estado de la posición, las entradas/salidas y la evolución del
+    balance, que reinvierte el capital completo en cada operación.
+
+    Args:
+        close (np.ndarray): Precios de cierre
+        signal (np.ndarray): Señales por vela
+        initial_balance (float): Balance inicial
+        entry_factor, exit_factor (np.ndarray o float): Multiplicadores del
+            cierre al comprar y al vender en cada vela, con los costes de
+            ejecución (ver `CostModel.fill_factors`)
+
+    Returns:
+        dict: Arrays con 'state', 'entry_idx', 'exit_idx', 'entry_price',
+              'exit_price', 'profit_pct' y 'balance' (balance tras cada operación);
+              los precios incluyen los costes
+    """
+    close = np.asarray(close, dtype=np.float64)
+    state = compute_position_state(signal)
+    entry_idx, exit_idx = extract_trade_indices(state)
+
+    entry_price = close[entry_idx] * fill_at(entry_factor, entry_idx)
+    exit_price = close[exit_idx] * fill_at(exit_factor, exit_idx)
+    growth = exit_price / entry_price
+    balance = initial_balance * np.cumprod(growth)
+
+    return {
+        'state': state,
+        'entry_idx': entry_idx,
+        'exit_idx': exit_idx,
+        'entry_price': entry_price,
+        'exit_price': exit_price,
+        'profit_pct': (growth - 1) * 100,
+        'balance': balance
+    }
+
+
+# Regla para las velas en las que se tocan tanto el stop loss como el take profit
+AMBIGUITY_RULES = ('stop', 'target', 'nearest')
+
+
+def _first_level_hit(low, high, stop_loss, take_profit, start, stop, window=64):
+    """
+    Primera vela de [start, stop) en la que se toca el stop loss o el take profit
+
+    Se comprueban ventanas que doblan su tamaño, de modo que el coste es
+    proporcional a la duración de la operación y no al resto de los datos.
+
+    Returns:
+        int: Índice de la vela o `stop` si no se toca ningún nivel
+    """
+    while start < stop:
+        end = min(start + window, stop)
+        hits = low[start:end] <= stop_loss
+        hits |= high[start:end] >= take_profit
+        if hits.any():
+            return start + int(np.argmax(hits))
+        start = end
+        window *= 2
+    return stop
+
+
+def _level_exit(open_price, low, high, stop_loss, take_profit, ambiguity):
+    """
+    Motivo y precio de salida en una vela que toca algún nivel
+
+    Un hueco en la apertura más allá de un nivel lo ejecuta al precio de
+    apertura. Si la vela toca los dos niveles sin hueco se aplica la regla
+    `ambiguity`: 'stop' (el stop primero, conservadora), 'target' o
+    'nearest' (el nivel más cercano a la apertura).
+    """
+    stop_hit = low <= stop_loss
+    target_hit = high >= take_profit
+    if stop_hit and target_hit:
+        if open_price <= stop_loss:
+            target_hit = False
+        elif open_price >= take_profit:
+            stop_hit = False
+        elif ambiguity == 'target':
+            stop_hit = False
+        elif ambiguity == 'nearest':
+            stop_hit = open_price - stop_loss <= take_profit - open_price
+        if stop_hit:
+            target_hit = False
+
+    if stop_hit:
+        return 'stop_loss', min(open_price, stop_loss)
+    return 'take_profit', max(open_price, take_profit)
+
+
+def level_exit_table(open_, high, low, stop_loss, take_profit, ambiguity='stop', exit_factor=1.0,
+                     target_factor=1.0, max_cells=2 ** 22):
+    """
+    Salida por stop loss o take profit de una posición abierta en cada vela
+
+    Para una entrada en la vela `i` con los niveles de esa vela, busca la
+    primera vela posterior que toca alguno y su precio de ejecución con las
+    mismas reglas que `run_event_backtest` (huecos en la apertura y
+    `ambiguity`). Solo depende de las velas y de los niveles, no de las
+    señales, así que se calcula una vez para todas las combinaciones de un
+    grid. Todas las entradas se comprueban a la vez en ventanas de velas
+    que doblan su tamaño.
+
+    Args:
+        open_, high, low (np.ndarray): Precios de cada vela
+        stop_loss, take_profit (np.ndarray): Niveles de una entrada en cada vela
+        ambiguity (str): Regla si una vela toca los dos niveles (ver AMBIGUITY_RULES)
+        exit_factor (np.ndarray o float): Multiplicador del precio de los stop loss
+        target_factor (float): Multiplicador del precio de los take profit
+        max_cells (int): Celdas (entradas x velas) máximas de cada ventana
+
+    Returns:
+        tuple: (vela de salida de cada entrada, o `len(open_)` si no se toca
+               ningún nivel; precio de salida, NaN en ese caso)
+    """
+    if ambiguity not in AMBIGUITY_RULES:
+        raise ValueError(f"Regla de ambigüedad no válida: {ambiguity}")
+
+    open_, high, low, stop_loss, take_profit = (
+        np.asarray(values, dtype=np.float64) for values in (open_, high, low, stop_loss, take_profit)
+    )
+    n = len(open_)
+    exit_bar = np.full(n, n, dtype=np.int64)
+
+    # Las entradas sin niveles (NaN) nunca salen por ellos
+    active = np.flatnonzero(~(np.isnan(stop_loss) & np.isnan(take_profit)))
+    offset, window = 1, 8
+    while active.size:
+        active = active[active + offset < n]
+        if not active.size:
+            break
+        window = max(1, min(window, max_cells // active.size))
+        bars = active[:, None] + np.arange(offset, offset + window)
+        inside = bars < n
+        bars = np.minimum(bars, n - 1)
+        hits = (low[bars] <= stop_loss[active, None]) | (high[bars] >= take_profit[active, None])
+        hits &= inside
+        found = hits.any(axis=1)
+        exit_bar[active[found]] = bars[found, np.argmax(hits[found], axis=1)]
+        active = active[~found]
+        offset += window
+        window *= 2
+
+    # Precio de la salida en la vela que toca algún nivel (ver `_level_exit`)
+    entries = np.flatnonzero(exit_bar < n)
+    bars = exit_bar[entries]
+    bar_open = open_[bars]
+    stop, target = stop_loss[entries], take_profit[entries]
+    stop_hit = low[bars] <= stop
+    target_hit = high[bars] >= target
+    if ambiguity == 'stop':
+        rule = True
+    elif ambiguity == 'target':
+        rule = False
+    else:
+        rule = bar_open - stop <= target - bar_open
+    gap_down, gap_up = bar_open <= stop, bar_open >= target
+    stop_first = stop_hit & (~target_hit | gap_down | (~gap_up & rule))
+
+    exit_price = np.full(n, np.nan)
+    exit_price[entries] = np.where(
+        stop_first,
+        np.minimum(bar_open, stop) * fill_at(exit_factor, bars),
+        np.maximum(bar_open, target) * target_factor
+    )
+    return exit_bar, exit_price
+
+
+def run_event_backtest(open_, high, low, close, signal, stop_loss, take_profit,
+                       initial_balance=1000, ambiguity='stop', entry_factor=1.0, exit_factor=1.0,
+                       target_factor=1.0):
+    """
+    Ejecuta el backtest long-only con salidas por stop loss y take profit dentro de la vela
+
+    Reproduce la lógica de `execute_trade`: se entra al cierre de una vela
+    con señal de compra fijando los niveles de esa vela, y se sale en la
+    primera vela posterior cuyo mínimo toca el stop loss o cuyo máximo toca
+    el take profit, o al cierre de la siguiente señal de venta si llega
+    antes. El bucle es por operación, no por vela: la siguiente señal se
+    busca con `searchsorted` y el primer toque de un nivel con un escaneo
+    vectorizado. Sin niveles (NaN) el resultado es el de `run_vectorized_backtest`.
+
+    Args:
+        open_, high, low, close (np.ndarray): Precios de cada vela
+        signal (np.ndarray): Señales por vela
+        stop_loss (np.ndarray): Stop loss de una entrada en cada vela
+        take_profit (np.ndarray): Take profit de una entrada en cada vela
+        initial_balance (float): Balance inicial
+        ambiguity (str): Regla si una vela toca los dos niveles (ver AMBIGUITY_RULES)
+        entry_factor, exit_factor (np.ndarray o float): Multiplicadores del
+            precio al comprar y al vender a mercado (salidas por señal y stop loss)
+        target_factor (float): Multiplicador del precio de los take profit
+
+    Returns:
+        dict: Las mismas claves que `run_vectorized_backtest` más 'exit_reason'
+              ('signal', 'stop_loss', 'take_profit' o 'end')
+    """
+    if ambiguity not in AMBIGUITY_RULES:
+        raise ValueError(f"Regla de ambigüedad no válida: {ambiguity}")
+
+    open_, high, low, close, stop_loss, take_profit = (
+        np.asarray(values, dtype=np.float64)
+        for values in (open_, high, low, close, stop_loss, take_profit)
+    )
+    signal = np.asarray(signal)
+    n = len(close)
+    buys = np.flatnonzero(signal == 1)
+    sells = np.flatnonzero(signal == -1)
+
+    # Sin tocar ningún nivel, cada compra sale con la siguiente venta o en la última vela
+    next_sell = np.searchsorted(sells, buys, side='right')
+    signal_exits = np.append(sells, n - 1)[next_sell].tolist()
+    ends = (next_sell == len(sells)).tolist()
+
+    entries, exits, exit_prices, reasons = [], [], [], []
+    next_bar = 0
+    while True:
+        position = int(np.searchsorted(buys, next_bar))
+        if position == len(buys):
+            break
+        entry = int(buys[position])
+        signal_exit = signal_exits[position]
+        reason = 'end' if ends[position] else 'signal'
+
+        exit_bar = _first_level_hit(
+            low, high, stop_loss[entry], take_profit[entry], entry + 1, signal_exit + 1
+        )
+        if exit_bar <= signal_exit:
+            reason, exit_price = _level_exit(
+                open_[exit_bar], low[exit_bar], high[exit_bar],
+                stop_loss[entry], take_profit[entry], ambiguity
+            )
+        else:
+            exit_bar, exit_price = signal_exit, close[signal_exit]
+
+        entries.append(entry)
+        exits.append(exit_bar)
+        exit_prices.append(exit_price)
+        reasons.append(reason)
+        next_bar = exit_bar + 1
+
+    entry_idx = np.asarray(entries, dtype=np.int64)
+    exit_idx = np.asarray(exits, dtype=np.int64)
+    exit_reason = np.asarray(reasons, dtype=object)
+    entry_price = close[entry_idx] * fill_at(entry_factor, entry_idx)
+    exit_price = np.asarray(exit_prices, dtype=np.float64)
+    exit_price *= np.where(exit_reason == 'take_profit', target_factor, fill_at(exit_factor, exit_idx))
+    growth = exit_price / entry_price
+
+    # Como en `compute_position_state`, una posición cerrada al final sigue abierta en la última vela
+    marks = np.zeros(n, dtype=np.int64)
+    np.add.at(marks, entry_idx, 1)
+    np.add.at(marks, exit_idx[exit_reason != 'end'], -1)
+    state = np.cumsum(marks).astype(np.int8)
+
+    return {
+        'state': state,
+        'entry_idx': entry_idx,
+        'exit_idx': exit_idx,
+        'entry_price': entry_price,
+        'exit_price': exit_price,
+        'profit_pct': (growth - 1) * 100,
+        'balance': initial_balance * np.cumprod(growth),
+        'exit_reason': exit_reason
+    }
+
+
+def build_trades_frame(index, engine_result):
+    """Construye el DataFrame de operaciones a partir del resultado del motor"""
+    trades = pd.DataFrame({
+        'entry_date': index[engine_result['entry_idx']],
+        'exit_date': index[engine_result['exit_idx']],
+        'entry_price': engine_result['entry_price'],
+        'exit_price': engine_result['exit_price'],
+        'profit_pct': engine_result['profit_pct'],
+        'balance': engine_result['balance']
+    })
+    if 'exit_reason' in engine_result:
+        trades['exit_reason'] = engine_result['exit_reason']
+    return trades
+
+
+def build_equity_curve(close, entry_idx, exit_idx, trade_balance, initial_balance=1000, exit_price=None,
+                       entry_price=None):
+    """
+    Construye la curva de equity marcando la posición a mercado en cada vela
+
+    Entre la entrada y la salida (ambas incluidas) la equity es el número de
+    unidades compradas por el precio de cierre; fuera de mercado es el balance
+    de la última operación cerrada. Coste O(velas + operaciones).
+
+    Args:
+        close (np.ndarray): Precios de cierre
+        entry_idx (np.ndarray): Índices de las velas de entrada
+        exit_idx (np.ndarray): Índices de las velas de salida
+        trade_balance (np.ndarray): Balance tras cada operación
+        initial_balance (float): Balance inicial
+        exit_price (np.ndarray): Precio de cada salida (por defecto, el cierre de la vela)
+        entry_price (np.ndarray): Precio de cada entrada (por defecto, el cierre de la vela)
+
+    Returns:
+        np.ndarray: Valor de la cartera en cada vela
+    """
+    close = np.asarray(close, dtype=np.float64)
+    n = len(close)
+
+    # Balance disponible antes de cada entrada y después de cada salida
+    cash = np.concatenate(([initial_balance], trade_balance)).astype(np.float64)
+    units = cash[:-1] / (close[entry_idx] if entry_price is None else entry_price)
+
+    # Entradas y salidas acumuladas hasta cada vela (incluida)
+    entry_marks = np.zeros(n, dtype=np.int64)
+    exit_marks = np.zeros(n, dtype=np.int64)
+    entry_marks[entry_idx] = 1
+    exit_marks[exit_idx] = 1
+    entries_done = np.cumsum(entry_marks)
+    exits_done = np.cumsum(exit_marks)
+
+    # En mercado desde la vela de entrada hasta la de salida, ambas incluidas
+    in_market = entries_done > exits_done - exit_marks
+
+    equity = cash[exits_done]
+    held = np.flatnonzero(in_market)
+    equity[held] = units[entries_done[held] - 1] * close[held]
+    if exit_price is not None:
+        # Las salidas por stop loss o take profit no se ejecutan al cierre
+        equity[exit_idx] = units * exit_price
+    return equity
+
+
+def compute_drawdown(equity):
+    """Calcula el drawdown porcentual respecto al máximo previo de la equity"""
+    equity = np.asarray(equity, dtype=np.float64)
+    peak = np.maximum.accumulate(equity)
+    return (equity - peak) / peak * 100
+
+
+def compute_backtest_metrics(close, engine_result, initial_balance=1000):
+    """
+    Calcula las métricas de rendimiento de un backtest
+
+    Args:
+        close (np.ndarray): Precios de cierre del periodo del backtest
+        engine_result (dict): Resultado de `run_vectorized_backtest`
+        initial_balance (float): Balance inicial
+
+    Returns:
+        dict: 'final_balance', 'total_return_pct', 'total_trades', 'win_trades',
+              'lose_trades', 'win_rate', 'max_drawdown', 'equity' y 'drawdown'
+              ('equity' y 'drawdown' son None si no hubo operaciones)
+    """
+    balance = engine_result['balance']
+    profit_pct = engine_result['profit_pct']
+    total_trades = len(balance)
+    if total_trades == 0:
+        return {
+            'final_balance': initial_balance,
+            'total_return_pct': 0,
+            'total_trades': 0,
+            'win_trades': 0,
+            'lose_trades': 0,
+            'win_rate': 0,
+            'max_drawdown': 0,
+            'equity': None,
+            'drawdown': None
+        }
+
+    final_balance = balance[-1]
+    win_trades = int(np.count_nonzero(profit_pct > 0))
+
+    # Curva de equity marcada a mercado y drawdown en tiempo lineal
+    equity = build_equity_curve(
+        close, engine_result['entry_idx'], engine_result['exit_idx'], balance, initial_balance,
+        engine_result['exit_price'], engine_result['entry_price']
+    )
+    drawdown = compute_drawdown(equity)
+
+    return {
+        'final_balance': final_balance,
+        'total_return_pct': (final_balance - initial_balance) / initial_balance * 100,
+        'total_trades': total_trades,
+        'win_trades': win_trades,
+        'lose_trades': total_trades - win_trades,
+        'win_rate': win_trades / total_trades * 100,
+        'max_drawdown': drawdown.min(),
+        'equity': equity,
+        'drawdown': drawdown
+    }
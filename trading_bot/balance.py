@@ -0,0 +1,129 @@
+import time
+import logging
+import threading
+
+logger = logging.getLogger("TradingBot")
+
+
+class BalanceCache:
+    """
+    Balance de la cuenta en memoria, refrescado en segundo plano
+
+    Un hilo consulta `fetch_balance` cada `refresh_interval` segundos y el
+    tamaño de las posiciones se calcula con el último balance conocido, sin
+    esperar al exchange. Para que varios símbolos que comparten el mismo
+    balance no cuenten dos veces el mismo saldo, cada compra reserva su
+    importe. Tras ejecutar la orden, `invalidate(reserva)` fuerza un refresco
+    y la reserva se descarta cuando llega un balance consultado después de
+    la orden, que ya la refleja.
+    """
+
+    def __init__(self, exchange, refresh_interval=30.0):
+        self.exchange = exchange
+        self.refresh_interval = refresh_interval
+        self.updated_at = None
+        self.last_error = None
+        self._balance = None
+        self._reservations = {}
+        self._filled = set()
+        self._sequence = 0
+        self._lock = threading.Lock()
+        self._wake = threading.Event()
+        self._ready = threading.Event()
+        self._stopping = False
+        self._thread = None
+
+    def start(self):
+        """Arranca el hilo de refresco si no está en marcha"""
+        with self._lock:
+            if self._thread is not None and self._thread.is_alive():
+                return
+            self._stopping = False
+            self._thread = threading.Thread(target=self._run, name='BalanceCache', daemon=True)
+            self._thread.start()
+
+    def stop(self):
+        """Detiene el hilo de refresco"""
+        self._stopping = True
+        self._wake.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+
+    def _run(self):
+        while not self._stopping:
+            try:
+                self.refresh()
+            except Exception as e:
+                self.last_error = e
+                logger.warning(f"No se pudo actualizar el balance: {e}")
+            self._wake.wait(self.refresh_interval)
+            self._wake.clear()
+
+    def refresh(self):
+        """Consulta el balance en el exchange y descarta las reservas ya reflejadas"""
+        with self._lock:
+            filled = set(self._filled)
+        balance = self.exchange.fetch_balance()
+        with self._lock:
+            self._balance = balance
+            for reservation in filled:
+                self._reservations.pop(reservation, None)
+            self._filled -= filled
+            self.updated_at = time.time()
+            self.last_error = None
+        self._ready.set()
+
+    def invalidate(self, reservation=None):
+        """
+        Marca el balance como desactualizado (p. ej. tras una orden) y lo refresca ya
+
+        Args:
+            reservation (int): Reserva cuya orden se ha ejecutado, que se
+                descarta con el siguiente balance
+        """
+        if reservation is not None:
+            with self._lock:
+                self._filled.add(reservation)
+        self.start()
+        self._wake.set()
+
+    def _free(self, currency):
+        free = self._balance.get('free', {}).get(currency)
+        if free is None:
+            free = self._balance.get('total', {}).get(currency) or 0
+        reserved = sum(amount for code, amount in self._reservations.values() if code == currency)
+        return max(free - reserved, 0.0)
+
+    def available(self, currency='USDT', timeout=10.0):
+        """
+        Saldo disponible (libre menos reservado) según el último balance
+
+        Solo la primera llamada espera, como máximo `timeout` segundos, a
+        que llegue el primer balance.
+        """
+        self.start()
+        if not self._ready.wait(timeout):
+            raise TimeoutError(f"Balance no disponible: {self.last_error}")
+        with self._lock:
+            return self._free(currency)
+
+    def reserve(self, currency, amount, timeout=10.0):
+        """
+        Reserva hasta `amount` del saldo disponible
+
+        Returns:
+            tuple: (identificador de la reserva, importe reservado)
+        """
+        self.available(currency, timeout)
+        with self._lock:
+            amount = min(amount, self._free(currency))
+            self._sequence += 1
+            self._reservations[self._sequence] = (currency, amount)
+            return self._sequence, amount
+
+    def release(self, reservation):
+        """Anula una reserva cuya orden no llegó a ejecutarse"""
+        with self._lock:
+            self._reservations.pop(reservation, None)
+            self._filled.discard(reservation)
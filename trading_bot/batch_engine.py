@@ -0,0 +1,328 @@
+import numpy as np
+from .kernels import (
+    ema,
+    sma,
+    rsi,
+    rolling_std,
+    crossover_signal,
+    threshold_signal,
+    band_signal,
+    series_cache
+)
+from .backtest_engine import fill_at
+
+
+def build_signal_matrix(close, param_sets, start=0, stop=None, cache=None, fingerprint=None):
+    """
+    Construye la matriz de señales (velas, combinaciones) de un lote de parámetros
+
+    Cada media, RSI y banda de Bollinger distinta se calcula una sola vez
+    sobre todo `close` (incluidas las velas de calentamiento) y las señales
+    de cada combinación se obtienen indexando esas series, de modo que el
+    coste depende del número de periodos distintos y no del de combinaciones.
+    La matriz se guarda por columnas (orden Fortran): las velas de cada
+    combinación son contiguas en memoria.
+
+    Args:
+        close (np.ndarray): Precios de cierre
+        param_sets (list): Diccionarios con todos los parámetros de la estrategia
+        start (int): Primera vela del backtest
+        stop (int): Vela final del backtest (excluida)
+        cache (IndicatorCache): Caché opcional de series ya calculadas
+        fingerprint (str): Huella de `close`
+
+    Returns:
+        np.ndarray: Señales int8 (velas del periodo, combinaciones)
+    """
+    return combine_components(*signal_components(close, param_sets, start, stop, cache, fingerprint))
+
+
+def signal_components(close, param_sets, start=0, stop=None, cache=None, fingerprint=None):
+    """
+    Señales distintas de cruce de medias, RSI y bandas de un conjunto de combinaciones
+
+    Las combinaciones que solo cambian umbrales de otro componente comparten
+    la misma fila, así que las filas son muchas menos que las combinaciones
+    y se pueden calcular una vez (p. ej. sobre toda la serie) y recortar
+    después a cada periodo con `combine_components`.
+
+    Returns:
+        tuple: (filas int8 (señales distintas, velas de [start, stop)),
+                índices (combinaciones, 3) de la fila de cruce, RSI y bandas
+                de cada combinación)
+    """
+    close = np.ascontiguousarray(close, dtype=np.float64)
+    cached = series_cache(close, cache, fingerprint)
+    window = close[start:stop]
+
+    # Cada señal distinta se guarda una vez como fila int8; las combinaciones la indexan
+    rows = {}
+    index = np.empty((len(param_sets), 3), dtype=np.int64)
+
+    def row_for(key, compute):
+        if key not in rows:
+            rows[key] = (len(rows), compute().astype(np.int8))
+        return rows[key][0]
+
+    for position, params in enumerate(param_sets):
+        use_ema = params['use_ema']
+        ma_name = 'ema' if use_ema else 'sma'
+        fast, slow = params['fast_ma'], params['slow_ma']
+
+        def ma_crossover():
+            moving_average = ema if use_ema else sma
+            ma_fast = cached(ma_name, (fast,), lambda: moving_average(close, fast))
+            ma_slow = cached(ma_name, (slow,), lambda: moving_average(close, slow))
+            return cached(
+                'ma_crossover', (ma_name, fast, slow), lambda: crossover_signal(ma_fast, ma_slow)
+            )[start:stop]
+
+        rsi_period = params['rsi_period']
+        oversold, overbought = params['rsi_oversold'], params['rsi_overbought']
+
+        def rsi_signal():
+            values = cached('rsi', (rsi_period,), lambda: rsi(close, rsi_period))[start:stop]
+            return threshold_signal(values, oversold, overbought)
+
+        bb_period, bb_std = params['bb_period'], params['bb_std']
+
+        def bb_signal():
+            middle = cached('sma', (bb_period,), lambda: sma(close, bb_period))[start:stop]
+            deviation = cached(
+                'rolling_std', (bb_period,), lambda: rolling_std(close, bb_period)
+            )[start:stop]
+            return band_signal(window, middle + bb_std * deviation, middle - bb_std * deviation)
+
+        index[position] = (
+            row_for(('ma', ma_name, fast, slow), ma_crossover),
+            row_for(('rsi', rsi_period, oversold, overbought), rsi_signal),
+            row_for(('bb', bb_period, bb_std), bb_signal)
+        )
+
+    if not rows:
+        return np.zeros((0, len(window)), dtype=np.int8), index
+    return np.stack([row for _, row in rows.values()]), index
+
+
+def combine_components(rows, index, start=0, stop=None):
+    """
+    Matriz de señales (velas, combinaciones) a partir de `signal_components`
+
+    Args:
+        rows (np.ndarray): Filas de señales de `signal_components`
+        index (np.ndarray): Índices (combinaciones, 3) de sus filas
+        start (int): Primera vela de `rows` del periodo
+        stop (int): Vela final de `rows` del periodo (excluida)
+
+    Returns:
+        np.ndarray: Señales int8 (velas del periodo, combinaciones)
+    """
+    rows = rows[:, start:stop]
+
+    # Misma regla que combine_signals: cruce + 0.5 * rsi + 0.5 * bb, escalado por 2
+    score = rows[index[:, 0]]
+    score *= 2
+    score += rows[index[:, 1]]
+    score += rows[index[:, 2]]
+    signals = (score >= 2).view(np.int8) - (score <= -2).view(np.int8)
+    return signals.T
+
+
+def batch_position_state(signals):
+    """
+    Estado de la posición (1 = long, 0 = fuera) de cada columna de una matriz de señales
+
+    Cada señal distinta de cero se codifica como 2 * vela + (1 si es compra)
+    y el máximo acumulado da, en cada vela, la última señal y su sentido.
+    """
+    rows = np.ascontiguousarray(signals.T)
+    n = rows.shape[1]
+    bars = np.arange(n, dtype=np.int32 if 2 * n < 2 ** 31 else np.int64) * 2
+    code = np.where(rows != 0, bars + (rows > 0), -2)
+    np.maximum.accumulate(code, axis=1, out=code)
+    return np.bitwise_and(code, 1).astype(np.int8).T
+
+
+def _signal_trades(signals):
+    """
+    Operaciones de cada columna saliendo solo con la señal de venta
+
+    Returns:
+        tuple: (combinación, vela de entrada, vela de salida) de cada operación,
+               ordenadas por combinación y vela
+    """
+    n = signals.shape[0]
+    state = batch_position_state(signals).T.view(bool)
+    entry_marks = state.copy()
+    entry_marks[:, 1:] &= ~state[:, :-1]
+    exit_marks = np.zeros_like(state)
+    exit_marks[:, 1:] = state[:, :-1] & ~state[:, 1:]
+    # Las posiciones abiertas se cierran en la última vela
+    exit_marks[:, -1] |= state[:, -1]
+
+    entry_combo, entry_bar = np.divmod(np.flatnonzero(entry_marks), n)
+    exit_bar = np.flatnonzero(exit_marks) % n
+    return entry_combo, entry_bar, exit_bar
+
+
+def _level_trades(signals, level_exits):
+    """
+    Operaciones de cada columna con salidas por stop loss y take profit
+
+    Misma lógica que `run_event_backtest`: se entra con la primera compra
+    desde la vela siguiente a la última salida y se sale con el primer
+    nivel tocado (ver `level_exit_table`) o con la siguiente señal de
+    venta si llega antes. Cada iteración abre una operación en todas las
+    columnas a la vez, así que el bucle es por operación y no por vela.
+
+    Returns:
+        tuple: (combinación, número de operación, vela de entrada, vela de
+               salida, True si salió por un nivel) de cada operación
+    """
+    n, combos = signals.shape
+    level_bar, _ = level_exits
+    rows = np.ascontiguousarray(signals.T)
+    index_dtype = np.int32 if n < 2 ** 31 - 1 else np.int64
+    bars = np.arange(n, dtype=index_dtype)
+
+    def next_signal(value):
+        """Primera vela >= b con la señal `value` en cada columna (n si no hay), para b en [0, n]"""
+        following = np.full((combos, n + 1), n, dtype=index_dtype)
+        np.copyto(following[:, :n], bars, where=rows == value)
+        reversed_view = following[:, ::-1]
+        np.minimum.accumulate(reversed_view, axis=1, out=reversed_view)
+        return following
+
+    next_buy = next_signal(1)
+    next_sell = next_signal(-1)
+
+    trades = []
+    active = np.arange(combos)
+    position = np.zeros(combos, dtype=np.int64)
+    number = 0
+    while active.size:
+        entry = next_buy[active, position].astype(np.int64)
+        opened = entry < n
+        active, entry = active[opened], entry[opened]
+        if not active.size:
+            break
+        number += 1
+        # Sin venta posterior se sale en la última vela
+        signal_exit = np.minimum(next_sell[active, entry + 1], n - 1)
+        by_level = level_bar[entry] <= signal_exit
+        exit_bar = np.where(by_level, level_bar[entry], signal_exit)
+        trades.append((active, np.full(active.size, number), entry, exit_bar, by_level))
+        position = exit_bar + 1
+        keep = position < n
+        active, position = active[keep], position[keep]
+
+    if not trades:
+        empty = np.zeros(0, dtype=np.int64)
+        return empty, empty, empty, empty, np.zeros(0, dtype=bool)
+    return tuple(np.concatenate(column) for column in zip(*trades))
+
+
+def run_batch_backtest(close, signals, initial_balance=1000, entry_factor=1.0, exit_factor=1.0,
+                       level_exits=None):
+    """
+    Ejecuta el backtest long-only de todas las columnas de una matriz de señales
+
+    Aplica por columnas la misma lógica que `run_vectorized_backtest` (o,
+    con `level_exits`, que `run_event_backtest`), `build_equity_curve` y
+    `compute_drawdown`: las operaciones de cada combinación se colocan en
+    una matriz (combinación, operación) rellenada con crecimiento 1, de
+    forma que el balance, la equity y el drawdown se obtienen con
+    operaciones sobre todas las columnas a la vez y con los mismos
+    resultados que el backtest individual.
+
+    Args:
+        close (np.ndarray): Precios de cierre del periodo
+        signals (np.ndarray): Señales (velas, combinaciones)
+        initial_balance (float): Balance inicial
+        entry_factor, exit_factor (np.ndarray o float): Multiplicadores del
+            cierre al comprar y al vender en cada vela (costes de ejecución)
+        level_exits (tuple): Salidas por stop loss / take profit de
+            `level_exit_table` sobre las velas del periodo; sin ellas solo
+            se sale con la señal de venta
+
+    Returns:
+        dict: Arrays por combinación con 'total_return_pct', 'win_rate',
+              'total_trades' y 'max_drawdown' (0 si no hubo operaciones)
+    """
+    close = np.asarray(close, dtype=np.float64)
+    n, combos = signals.shape
+    metrics = {
+        'total_return_pct': np.zeros(combos),
+        'win_rate': np.zeros(combos),
+        'total_trades': np.zeros(combos, dtype=np.int64),
+        'max_drawdown': np.zeros(combos)
+    }
+    if n == 0 or combos == 0:
+        return metrics
+
+    # Operaciones de todas las combinaciones y su precio de entrada y salida
+    if level_exits is None:
+        entry_combo, entry_bar, exit_bar = _signal_trades(signals)
+        total_trades = np.bincount(entry_combo, minlength=combos)
+        first_trade = np.concatenate(([0], np.cumsum(total_trades)[:-1]))
+        trade_number = np.arange(len(entry_bar)) - first_trade[entry_combo] + 1
+        trade_exit_price = close[exit_bar] * fill_at(exit_factor, exit_bar)
+    else:
+        entry_combo, trade_number, entry_bar, exit_bar, by_level = _level_trades(signals, level_exits)
+        total_trades = np.bincount(entry_combo, minlength=combos)
+        trade_exit_price = np.where(by_level, level_exits[1][entry_bar],
+                                    close[exit_bar] * fill_at(exit_factor, exit_bar))
+    if len(entry_bar) == 0:
+        return metrics
+    trade_entry_price = close[entry_bar] * fill_at(entry_factor, entry_bar)
+    max_trades = int(total_trades.max())
+
+    # Columna 0: antes de la primera operación; columna j: durante/tras la operación j
+    entry_price = np.ones((combos, max_trades + 1))
+    growth = np.ones((combos, max_trades + 1))
+    last_bar = np.full((combos, max_trades + 1), -1, dtype=np.int64)
+    entry_price[entry_combo, trade_number] = trade_entry_price
+    growth[entry_combo, trade_number] = trade_exit_price / trade_entry_price
+    last_bar[entry_combo, trade_number] = exit_bar
+
+    # Balance tras cada operación y unidades compradas en cada entrada
+    cash = np.empty((combos, max_trades + 1))
+    cash[:, 0] = initial_balance
+    cash[:, 1:] = initial_balance * np.cumprod(growth[:, 1:], axis=1)
+    units = np.ones((combos, max_trades + 1))
+    units[:, 1:] = cash[:, :-1] / entry_price[:, 1:]
+
+    # Operación en curso (o última cerrada) en cada vela; en mercado hasta la salida incluida
+    index_dtype = np.int32 if combos * (max_trades + 1) < 2 ** 31 else np.int64
+    entry_marks = np.zeros((combos, n), dtype=bool)
+    entry_marks[entry_combo, entry_bar] = True
+    trade_done = np.cumsum(entry_marks, axis=1, dtype=index_dtype)
+    trade_done += (np.arange(combos, dtype=index_dtype) * (max_trades + 1))[:, None]
+    in_market = last_bar.ravel()[trade_done] >= np.arange(n)
+
+    # Curva de equity marcada a mercado y drawdown de todas las combinaciones
+    equity = cash.ravel()[trade_done]
+    held_value = units.ravel()[trade_done]
+    held_value *= close
+    np.copyto(equity, held_value, where=in_market)
+    # En la vela de salida la posición vale lo que se obtiene al venderla
+    equity[entry_combo, exit_bar] = units[entry_combo, trade_number] * trade_exit_price
+    peak = np.maximum.accumulate(equity, axis=1)
+    equity -= peak
+    equity /= peak
+    max_drawdown = equity.min(axis=1) * 100
+
+    traded = total_trades > 0
+    final_balance = cash[np.arange(combos), total_trades]
+    win_trades = np.count_nonzero(growth > 1, axis=1)
+
+    metrics['total_trades'] = total_trades
+    metrics['total_return_pct'][traded] = ((final_balance - initial_balance) / initial_balance * 100)[traded]
+    metrics['win_rate'][traded] = win_trades[traded] / total_trades[traded] * 100
+    metrics['max_drawdown'][traded] = max_drawdown[traded]
+    return metrics
+
+
+def combinations_per_batch(n_bars, max_cells=2 ** 21):
+    """Combinaciones por lote para que cada matriz tenga como máximo `max_cells` celdas"""
+    return max(1, max_cells // max(n_bars, 1))
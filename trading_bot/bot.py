@@ -1,8 +1,10 @@
 import pandas as pd
 import numpy as np
+import math
 import ccxt
-import time
+import asyncio
 from datetime import datetime
+from contextlib import contextmanager
 import matplotlib.pyplot as plt
 import logging
 from ta.trend import SMAIndicator, EMAIndicator
@@ -10,20 +12,52 @@ from ta.momentum import RSIIndicator
 from ta.volatility import BollingerBands
 import os
 from PyQt5.QtCore import QObject, pyqtSignal
-
-# Configuración de logging
-if not os.path.exists('logs'):
-    os.makedirs('logs')
-
-logging.basicConfig(
-    level=logging.INFO,
-    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s',
-    handlers=[
-        logging.FileHandler("logs/trading_bot.log"),
-        logging.StreamHandler()
-    ]
+from .backtest_engine import (
+    run_vectorized_backtest,
+    run_event_backtest,
+    AMBIGUITY_RULES,
+    build_trades_frame,
+    compute_backtest_metrics
+)
+from .data_store import OHLCVStore, index_to_ms
+from .backfill import backfill_store
+from .streaming import StreamingIndicators
+from .kernels import compute_indicator_columns, atr, atr_levels
+from .indicator_cache import IndicatorCache, data_fingerprint
+from .result_store import OptimizationStore, BacktestCache, params_key
+from .walk_forward import walk_forward_windows, walk_forward, stitch_equity
+from .monte_carlo import MONTE_CARLO_METHODS, monte_carlo, monte_carlo_many
+from .optimizer import (
+    PRICE_COLUMNS,
+    PARALLEL_MIN_CELLS,
+    DEFAULT_CONSTRAINTS,
+    LevelExits,
+    expand_grid,
+    count_valid,
+    constraint_checker,
+    batch_grid_search,
+    parallel_grid_search,
+    trade_returns
 )
+from .log_pipeline import configure_logging, LogBuffer
+from .live_runner import run_live
+from .balance import BalanceCache
+from .strategy import StrategyParams, STRATEGY_FIELDS
+from .costs import CostModel
+from .search import (
+    SEARCH_METHODS,
+    SearchBudget,
+    score,
+    random_search,
+    successive_halving,
+    tpe_search
+)
+
+# Configuración de logging: los registros se encolan y se escriben en segundo plano
+configure_logging(os.path.join('logs', 'trading_bot.log'))
 logger = logging.getLogger("TradingBot")
+# El filtrado por nivel lo hace el bot según la verbosidad de cada ejecución
+logger.setLevel(logging.DEBUG)
 
 class CryptoTradingBot(QObject):
     # Señales para comunicarse con la interfaz gráfica
@@ -38,7 +72,8 @@ class CryptoTradingBot(QObject):
     def __init__(self, exchange_id='binance', symbol='BTC/USDT', timeframe='1h', 
                  fast_ma=20, slow_ma=50, rsi_period=14, rsi_overbought=70, 
                  rsi_oversold=30, bb_period=20, bb_std=2, risk_per_trade=0.02,
-                 use_ema=True, parent=None):
+                 use_ema=True, indicator_backend='ta', atr_period=14, stop_atr=2, target_atr=3,
+                 costs=None, exchange=None, balance=None, parent=None):
         """
         Inicializa el bot de trading
         
@@ -55,29 +90,63 @@ class CryptoTradingBot(QObject):
             bb_std (int): Desviación estándar para las Bandas de Bollinger
             risk_per_trade (float): Porcentaje de riesgo por operación (0.02 = 2%)
             use_ema (bool): Usar EMA en lugar de SMA
+            indicator_backend (str): Motor de indicadores ('numpy' o 'ta')
+            atr_period (int): Período del ATR para el stop loss y el take profit
+            stop_atr (float): Distancia del stop loss en múltiplos de ATR
+            target_atr (float): Distancia del take profit en múltiplos de ATR
+            costs (CostModel o dict): Comisiones, slippage y spread de los
+                backtests y las optimizaciones (por defecto, sin costes)
+            exchange: Instancia de ccxt a compartir con otros bots (por defecto se crea una)
+            balance (BalanceCache): Balance a compartir con otros bots de la misma cuenta
             parent: Objeto padre para las señales Qt
         """
         super().__init__(parent)
         
         self.exchange_id = exchange_id
-        self.exchange = getattr(ccxt, exchange_id)({
-            'enableRateLimit': True,
-        })
+        if exchange is None:
+            exchange = getattr(ccxt, exchange_id)({
+                'enableRateLimit': True,
+            })
+        self.exchange = exchange
         self.symbol = symbol
         self.timeframe = timeframe
         
-        # Parámetros de la estrategia
-        self.fast_ma = fast_ma
-        self.slow_ma = slow_ma
-        self.rsi_period = rsi_period
-        self.rsi_overbought = rsi_overbought
-        self.rsi_oversold = rsi_oversold
-        self.bb_period = bb_period
-        self.bb_std = bb_std
-        self.use_ema = use_ema
-        
-        # Gestión de riesgos
+        # Parámetros de la estrategia (inmutables; los atributos sueltos son propiedades)
+        self.strategy = StrategyParams(
+            fast_ma=fast_ma,
+            slow_ma=slow_ma,
+            rsi_period=rsi_period,
+            rsi_overbought=rsi_overbought,
+            rsi_oversold=rsi_oversold,
+            bb_period=bb_period,
+            bb_std=bb_std,
+            use_ema=use_ema,
+            atr_period=atr_period,
+            stop_atr=stop_atr,
+            target_atr=target_atr
+        )
+        self.indicator_backend = indicator_backend
+        self.costs = costs if isinstance(costs, CostModel) else CostModel.from_dict(costs)
+        
+        # Gestión de riesgos: el balance se consulta en segundo plano solo al operar en real
         self.risk_per_trade = risk_per_trade
+        self.balance = balance or BalanceCache(self.exchange)
+        self._reservation = None
+        
+        # Almacén local de velas, caché de indicadores compartida entre backtests y resultados de optimización
+        self.data_store = OHLCVStore()
+        self.indicator_cache = IndicatorCache()
+        self.optimization_store = OptimizationStore()
+        self.backtest_cache = BacktestCache()
+        
+        # Estado incremental de indicadores para el modo en vivo
+        self.live_indicators = None
+        self._live_cancel = None
+        
+        # Verbosidad: los mensajes por debajo de este nivel van al buffer en memoria
+        self.verbosity = logging.INFO
+        self.run_log = LogBuffer()
+        self._run_depth = 0
         
         # Estado del trading
         self.position = None
@@ -90,45 +159,190 @@ class CryptoTradingBot(QObject):
         
         self.log_info(f"Bot inicializado para {symbol} en {exchange_id} con timeframe {timeframe}")
     
+    @classmethod
+    def create_many(cls, symbols, exchange_id='binance', timeframe='1h', **kwargs):
+        """
+        Crea un bot por símbolo con la misma configuración
+        
+        Todos los bots comparten la instancia de ccxt (y por tanto los
+        mercados cargados y el control de rateLimit) y el balance de la
+        cuenta, pensados para ejecutarse juntos en un `LiveRunner`.
+        
+        Returns:
+            list: Bots creados, en el orden de `symbols`
+        """
+        exchange = kwargs.pop('exchange', None) or getattr(ccxt, exchange_id)({
+            'enableRateLimit': True,
+        })
+        balance = kwargs.pop('balance', None) or BalanceCache(exchange)
+        return [
+            cls(exchange_id=exchange_id, symbol=symbol, timeframe=timeframe, exchange=exchange,
+                balance=balance, **kwargs)
+            for symbol in symbols
+        ]
+    
     def log_info(self, message):
         """Registra información y emite la señal para la interfaz gráfica"""
-        logger.info(message)
-        self.signal_log.emit(message)
+        self._log(logging.INFO, message)
     
     def log_error(self, message):
         """Registra errores y emite la señal para la interfaz gráfica"""
-        logger.error(message)
-        self.signal_log.emit(f"ERROR: {message}")
+        self._log(logging.ERROR, message)
+    
+    def log_warning(self, message):
+        """Registra avisos y emite la señal para la interfaz gráfica"""
+        self._log(logging.WARNING, message)
+    
+    def log_event(self, message):
+        """Registra un evento de backtest u optimización (operaciones, combinaciones)"""
+        self._log(logging.DEBUG, message)
+    
+    def _log(self, level, message):
+        """Envía el mensaje al log y a la interfaz, o al buffer si está por debajo de la verbosidad"""
+        if level < self.verbosity:
+            self.run_log.append(level, message)
+            return
+        logger.log(level, message)
+        if level >= logging.ERROR:
+            message = f"ERROR: {message}"
+        elif level >= logging.WARNING:
+            message = f"AVISO: {message}"
+        self.signal_log.emit(message)
     
-    def fetch_ohlcv_data(self, limit=500):
-        """Obtiene datos históricos de velas OHLCV"""
+    @contextmanager
+    def log_run(self, verbosity=None):
+        """
+        Contexto de una ejecución (backtest u optimización) con su propia verbosidad
+        
+        Los mensajes por debajo de `verbosity` se guardan en `self.run_log` en
+        lugar de escribirse en el log y enviarse a la interfaz; con `None` se
+        mantiene la verbosidad actual. El buffer se vacía al empezar la
+        ejecución más externa, de modo que contiene los eventos de la última.
+        """
+        if self._run_depth == 0:
+            self.run_log.clear()
+        self._run_depth += 1
+        previous = self.verbosity
+        if verbosity is not None:
+            self.verbosity = verbosity
         try:
-            self.log_info(f"Obteniendo datos OHLCV para {self.symbol} ({self.timeframe})")
-            ohlcv = self.exchange.fetch_ohlcv(self.symbol, self.timeframe, limit=limit)
-            df = pd.DataFrame(ohlcv, columns=['timestamp', 'open', 'high', 'low', 'close', 'volume'])
-            df['timestamp'] = pd.to_datetime(df['timestamp'], unit='ms')
-            df.set_index('timestamp', inplace=True)
-            return df
+            yield self.run_log
+        finally:
+            self.verbosity = previous
+            self._run_depth -= 1
+    
+    def _log_events(self, messages):
+        """Registra una secuencia de eventos; si van al buffer se añaden de una vez"""
+        if logging.DEBUG < self.verbosity:
+            self.run_log.extend(logging.DEBUG, messages)
+            return
+        for message in messages:
+            self.log_event(message)
+    
+    def fetch_ohlcv_data(self, limit=500, refresh=True):
+        """
+        Obtiene datos históricos de velas OHLCV desde el almacén local
+        
+        Args:
+            limit (int): Número de velas más recientes a devolver
+            refresh (bool): Sincronizar antes con el exchange (solo descarga velas nuevas)
+        """
+        try:
+            if refresh:
+                self.log_info(f"Obteniendo datos OHLCV para {self.symbol} ({self.timeframe})")
+                try:
+                    self.data_store.sync(self.exchange, self.symbol, self.timeframe, limit=limit)
+                except ccxt.BaseError as e:
+                    # Sin conexión se trabaja con los datos locales si existen
+                    if self.data_store.last_timestamp(self.exchange_id, self.symbol, self.timeframe) is None:
+                        raise
+                    self.log_error(f"No se pudo sincronizar con el exchange, usando datos locales: {e}")
+            
+            return self.data_store.get_dataframe(self.exchange_id, self.symbol, self.timeframe, limit=limit)
         except Exception as e:
             self.log_error(f"Error al obtener datos OHLCV: {e}")
             return None
     
-    def add_indicators(self, df):
-        """Añade indicadores técnicos al DataFrame"""
+    def fetch_ohlcv_range(self, start_date, end_date=None, warmup_bars=0, refresh=True):
+        """
+        Obtiene las velas de un rango de fechas desde el almacén local
+        
+        Los tramos que faltan en el almacén se descargan en paralelo mediante
+        paginación con `since`, de modo que rangos de varios años no quedan
+        limitados a las últimas 1000 velas.
+        
+        Args:
+            start_date: Fecha inicial del rango
+            end_date: Fecha final del rango (None = hasta ahora)
+            warmup_bars (int): Velas adicionales antes del inicio para calentar los indicadores
+            refresh (bool): Descargar del exchange los tramos que falten
+        """
+        try:
+            timeframe_ms = int(self.exchange.parse_timeframe(self.timeframe) * 1000)
+            since_ms = int(pd.Timestamp(start_date).value // 10**6) - warmup_bars * timeframe_ms
+            until_ms = int(pd.Timestamp(end_date).value // 10**6) if end_date else self.exchange.milliseconds()
+            
+            if refresh:
+                self.log_info(f"Obteniendo datos OHLCV para {self.symbol} ({self.timeframe}) desde {start_date}")
+                try:
+                    backfill_store(self.data_store, self.exchange, self.symbol, self.timeframe, since_ms, until_ms)
+                except ccxt.BaseError as e:
+                    if self.data_store.last_timestamp(self.exchange_id, self.symbol, self.timeframe) is None:
+                        raise
+                    self.log_error(f"No se pudo sincronizar con el exchange, usando datos locales: {e}")
+            
+            return self.data_store.get_range_dataframe(
+                self.exchange_id, self.symbol, self.timeframe, since_ms, until_ms
+            )
+        except Exception as e:
+            self.log_error(f"Error al obtener datos OHLCV: {e}")
+            return None
+    
+    def _warmup_bars(self, param_grid=None, params=None):
+        """Velas necesarias antes del inicio del backtest para estabilizar los indicadores"""
+        params = params or self.strategy
+        periods = [params.fast_ma, params.slow_ma, params.rsi_period, params.bb_period, params.atr_period]
+        for param in ('fast_ma', 'slow_ma', 'rsi_period', 'bb_period', 'atr_period'):
+            if param_grid and param in param_grid:
+                periods.extend(param_grid[param])
+        return 3 * max(periods)
+    
+    def add_indicators(self, df, backend=None, params=None):
+        """
+        Añade indicadores técnicos al DataFrame
+        
+        Args:
+            df (pd.DataFrame): Velas OHLCV
+            backend (str): 'numpy' usa los kernels vectorizados de `kernels.py`,
+                'ta' la librería ta. Por defecto, el configurado en el bot.
+            params (StrategyParams): Parámetros a usar (por defecto, `self.strategy`)
+        """
+        backend = backend or self.indicator_backend
+        params = params or self.strategy
+        if backend == 'numpy':
+            columns = compute_indicator_columns(
+                df['close'].to_numpy(),
+                cache=self.indicator_cache,
+                **params.signal_params()
+            )
+            for name, values in columns.items():
+                df[name] = values
+            return self._add_atr_columns(df, params)
+        
         # Medias Móviles
-        if self.use_ema:
-            df['ma_fast'] = EMAIndicator(close=df['close'], window=self.fast_ma).ema_indicator()
-            df['ma_slow'] = EMAIndicator(close=df['close'], window=self.slow_ma).ema_indicator()
+        if params.use_ema:
+            df['ma_fast'] = EMAIndicator(close=df['close'], window=params.fast_ma).ema_indicator()
+            df['ma_slow'] = EMAIndicator(close=df['close'], window=params.slow_ma).ema_indicator()
         else:
-            df['ma_fast'] = SMAIndicator(close=df['close'], window=self.fast_ma).sma_indicator()
-            df['ma_slow'] = SMAIndicator(close=df['close'], window=self.slow_ma).sma_indicator()
+            df['ma_fast'] = SMAIndicator(close=df['close'], window=params.fast_ma).sma_indicator()
+            df['ma_slow'] = SMAIndicator(close=df['close'], window=params.slow_ma).sma_indicator()
         
         # RSI
-        rsi = RSIIndicator(close=df['close'], window=self.rsi_period)
+        rsi = RSIIndicator(close=df['close'], window=params.rsi_period)
         df['rsi'] = rsi.rsi()
         
         # Bandas de Bollinger
-        bb = BollingerBands(close=df['close'], window=self.bb_period, window_dev=self.bb_std)
+        bb = BollingerBands(close=df['close'], window=params.bb_period, window_dev=params.bb_std)
         df['bb_upper'] = bb.bollinger_hband()
         df['bb_middle'] = bb.bollinger_mavg()
         df['bb_lower'] = bb.bollinger_lband()
@@ -143,8 +357,8 @@ class CryptoTradingBot(QObject):
         )
         
         # Señal de RSI
-        df['rsi_signal'] = np.where(df['rsi'] < self.rsi_oversold, 1, 
-                                   np.where(df['rsi'] > self.rsi_overbought, -1, 0))
+        df['rsi_signal'] = np.where(df['rsi'] < params.rsi_oversold, 1, 
+                                   np.where(df['rsi'] > params.rsi_overbought, -1, 0))
         
         # Señal de Bandas de Bollinger
         df['bb_signal'] = np.where(df['close'] < df['bb_lower'], 1, 
@@ -154,28 +368,133 @@ class CryptoTradingBot(QObject):
         df['signal'] = df['ma_crossover'] + 0.5 * df['rsi_signal'] + 0.5 * df['bb_signal']
         df['signal'] = np.where(df['signal'] >= 1, 1, np.where(df['signal'] <= -1, -1, 0))
         
+        return self._add_atr_columns(df, params)
+    
+    def _add_atr_columns(self, df, params):
+        """Añade el ATR y los niveles de stop loss y take profit de una entrada en cada vela"""
+        df['atr'] = atr(df['high'].to_numpy(), df['low'].to_numpy(), df['close'].to_numpy(), params.atr_period)
+        df['stop_loss'], df['take_profit'] = atr_levels(
+            df['close'].to_numpy(), df['atr'].to_numpy(), params.stop_atr, params.target_atr
+        )
         return df
     
+    def create_streaming_indicators(self, params=None):
+        """Crea el estado incremental de indicadores con `params` (por defecto, los actuales)"""
+        params = params or self.strategy
+        return StreamingIndicators(atr_period=params.atr_period, **params.signal_params())
+    
+    def update_live_indicators(self, df):
+        """
+        Actualiza el estado incremental con las velas nuevas y evalúa la vela en curso
+        
+        Todas las velas salvo la última se consideran cerradas; solo las que
+        no se habían procesado antes se añaden al estado, en tiempo constante
+        por vela. La última vela (en curso) se evalúa sin modificar el estado.
+        
+        Returns:
+            tuple: (precio actual, señal actual, diccionario de indicadores)
+        """
+        current = self._update_live_state(
+            index_to_ms(df.index),
+            df['high'].to_numpy(),
+            df['low'].to_numpy(),
+            df['close'].to_numpy()
+        )
+        return self._live_result(current)
+    
+    def update_live_candles(self, candles):
+        """
+        Igual que `update_live_indicators` pero a partir de un array de velas
+        
+        Args:
+            candles (np.ndarray): Velas (N, 6) con el timestamp en ms, sin convertir a DataFrame
+        """
+        return self._live_result(self._update_live_candles(candles))
+    
+    def _update_live_candles(self, candles):
+        return self._update_live_state(
+            candles[:, 0].astype(np.int64), candles[:, 2], candles[:, 3], candles[:, 4]
+        )
+    
+    def _update_live_state(self, timestamps, highs, lows, closes):
+        """Añade las velas cerradas nuevas al estado y devuelve los indicadores de la última"""
+        closed = len(timestamps) - 1
+        
+        state = self.live_indicators
+        if state is not None and state.last_timestamp is not None:
+            start = np.searchsorted(timestamps[:closed], state.last_timestamp, side='right')
+            # Si la última vela procesada ya no está en los datos puede haber un hueco: reiniciar
+            if start == 0 or timestamps[start - 1] != state.last_timestamp:
+                state = None
+        else:
+            state = None
+        
+        if state is None:
+            state = self.create_streaming_indicators()
+            start = 0
+        
+        state.update_many(timestamps[start:closed], highs[start:closed], lows[start:closed], closes[start:closed])
+        self.live_indicators = state
+        
+        return state.peek(highs[-1], lows[-1], closes[-1])
+    
+    @staticmethod
+    def _live_result(current):
+        indicators = {
+            'ma_fast': current['ma_fast'],
+            'ma_slow': current['ma_slow'],
+            'rsi': current['rsi'],
+            'bb_upper': current['bb_upper'],
+            'bb_middle': current['bb_middle'],
+            'bb_lower': current['bb_lower'],
+            'signal': current['signal']
+        }
+        return current['close'], current['signal'], indicators
+    
     def calculate_position_size(self, price, stop_loss):
-        """Calcula el tamaño de la posición basado en el riesgo por operación"""
+        """
+        Calcula el tamaño de la posición basado en el riesgo por operación
+        
+        Usa el balance en caché (sin consultar al exchange) y reserva el
+        importe, de modo que otros bots de la misma cuenta no lo cuenten
+        como disponible hasta que la orden se confirme o se anule.
+        """
         try:
-            balance = self.exchange.fetch_balance()
-            usdt_balance = balance['total']['USDT']
+            usdt_balance = self.balance.available('USDT')
             risk_amount = usdt_balance * self.risk_per_trade
             stop_loss_pct = abs(price - stop_loss) / price
-            position_size = risk_amount / stop_loss_pct
-            return min(position_size, usdt_balance * 0.95)  # Máximo 95% del balance
+            position_size = min(risk_amount / stop_loss_pct, usdt_balance * 0.95)  # Máximo 95% del balance
+            self._reservation, position_size = self.balance.reserve('USDT', position_size)
+            return position_size
         except Exception as e:
             self.log_error(f"Error al calcular tamaño de posición: {e}")
             return 0
     
-    def execute_trade(self, signal, price, df, is_backtest=False):
-        """Ejecuta una operación basada en la señal"""
+    def _settle_reservation(self, filled):
+        """Confirma (la orden se ejecutó) o anula la reserva de balance pendiente"""
+        if self._reservation is None:
+            return
+        if filled:
+            self.balance.invalidate(self._reservation)
+        else:
+            self.balance.release(self._reservation)
+        self._reservation = None
+    
+    def execute_trade(self, signal, price, df, is_backtest=False, atr=None, params=None):
+        """
+        Ejecuta una operación basada en la señal
+        
+        El ATR se toma de `atr` (p. ej. el del estado incremental) o de la
+        columna 'atr' de `df` si existe; solo si no hay ninguno se calcula.
+        Los múltiplos de ATR de los niveles salen de `params` (por defecto,
+        `self.strategy`).
+        """
+        params = params or self.strategy
         if self.position is None and signal == 1:  # Señal de compra y no hay posición abierta
             # Cálculo de Stop Loss y Take Profit
-            atr = self._calculate_atr(df)
-            stop_loss = price - 2 * atr
-            take_profit = price + 3 * atr  # Relación riesgo/recompensa 1:1.5
+            if atr is None:
+                atr = df['atr'].iloc[-1] if 'atr' in df else self._calculate_atr(df, params.atr_period)
+            stop_loss, take_profit = atr_levels(price, atr, params.stop_atr, params.target_atr)
             
             position_size = 1.0 if is_backtest else self.calculate_position_size(price, stop_loss)
             if position_size > 0:
@@ -184,7 +503,7 @@ class CryptoTradingBot(QObject):
                     if not is_backtest:
                         # Comentado por seguridad, descomentarlo para operar en vivo
                         # self.exchange.create_market_buy_order(self.symbol, position_size)
-                        pass
+                        self._settle_reservation(filled=True)
                     
                     self.position = "long"
                     self.entry_price = price
@@ -204,7 +523,10 @@ class CryptoTradingBot(QObject):
                     self.signal_trade_executed.emit(trade_info)
                     return True
                 except Exception as e:
+                    self._settle_reservation(filled=False)
                     self.log_error(f"Error al ejecutar orden de compra: {e}")
+            else:
+                self._settle_reservation(filled=False)
         
         elif self.position == "long":
             # Verificar Stop Loss o Take Profit
@@ -214,7 +536,7 @@ class CryptoTradingBot(QObject):
                     if not is_backtest:
                         # Comentado por seguridad, descomentarlo para operar en vivo
                         # self.exchange.create_market_sell_order(self.symbol, position_size)
-                        pass
+                        self.balance.invalidate()
                     
                     profit_pct = (price - self.entry_price) / self.entry_price * 100
                     
@@ -236,137 +558,72 @@ class CryptoTradingBot(QObject):
         
         return False
     
-    def _calculate_atr(self, df, period=14):
-        """Calcula el Average True Range para determinar stop loss"""
-        high = df['high']
-        low = df['low']
-        close = df['close'].shift(1)
-        
-        tr1 = high - low
-        tr2 = abs(high - close)
-        tr3 = abs(low - close)
+    def _calculate_atr(self, df, period=None):
+        """Calcula el Average True Range de la última vela para determinar stop loss"""
+        period = period or self.strategy.atr_period
+        # Solo influyen las últimas `period` velas y el cierre anterior a ellas
+        tail = df.iloc[-(period + 1):]
+        return atr(tail['high'].to_numpy(), tail['low'].to_numpy(), tail['close'].to_numpy(), period)[-1]
+    
+    def backtest(self, start_date=None, end_date=None, initial_balance=1000, refresh_data=True,
+                 verbosity=None, intrabar_stops=True, ambiguity='stop', params=None, use_cache=True):
+        """
+        Realiza un backtest de la estrategia
         
-        tr = pd.DataFrame({'tr1': tr1, 'tr2': tr2, 'tr3': tr3}).max(axis=1)
-        atr = tr.rolling(period).mean().iloc[-1]
-        return atr
+        Args:
+            params (StrategyParams): Parámetros a probar (por defecto, `self.strategy`);
+                el bot no se modifica, así que varios backtests pueden compartirlo
+            verbosity (int): Nivel de log de esta ejecución; las operaciones se
+                registran como eventos (DEBUG) y por defecto van a `self.run_log`
+            intrabar_stops (bool): Salir también por stop loss / take profit
+                según el máximo y el mínimo de cada vela, como en vivo; con
+                False solo se sale con la señal de venta
+            ambiguity (str): Si una vela toca ambos niveles: 'stop', 'target' o 'nearest'
+            use_cache (bool): Reutilizar el resultado guardado en `self.backtest_cache`
+                si ya se hizo el mismo backtest sobre las mismas velas
+        """
+        with self.log_run(verbosity):
+            return self._run_backtest(start_date, end_date, initial_balance, refresh_data,
+                                      intrabar_stops, ambiguity, params, use_cache)
     
-    def backtest(self, start_date=None, end_date=None, initial_balance=1000):
-        """Realiza un backtest de la estrategia"""
+    def _run_backtest(self, start_date, end_date, initial_balance, refresh_data,
+                      intrabar_stops=True, ambiguity='stop', params=None, use_cache=True):
+        """Cuerpo de `backtest`"""
+        params = params or self.strategy
         self.log_info(f"Iniciando backtest desde {start_date} hasta {end_date} con balance inicial de {initial_balance}")
         
-        df = self.fetch_ohlcv_data(limit=1000)
+        if start_date:
+            df = self.fetch_ohlcv_range(start_date, end_date, self._warmup_bars(params=params), refresh=refresh_data)
+        else:
+            df = self.fetch_ohlcv_data(limit=1000, refresh=refresh_data)
         if df is None or df.empty:
             self.log_error("No hay datos para hacer backtest")
             return None, None
         
-        df = self.add_indicators(df)
-        
-        if start_date:
-            df = df[df.index >= start_date]
-        if end_date:
-            df = df[df.index <= end_date]
-        
-        # Preparar resultados
-        balance = initial_balance
-        position = None
-        entry_price = 0
-        trades = []
-        
-        total_rows = len(df)
+        # La clave incluye la huella de las velas: al sincronizar velas nuevas cambia sola
+        cache_key = None
+        cached = None
+        if use_cache:
+            cache_key = self._backtest_cache_key(df, params, start_date, end_date, initial_balance,
+                                                 intrabar_stops, ambiguity)
+            cached = self.backtest_cache.get(cache_key)
         
-        for i, (idx, row) in enumerate(df.iterrows()):
-            # Informar progreso
-            if i % 10 == 0:  # Cada 10 iteraciones
-                self.signal_backtest_progress.emit(i, total_rows)
-            
-            price = row['close']
-            signal = row['signal']
-            
-            # Lógica de compra
-            if position is None and signal == 1:
-                entry_price = price
-                position_size = balance / price
-                position = position_size
-                self.log_info(f"Backtest - COMPRA: {idx}, Precio: {price:.2f}, Balance: {balance:.2f}")
-            
-            # Lógica de venta
-            elif position is not None and signal == -1:
-                exit_price = price
-                profit = position * (exit_price - entry_price)
-                balance += profit
-                trades.append({
-                    'entry_date': entry_price.index if hasattr(entry_price, 'index') else idx,
-                    'exit_date': idx,
-                    'entry_price': entry_price,
-                    'exit_price': exit_price,
-                    'profit_pct': (exit_price - entry_price) / entry_price * 100,
-                    'balance': balance
-                })
-                position = None
-                self.log_info(f"Backtest - VENTA: {idx}, Precio: {price:.2f}, Balance: {balance:.2f}")
-        
-        # Cerrar posición final si existe
-        if position is not None:
-            exit_price = df.iloc[-1]['close']
-            profit = position * (exit_price - entry_price)
-            balance += profit
-            trades.append({
-                'entry_date': entry_price.index if hasattr(entry_price, 'index') else df.index[-1],
-                'exit_date': df.index[-1],
-                'entry_price': entry_price,
-                'exit_price': exit_price,
-                'profit_pct': (exit_price - entry_price) / entry_price * 100,
-                'balance': balance
-            })
+        if cached is not None:
+            self.log_info("Resultado recuperado de la caché de backtests")
+            # Solo se guarda el resultado: los indicadores se recalculan (con la caché de indicadores)
+            df, _ = self._backtest_frame(df, params, start_date, end_date)
+            backtest_results = self._restore_results(cached['results'], df.index)
+            self.signal_backtest_progress.emit(len(df), len(df))
+        else:
+            backtest_results, df = self._simulate_backtest(df, params, start_date, end_date, initial_balance,
+                                                           intrabar_stops, ambiguity)
+            if cache_key is not None:
+                self.backtest_cache.put(cache_key, {'results': self._compact_results(backtest_results)})
         
-        # Calcular métricas de rendimiento
-        if trades:
-            trades_df = pd.DataFrame(trades)
-            total_return = (balance - initial_balance) / initial_balance * 100
-            win_trades = trades_df[trades_df['profit_pct'] > 0]
-            lose_trades = trades_df[trades_df['profit_pct'] <= 0]
-            win_rate = len(win_trades) / len(trades_df) * 100 if len(trades_df) > 0 else 0
-            
-            # Calcular drawdown
-            equity_curve = pd.Series(index=df.index)
-            current_balance = initial_balance
-            
-            for i, row in df.iterrows():
-                for trade in trades:
-                    entry_date = trade['entry_date']
-                    exit_date = trade['exit_date']
-                    
-                    if isinstance(entry_date, pd.Timestamp) and isinstance(exit_date, pd.Timestamp):
-                        if entry_date <= i <= exit_date:
-                            # Durante el trade
-                            current_price = row['close']
-                            profit = (current_price - trade['entry_price']) / trade['entry_price'] * 100
-                            position_value = (1 + profit/100) * initial_balance
-                            equity_curve[i] = position_value
-                
-                if pd.isna(equity_curve[i]):
-                    equity_curve[i] = current_balance
-            
-            # Calcular maximum drawdown
-            peak = equity_curve.cummax()
-            drawdown = (equity_curve - peak) / peak * 100
-            max_drawdown = drawdown.min()
-            
-            backtest_results = {
-                'initial_balance': initial_balance,
-                'final_balance': balance,
-                'total_return_pct': total_return,
-                'total_trades': len(trades_df),
-                'win_trades': len(win_trades),
-                'lose_trades': len(lose_trades),
-                'win_rate': win_rate,
-                'max_drawdown': max_drawdown,
-                'trades': trades_df,
-                'equity_curve': equity_curve,
-                'drawdown': drawdown
-            }
-            
-            self.log_info(f"Backtest completado: Retorno={total_return:.2f}%, Win Rate={win_rate:.2f}%, Max Drawdown={max_drawdown:.2f}%")
+        if backtest_results:
+            self.log_info(f"Backtest completado: Retorno={backtest_results['total_return_pct']:.2f}%, "
+                          f"Win Rate={backtest_results['win_rate']:.2f}%, "
+                          f"Max Drawdown={backtest_results['max_drawdown']:.2f}%")
             
             # Emitir señal de backtest completado
             self.signal_backtest_completed.emit(backtest_results, df)
@@ -378,6 +635,137 @@ class CryptoTradingBot(QObject):
         
         return None, df
     
+    def _backtest_cache_key(self, df, params, start_date, end_date, initial_balance, intrabar_stops, ambiguity):
+        """Clave de la caché de backtests: configuración, periodo, balance y huella de las velas"""
+        settings = dict(self.get_settings(), **params.to_dict())
+        return BacktestCache.key({
+            # Versión del formato guardado (ver `_compact_results`)
+            'format': 2,
+            'settings': settings,
+            'start_date': start_date,
+            'end_date': end_date,
+            'initial_balance': initial_balance,
+            'intrabar_stops': intrabar_stops,
+            'ambiguity': ambiguity,
+            'data': [data_fingerprint(index_to_ms(df.index)),
+                     data_fingerprint(df[list(PRICE_COLUMNS)].to_numpy())]
+        })
+    
+    def _backtest_frame(self, df, params, start_date, end_date):
+        """
+        Velas del periodo del backtest con sus indicadores
+        
+        Returns:
+            tuple: (DataFrame del periodo, máscara de sus velas en `df`)
+        """
+        df = self.add_indicators(df, params=params)
+        in_period = np.ones(len(df), dtype=bool)
+        if start_date:
+            in_period &= df.index >= start_date
+        if end_date:
+            in_period &= df.index <= end_date
+        return df[in_period], in_period
+    
+    @staticmethod
+    def _compact_results(backtest_results):
+        """Resultados del backtest con la equity y el drawdown como arrays, para la caché"""
+        if not backtest_results:
+            return None
+        return dict(backtest_results,
+                    equity_curve=backtest_results['equity_curve'].to_numpy(),
+                    drawdown=backtest_results['drawdown'].to_numpy())
+    
+    @staticmethod
+    def _restore_results(compact, index):
+        """Inverso de `_compact_results` sobre el índice de las velas del periodo"""
+        if not compact:
+            return None
+        return dict(compact,
+                    equity_curve=pd.Series(compact['equity_curve'], index=index),
+                    drawdown=pd.Series(compact['drawdown'], index=index))
+    
+    def _simulate_backtest(self, df, params, start_date, end_date, initial_balance, intrabar_stops, ambiguity):
+        """
+        Calcula indicadores, simula las operaciones y las métricas del backtest
+        
+        Returns:
+            tuple: (resultados o None si no hubo operaciones, DataFrame con indicadores)
+        """
+        # Los costes se calculan con las velas de calentamiento (el spread estimado es una media móvil)
+        fill_factors = self._fill_factors(df) or (1.0, 1.0)
+        df, in_period = self._backtest_frame(df, params, start_date, end_date)
+        entry_factor, exit_factor = (
+            factor[in_period] if np.ndim(factor) else factor for factor in fill_factors
+        )
+        
+        total_rows = len(df)
+        self.signal_backtest_progress.emit(0, total_rows)
+
+        # Simulación de entradas y salidas a partir de la señal y, opcionalmente, de los niveles SL/TP
+        close = df['close'].to_numpy()
+        if intrabar_stops:
+            engine_result = run_event_backtest(
+                df['open'].to_numpy(), df['high'].to_numpy(), df['low'].to_numpy(), close,
+                df['signal'].to_numpy(), df['stop_loss'].to_numpy(), df['take_profit'].to_numpy(),
+                initial_balance, ambiguity, entry_factor, exit_factor, self.costs.target_factor()
+            )
+        else:
+            engine_result = run_vectorized_backtest(close, df['signal'].to_numpy(), initial_balance,
+                                                    entry_factor, exit_factor)
+        metrics = compute_backtest_metrics(close, engine_result, initial_balance)
+        trades_df = build_trades_frame(df.index, engine_result)
+        # Niveles que habría fijado execute_trade en cada entrada
+        trades_df['stop_loss'] = df['stop_loss'].to_numpy()[engine_result['entry_idx']]
+        trades_df['take_profit'] = df['take_profit'].to_numpy()[engine_result['entry_idx']]
+        self._log_trade_events(trades_df, initial_balance)
+
+        self.signal_backtest_progress.emit(total_rows, total_rows)
+
+        # Calcular métricas de rendimiento
+        if not trades_df.empty:
+            return {
+                'initial_balance': initial_balance,
+                'final_balance': metrics['final_balance'],
+                'total_return_pct': metrics['total_return_pct'],
+                'total_trades': metrics['total_trades'],
+                'win_trades': metrics['win_trades'],
+                'lose_trades': metrics['lose_trades'],
+                'win_rate': metrics['win_rate'],
+                'max_drawdown': metrics['max_drawdown'],
+                'trades': trades_df,
+                'equity_curve': pd.Series(metrics['equity'], index=df.index),
+                'drawdown': pd.Series(metrics['drawdown'], index=df.index)
+            }, df
+        
+        return None, df
+    
+    def _fill_factors(self, df):
+        """
+        Multiplicadores de los precios de entrada y salida de `self.costs` en cada vela de `df`
+        
+        Returns:
+            tuple: (entrada, salida) o None si no hay costes
+        """
+        if self.costs.is_free():
+            return None
+        return self.costs.fill_factors(df['high'].to_numpy(), df['low'].to_numpy(), df['close'].to_numpy())
+    
+    def _log_trade_events(self, trades_df, initial_balance):
+        """Registra la compra y la venta de cada operación del backtest como eventos"""
+        if trades_df.empty:
+            return
+        balance_after = trades_df['balance'].to_numpy()
+        balance_before = np.concatenate(([initial_balance], balance_after[:-1]))
+        trades = zip(
+            trades_df['entry_date'].astype(str), trades_df['entry_price'], balance_before,
+            trades_df['exit_date'].astype(str), trades_df['exit_price'], balance_after
+        )
+        messages = []
+        for entry_date, entry_price, before, exit_date, exit_price, after in trades:
+            messages.append(f"Backtest - COMPRA: {entry_date}, Precio: {entry_price:.2f}, Balance: {before:.2f}")
+            messages.append(f"Backtest - VENTA: {exit_date}, Precio: {exit_price:.2f}, Balance: {after:.2f}")
+        self._log_events(messages)
+    
     def plot_backtest(self, df, backtest_results, save_path=None):
         """Grafica los resultados del backtest"""
         if not backtest_results or not df.any().any():
@@ -454,149 +842,637 @@ class CryptoTradingBot(QObject):
         
         return plt.gcf()  # Devolver la figura para mostrarla en la GUI
     
-    def optimize_parameters(self, param_grid, start_date=None, end_date=None, initial_balance=1000):
-        """Optimiza los parámetros de la estrategia mediante grid search"""
-        best_return = -float('inf')
-        best_params = None
-        results = []
+    def optimize_parameters(self, param_grid, start_date=None, end_date=None, initial_balance=1000, n_jobs=None,
+                            verbosity=None, method='grid', max_evals=None, time_budget=None, seed=None,
+                            constraints=DEFAULT_CONSTRAINTS, checkpoint=True, intrabar_stops=True,
+                            ambiguity='stop'):
+        """
+        Optimiza los parámetros de la estrategia
         
-        total_combinations = 1
-        for param_values in param_grid.values():
-            total_combinations *= len(param_values)
+        Con method='grid' se evalúan todas las combinaciones. Los demás modos
+        exploran el grid sin generarlo entero y se detienen al agotar el
+        presupuesto (`max_evals` y/o `time_budget`), informando de cada nueva
+        mejor combinación: 'random' (muestreo aleatorio), 'halving'
+        (successive halving sobre tramos crecientes del periodo) y 'tpe'
+        (muestreo guiado por los resultados anteriores).
         
-        self.log_info(f"Comenzando optimización con {total_combinations} combinaciones")
+        Las combinaciones que incumplen `constraints` (por defecto, medias
+        rápidas no menores que las lentas o sobreventa no menor que
+        sobrecompra) o repiten valores no se evalúan nunca.
         
-        # Guarda los parámetros originales para restaurarlos después
-        original_params = {}
-        for param in param_grid.keys():
-            original_params[param] = getattr(self, param)
+        Args:
+            param_grid (dict): Valores a probar para cada parámetro
+            start_date (str): Fecha de inicio del backtest
+            end_date (str): Fecha de fin del backtest
+            initial_balance (float): Balance inicial
+            n_jobs (int): Procesos para evaluar las combinaciones en paralelo
+                (por defecto, todos los núcleos si el grid es grande; 1 = en este proceso)
+            verbosity (int): Nivel de log de esta ejecución; el resultado de cada
+                combinación es un evento (DEBUG) y por defecto va a `self.run_log`
+            method (str): 'grid', 'random', 'halving' o 'tpe'
+            max_evals (int): Máximo de backtests (completos equivalentes) de los
+                modos con presupuesto
+            time_budget (float): Segundos máximos de los modos con presupuesto
+            seed (int): Semilla de los modos aleatorios
+            constraints (iterable): Restricciones entre parámetros como
+                'fast_ma < slow_ma' (los que no están en el grid toman el valor
+                actual); una lista vacía las desactiva
+            checkpoint (bool): En el grid completo, guardar cada resultado en
+                `self.optimization_store` y no repetir los ya guardados para los
+                mismos datos y periodo, de modo que una optimización
+                interrumpida continúa donde se quedó
+            intrabar_stops (bool): Salir también por stop loss / take profit,
+                como `backtest`, para que el ranking use las mismas salidas
+            ambiguity (str): Si una vela toca ambos niveles: 'stop', 'target' o 'nearest'
+        """
+        if method not in SEARCH_METHODS:
+            raise ValueError(f"Método de optimización no válido: {method}")
+        if ambiguity not in AMBIGUITY_RULES:
+            raise ValueError(f"Regla de ambigüedad no válida: {ambiguity}")
+        with self.log_run(verbosity):
+            return self._run_optimization(param_grid, start_date, end_date, initial_balance, n_jobs,
+                                          method, max_evals, time_budget, seed, constraints, checkpoint,
+                                          intrabar_stops, ambiguity)
+    
+    def _run_optimization(self, param_grid, start_date, end_date, initial_balance, n_jobs,
+                          method='grid', max_evals=None, time_budget=None, seed=None,
+                          constraints=DEFAULT_CONSTRAINTS, checkpoint=True, intrabar_stops=True,
+                          ambiguity='stop'):
+        """Cuerpo de `optimize_parameters`"""
+        # Los parámetros no incluidos en el grid son los del bot al empezar, aunque cambien durante la optimización
+        strategy = self.strategy
         
-        current_combination = 0
+        # Las restricciones se aplican antes de descargar datos o evaluar nada
+        total_combinations = math.prod(len(values) for values in param_grid.values())
+        if method == 'grid':
+            combinations = expand_grid(param_grid, constraints, strategy.to_dict())
+            self.log_info(f"Comenzando optimización con {len(combinations)} combinaciones "
+                          f"({total_combinations - len(combinations)} descartadas por restricciones o repetidas)")
+        else:
+            valid = constraint_checker(constraints, strategy.to_dict(), param_grid)
+            # En grids grandes el número de combinaciones válidas se estima por muestreo
+            n_valid, exact = count_valid(param_grid, constraints, strategy.to_dict())
+            approx = '' if exact else '~'
+            self.log_info(f"Comenzando optimización '{method}' sobre {approx}{n_valid} combinaciones "
+                          f"({approx}{total_combinations - n_valid} descartadas por restricciones o repetidas), "
+                          f"máx. {max_evals or 'auto'} evaluaciones y {time_budget or 'sin límite de'} segundos")
+            combinations = [] if exact and not n_valid else None
         
-        # Función recursiva para grid search
-        def grid_search(params, param_names, current_idx, current_params):
-            nonlocal best_return, best_params, current_combination
-            
-            if current_idx == len(param_names):
-                current_combination += 1
-                self.signal_optimization_progress.emit(current_combination, total_combinations)
-                
-                # Aplicar parámetros actuales
-                for param, value in current_params.items():
-                    setattr(self, param, value)
-                
-                # Ejecutar backtest
-                backtest_results, _ = self.backtest(start_date, end_date, initial_balance)
-                
-                # Registrar resultados
-                result_item = {
-                    'params': current_params.copy(),
-                }
-                
-                if backtest_results:
-                    result_item.update({
-                        'return': backtest_results['total_return_pct'],
-                        'win_rate': backtest_results['win_rate'],
-                        'trades': backtest_results['total_trades'],
-                        'max_drawdown': backtest_results.get('max_drawdown', 0)
-                    })
-                    
-                    if backtest_results['total_return_pct'] > best_return:
-                        best_return = backtest_results['total_return_pct']
-                        best_params = current_params.copy()
-                else:
-                    result_item.update({
-                        'return': 0,
-                        'win_rate': 0,
-                        'trades': 0,
-                        'max_drawdown': 0
-                    })
-                
-                results.append(result_item)
-                
-                self.log_info(f"Probando {current_params}: Retorno={result_item['return']:.2f}%, Win Rate={result_item['win_rate']:.2f}%")
-                return
+        if combinations is not None and not combinations:
+            self.log_error("Ninguna combinación cumple las restricciones")
+            results = []
+        else:
+            # Sincronizar las velas una sola vez; cada combinación lee del almacén local
+            if start_date:
+                df = self.fetch_ohlcv_range(start_date, end_date, self._warmup_bars(param_grid, strategy))
+            else:
+                df = self.fetch_ohlcv_data(limit=1000)
             
-            param_name = param_names[current_idx]
-            for param_value in params[param_name]:
-                current_params[param_name] = param_value
-                grid_search(params, param_names, current_idx + 1, current_params)
-        
-        # Ejecutar grid search
-        grid_search(param_grid, list(param_grid.keys()), 0, {})
+            exits = {'intrabar_stops': True, 'ambiguity': ambiguity} if intrabar_stops else None
+            if method != 'grid':
+                results = self._budgeted_search(df, param_grid, start_date, end_date, initial_balance, strategy,
+                                                method, SearchBudget(param_grid, max_evals, time_budget), seed,
+                                                valid, exits)
+            else:
+                results = self._grid_search(df, combinations, start_date, end_date, initial_balance, n_jobs,
+                                            strategy, checkpoint, exits)
         
-        # Restaurar parámetros originales
-        for param, value in original_params.items():
-            setattr(self, param, value)
+        # Mejor combinación en el orden del grid (solo las que operaron)
+        best_return = -float('inf')
+        best_params = None
+        for result_item in results:
+            if result_item['trades'] > 0 and result_item['return'] > best_return:
+                best_return = result_item['return']
+                best_params = result_item['params'].copy()
         
         # Ordenar resultados
-        results_df = pd.DataFrame(results)
+        results_df = pd.DataFrame(results, columns=['params', 'return', 'win_rate', 'trades', 'max_drawdown'])
         results_df = results_df.sort_values('return', ascending=False)
         
         self.log_info(f"Optimización completada. Mejores parámetros: {best_params} con retorno: {best_return:.2f}%")
         
         # Emitir señal de optimización completada
-        self.signal_optimization_completed.emit(best_params, results_df)
+        self.signal_optimization_completed.emit(best_params or {}, results_df)
         
         return best_params, results_df
     
+    def _serial_grid_search(self, combinations, start_date, end_date, initial_balance, strategy=None,
+                            on_result=None, exits=None):
+        """
+        Evalúa las combinaciones una a una en este proceso con backtests sobre copias de `strategy`
+        
+        `exits` es el modo de salida de `_optimization_run` (None = solo con la señal de venta).
+        """
+        strategy = strategy or self.strategy
+        total_combinations = len(combinations)
+        results = []
+        
+        for current_combination, current_params in enumerate(combinations, 1):
+            self.signal_optimization_progress.emit(current_combination, total_combinations)
+            
+            # Ejecutar backtest
+            # Los mensajes de cada backtest se tratan como eventos de la optimización
+            # Mismas salidas que el motor matricial, para que ambos motores coincidan
+            backtest_results, _ = self.backtest(
+                start_date, end_date, initial_balance, refresh_data=False,
+                verbosity=self.verbosity if self.verbosity <= logging.DEBUG else logging.WARNING,
+                params=strategy.replace(**current_params), use_cache=False, **self._exit_arguments(exits)
+            )
+            
+            # Registrar resultados
+            result_item = {
+                'params': current_params.copy(),
+            }
+            
+            if backtest_results:
+                result_item.update({
+                    'return': backtest_results['total_return_pct'],
+                    'win_rate': backtest_results['win_rate'],
+                    'trades': backtest_results['total_trades'],
+                    'max_drawdown': backtest_results.get('max_drawdown', 0)
+                })
+            else:
+                result_item.update({
+                    'return': 0,
+                    'win_rate': 0,
+                    'trades': 0,
+                    'max_drawdown': 0
+                })
+            
+            results.append(result_item)
+            if on_result is not None:
+                on_result(result_item)
+            
+            self.log_event(f"Probando {current_params}: Retorno={result_item['return']:.2f}%, Win Rate={result_item['win_rate']:.2f}%")
+        
+        self.log_info(f"Caché de indicadores: {self.indicator_cache.hits} aciertos, {self.indicator_cache.misses} cálculos")
+        return results
+    
+    def _batch_grid_search(self, df, combinations, start_date, end_date, initial_balance, n_jobs=None,
+                           strategy=None, on_result=None, exits=None):
+        """
+        Evalúa las combinaciones con el motor matricial, sin modificar el bot
+        
+        Los lotes de combinaciones se resuelven con una matriz de señales
+        (velas, combinaciones). Con `n_jobs` > 1 los lotes se reparten en un
+        pool de procesos que lee las velas de memoria compartida; por defecto
+        solo se usa el pool si el grid es grande, ya que arrancar los procesos
+        cuesta más que evaluar un grid pequeño. Los resultados se devuelven
+        en el orden del grid. `exits` es el modo de salida de `_optimization_run`.
+        """
+        total_combinations = len(combinations)
+        
+        # Mismo periodo que el backtest: las velas previas solo sirven de calentamiento
+        start = df.index.searchsorted(pd.Timestamp(start_date)) if start_date else 0
+        stop = df.index.searchsorted(pd.Timestamp(end_date), side='right') if end_date else len(df)
+        # Incluye el ATR y los múltiplos de los niveles de stop loss y take profit
+        base_params = (strategy or self.strategy).to_dict()
+        
+        if n_jobs is None:
+            cells = total_combinations * (stop - start)
+            n_jobs = (os.cpu_count() or 1) if cells >= PARALLEL_MIN_CELLS else 1
+        
+        if n_jobs > 1:
+            evaluations = parallel_grid_search(
+                df, combinations, base_params, initial_balance, start, stop, max_workers=n_jobs,
+                costs=self.costs, **self._exit_arguments(exits)
+            )
+        else:
+            evaluations = batch_grid_search(
+                df['close'].to_numpy(), combinations, base_params, initial_balance, start, stop,
+                cache=self.indicator_cache, fill_factors=self._fill_factors(df),
+                level_exits=self._level_exits(df, exits)
+            )
+        
+        results = [None] * total_combinations
+        completed = 0
+        for index, params, result in evaluations:
+            completed += 1
+            self.signal_optimization_progress.emit(completed, total_combinations)
+            results[index] = dict({'params': params}, **result)
+            if on_result is not None:
+                on_result(results[index])
+            self.log_event(f"Probando {params}: Retorno={result['return']:.2f}%, Win Rate={result['win_rate']:.2f}%")
+        
+        return results
+    
+    def _grid_search(self, df, combinations, start_date, end_date, initial_balance, n_jobs, strategy,
+                     checkpoint=True, exits=None):
+        """
+        Evalúa las combinaciones del grid que no estén ya en el almacén de resultados
+        
+        Cada resultado nuevo se guarda en cuanto se calcula; los ya guardados
+        (con el mismo modo de salida `exits`) se toman del almacén. Los
+        resultados se devuelven en el orden del grid.
+        """
+        has_data = df is not None and not df.empty
+        pending = combinations
+        stored = {}
+        run = None
+        if checkpoint and has_data:
+            run = self._optimization_run(df, start_date, end_date, initial_balance, exits)
+            keys = [params_key(strategy.replace(**params).to_dict()) for params in combinations]
+            saved = self.optimization_store.load(run)
+            stored = {index: saved[key] for index, key in enumerate(keys) if key in saved}
+            pending = [params for index, params in enumerate(combinations) if index not in stored]
+            if stored:
+                self.log_info(f"Reanudando optimización: {len(stored)} combinaciones ya evaluadas, "
+                              f"quedan {len(pending)}")
+        
+        with self._checkpoint_writer(run, strategy) as record:
+            # Los kernels dan los mismos indicadores que `ta`: el motor matricial vale para ambos backends
+            if has_data:
+                new_results = self._batch_grid_search(df, pending, start_date, end_date, initial_balance,
+                                                      n_jobs, strategy, record, exits)
+            else:
+                new_results = self._serial_grid_search(pending, start_date, end_date, initial_balance, strategy,
+                                                       record, exits)
+        
+        new_results = iter(new_results)
+        return [
+            dict({'params': params}, **stored[index]) if index in stored else next(new_results)
+            for index, params in enumerate(combinations)
+        ]
+    
+    def _optimization_run(self, df, start_date, end_date, initial_balance, exits=None):
+        """
+        Clave en el almacén de resultados de una optimización sobre `df`
+        
+        `exits` es el modo de salida, p. ej. {'intrabar_stops': True, 'ambiguity': 'stop'},
+        o None si solo se sale con la señal de venta.
+        """
+        start = df.index.searchsorted(pd.Timestamp(start_date)) if start_date else 0
+        stop = df.index.searchsorted(pd.Timestamp(end_date), side='right') if end_date else len(df)
+        # Sin costes la clave no cambia, así que se reutilizan los resultados guardados antes de tenerlos
+        costs = None if self.costs.is_free() else self.costs.to_dict()
+        run = self.optimization_store.run_key(data_fingerprint(df['close'].to_numpy()), start, stop,
+                                              initial_balance, costs, exits)
+        exit_mode = f", SL/TP '{exits['ambiguity']}'" if exits else ''
+        self.optimization_store.register(
+            run, f"{self.exchange_id} {self.symbol} {self.timeframe} {start_date} - {end_date} "
+                 f"({initial_balance}{exit_mode})"
+        )
+        return run
+    
+    @staticmethod
+    def _exit_arguments(exits):
+        """Argumentos `intrabar_stops` y `ambiguity` de un modo de salida (None = solo la señal)"""
+        return {'intrabar_stops': bool(exits), 'ambiguity': exits['ambiguity'] if exits else 'stop'}
+    
+    def _level_exits(self, df, exits):
+        """Salidas por stop loss / take profit de las velas de `df` (None si `exits` no las usa)"""
+        if not exits:
+            return None
+        return LevelExits(df['open'].to_numpy(), df['high'].to_numpy(), df['low'].to_numpy(),
+                          df['close'].to_numpy(), exits['ambiguity'], self.costs)
+    
+    @contextmanager
+    def _checkpoint_writer(self, run, strategy):
+        """Función que guarda cada resultado (dict con 'params') de la ejecución `run`; no hace nada sin `run`"""
+        if run is None:
+            yield None
+            return
+        with self.optimization_store.writer(run) as writer:
+            yield lambda item: writer.add(params_key(strategy.replace(**item['params']).to_dict()), item)
+    
+    def _budgeted_search(self, df, param_grid, start_date, end_date, initial_balance, strategy, method,
+                         budget, seed=None, valid=None, exits=None):
+        """
+        Explora el grid con un modo con presupuesto usando el motor matricial
+        
+        El progreso se emite en evaluaciones gastadas sobre el presupuesto y
+        cada nueva mejor combinación se notifica en cuanto se encuentra, así
+        que el mejor resultado hasta el momento está siempre disponible. Los
+        resultados incluyen solo las combinaciones evaluadas sobre el periodo
+        completo, con las salidas de `exits` (ver `_optimization_run`).
+        """
+        if df is None or df.empty:
+            self.log_error("No hay datos para optimizar")
+            return []
+        
+        close = df['close'].to_numpy()
+        start = df.index.searchsorted(pd.Timestamp(start_date)) if start_date else 0
+        stop = df.index.searchsorted(pd.Timestamp(end_date), side='right') if end_date else len(df)
+        length = stop - start
+        base_params = strategy.to_dict()
+        fill_factors = self._fill_factors(df)
+        level_exits = self._level_exits(df, exits)
+        
+        def evaluate(combinations, bars=length):
+            """Backtest de las combinaciones sobre las primeras `bars` velas del periodo"""
+            evaluations = batch_grid_search(close, combinations, base_params, initial_balance, start,
+                                            start + bars, cache=self.indicator_cache, fill_factors=fill_factors,
+                                            level_exits=level_exits)
+            results = [result for _, _, result in evaluations]
+            budget.spend(len(combinations) * bars / length)
+            self.signal_optimization_progress.emit(min(int(budget.spent), budget.max_evals), budget.max_evals)
+            return results
+        
+        rng = np.random.default_rng(seed)
+        if method == 'random':
+            search = random_search(evaluate, param_grid, budget, rng, valid)
+        elif method == 'halving':
+            search = successive_halving(evaluate, param_grid, budget, rng, length, valid)
+        else:
+            search = tpe_search(evaluate, param_grid, budget, rng, valid)
+        
+        results = []
+        best_score = -float('inf')
+        for params, result in search:
+            results.append(dict({'params': params}, **result))
+            self.log_event(f"Probando {params}: Retorno={result['return']:.2f}%, Win Rate={result['win_rate']:.2f}%")
+            if score(result) > best_score:
+                best_score = score(result)
+                self.log_info(f"Nuevo mejor resultado tras {budget.spent:.0f} evaluaciones: {params} "
+                              f"con retorno {result['return']:.2f}%")
+        
+        self.signal_optimization_progress.emit(budget.max_evals, budget.max_evals)
+        return results
+    
+    def walk_forward(self, param_grid, start_date=None, end_date=None, initial_balance=1000, train_bars=None,
+                     test_bars=None, folds=5, anchored=False, n_jobs=None, constraints=DEFAULT_CONSTRAINTS,
+                     verbosity=None, intrabar_stops=True, ambiguity='stop'):
+        """
+        Análisis walk-forward: optimiza en cada ventana de entrenamiento y
+        evalúa la mejor combinación en la ventana de prueba siguiente
+        
+        Las ventanas de prueba son consecutivas, así que sus resultados se
+        unen en una única curva de equity fuera de muestra. Los indicadores
+        se calculan una vez sobre todo el periodo y se reutilizan en todas
+        las ventanas; con `n_jobs` > 1 las ventanas se reparten en un pool
+        de procesos.
+        
+        Args:
+            param_grid (dict): Valores a probar para cada parámetro
+            start_date (str): Fecha de inicio del análisis
+            end_date (str): Fecha de fin del análisis
+            initial_balance (float): Balance inicial
+            train_bars (int): Velas de cada ventana de entrenamiento (por defecto, 3 veces la de prueba)
+            test_bars (int): Velas de cada ventana de prueba (por defecto, las
+                necesarias para obtener `folds` ventanas)
+            folds (int): Número de ventanas si no se indica `test_bars`
+            anchored (bool): Entrenar siempre desde el inicio del periodo en lugar de con una ventana móvil
+            n_jobs (int): Procesos para evaluar las ventanas (por defecto, todos
+                los núcleos si el cálculo es grande; 1 = en este proceso)
+            constraints (iterable): Restricciones entre parámetros (ver `optimize_parameters`)
+            verbosity (int): Nivel de log de esta ejecución
+            intrabar_stops (bool): Salir también por stop loss / take profit
+                (en el entrenamiento y en la prueba), como `backtest`
+            ambiguity (str): Si una vela toca ambos niveles: 'stop', 'target' o 'nearest'
+        
+        Returns:
+            tuple: (resumen, DataFrame con una fila por ventana, equity fuera de muestra)
+        """
+        if ambiguity not in AMBIGUITY_RULES:
+            raise ValueError(f"Regla de ambigüedad no válida: {ambiguity}")
+        with self.log_run(verbosity):
+            return self._run_walk_forward(param_grid, start_date, end_date, initial_balance, train_bars,
+                                          test_bars, folds, anchored, n_jobs, constraints, intrabar_stops,
+                                          ambiguity)
+    
+    def _run_walk_forward(self, param_grid, start_date, end_date, initial_balance, train_bars, test_bars, folds,
+                          anchored, n_jobs, constraints, intrabar_stops=True, ambiguity='stop'):
+        """Cuerpo de `walk_forward`"""
+        strategy = self.strategy
+        combinations = expand_grid(param_grid, constraints, strategy.to_dict())
+        if not combinations:
+            self.log_error("Ninguna combinación cumple las restricciones")
+            return None, None, None
+        
+        if start_date:
+            df = self.fetch_ohlcv_range(start_date, end_date, self._warmup_bars(param_grid, strategy))
+        else:
+            df = self.fetch_ohlcv_data(limit=1000)
+        if df is None or df.empty:
+            self.log_error("No hay datos para el walk-forward")
+            return None, None, None
+        
+        start = df.index.searchsorted(pd.Timestamp(start_date)) if start_date else 0
+        stop = df.index.searchsorted(pd.Timestamp(end_date), side='right') if end_date else len(df)
+        if test_bars is None:
+            # Redondeando hacia arriba salen como mucho `folds` ventanas (la última, más corta)
+            test_bars = -(-(stop - start) // (folds + 3)) if train_bars is None else -(-(stop - start - train_bars) // folds)
+        if train_bars is None:
+            train_bars = 3 * test_bars
+        windows = walk_forward_windows(start, stop, train_bars, test_bars, anchored) if test_bars > 0 else []
+        if not windows:
+            self.log_error("El periodo es demasiado corto para las ventanas del walk-forward")
+            return None, None, None
+        
+        if n_jobs is None:
+            cells = len(combinations) * sum(train_stop - train_start for train_start, train_stop, _, _ in windows)
+            n_jobs = (os.cpu_count() or 1) if cells >= PARALLEL_MIN_CELLS else 1
+        
+        self.log_info(f"Walk-forward {'anclado' if anchored else 'móvil'}: {len(windows)} ventanas de "
+                      f"{train_bars} velas de entrenamiento y {test_bars} de prueba, "
+                      f"{len(combinations)} combinaciones")
+        
+        fold_results = [None] * len(windows)
+        evaluations = walk_forward(df, windows, combinations, strategy.to_dict(), initial_balance,
+                                   n_jobs, self.indicator_cache, self.costs, intrabar_stops, ambiguity)
+        for completed, (index, result) in enumerate(evaluations, 1):
+            fold_results[index] = result
+            self.signal_optimization_progress.emit(completed, len(windows))
+            self.log_event(f"Ventana {index + 1}: {result['params']} -> "
+                           f"Retorno fuera de muestra={result['test']['return']:.2f}%")
+        
+        index = df.index
+        folds_df = pd.DataFrame([{
+            'train_start': index[train_start],
+            'train_end': index[train_stop - 1],
+            'test_start': index[test_start],
+            'test_end': index[test_stop - 1],
+            'params': result['params'],
+            'train_return': result['train']['return'] if result['train'] else 0,
+            'test_return': result['test']['return'],
+            'test_trades': result['test']['trades'],
+            'test_win_rate': result['test']['win_rate'],
+            'test_max_drawdown': result['test']['max_drawdown']
+        } for (train_start, train_stop, test_start, test_stop), result in zip(windows, fold_results)])
+        
+        equity, drawdown = stitch_equity(fold_results, initial_balance)
+        test_index = index[windows[0][2]:windows[-1][3]]
+        
+        # Eficiencia: rendimiento por vela fuera de muestra respecto al de entrenamiento
+        train_rate = (folds_df['train_return'] / [w[1] - w[0] for w in windows]).mean()
+        test_rate = (folds_df['test_return'] / [w[3] - w[2] for w in windows]).mean()
+        summary = {
+            'initial_balance': initial_balance,
+            'final_balance': equity[-1],
+            'total_return_pct': (equity[-1] - initial_balance) / initial_balance * 100,
+            'total_trades': int(folds_df['test_trades'].sum()),
+            'max_drawdown': drawdown.min(),
+            'folds': len(windows),
+            'efficiency': test_rate / train_rate if train_rate > 0 else float('nan'),
+            'equity_curve': pd.Series(equity, index=test_index),
+            'drawdown': pd.Series(drawdown, index=test_index)
+        }
+        
+        self.log_info(f"Walk-forward completado: Retorno fuera de muestra={summary['total_return_pct']:.2f}%, "
+                      f"Max Drawdown={summary['max_drawdown']:.2f}%, Eficiencia={summary['efficiency']:.2f}")
+        return summary, folds_df, summary['equity_curve']
+    
+    def monte_carlo(self, backtest_results, n_sims=10000, method='bootstrap', ruin_level=0.5,
+                    confidence=0.95, seed=None):
+        """
+        Robustez de un backtest remuestreando el orden de sus operaciones
+        
+        Con 'bootstrap' las operaciones se toman con reemplazo y con
+        'permutation' solo se reordenan (el retorno final no cambia, pero
+        sí el drawdown). Todas las simulaciones se generan a la vez como
+        una matriz de NumPy.
+        
+        Args:
+            backtest_results (dict): Resultados de `backtest`
+            n_sims (int): Número de simulaciones
+            method (str): 'bootstrap' o 'permutation'
+            ruin_level (float): Pérdida que se considera ruina (0.5 = -50%)
+            confidence (float): Nivel del intervalo de confianza del retorno
+            seed (int): Semilla
+        
+        Returns:
+            dict: Intervalo de confianza del retorno, cuantiles del drawdown,
+                  probabilidad de pérdida y riesgo de ruina (en %), o None
+                  si no hubo operaciones
+        """
+        if method not in MONTE_CARLO_METHODS:
+            raise ValueError(f"Método de Monte Carlo no válido: {method}")
+        if not backtest_results or backtest_results['trades'].empty:
+            self.log_error("No hay operaciones para la simulación de Monte Carlo")
+            return None
+        
+        returns = backtest_results['trades']['profit_pct'].to_numpy() / 100
+        stats = monte_carlo(returns, n_sims, method, ruin_level, confidence, seed)
+        self.log_info(f"Monte Carlo ({n_sims} simulaciones): Retorno {confidence:.0%} entre "
+                      f"{stats['return_ci_low']:.2f}% y {stats['return_ci_high']:.2f}%, "
+                      f"Drawdown p95={stats['drawdown_p95']:.2f}%, Riesgo de ruina={stats['risk_of_ruin']:.2f}%")
+        return stats
+    
+    def monte_carlo_top(self, results_df, start_date=None, end_date=None, top_n=20, n_sims=10000,
+                        method='bootstrap', ruin_level=0.5, confidence=0.95, seed=None, verbosity=None,
+                        intrabar_stops=True, ambiguity='stop'):
+        """
+        Monte Carlo de las mejores combinaciones de una optimización
+        
+        Las operaciones de cada combinación se recalculan (los indicadores
+        se reutilizan de la caché) sobre el mismo periodo y con las mismas
+        salidas (`intrabar_stops` y `ambiguity`) de la optimización.
+        
+        Args:
+            results_df (pd.DataFrame): Resultados de `optimize_parameters`
+            start_date (str): Fecha de inicio usada en la optimización
+            end_date (str): Fecha de fin usada en la optimización
+            top_n (int): Combinaciones a simular, por orden de retorno
+            verbosity (int): Nivel de log de esta ejecución
+        
+        Returns:
+            pd.DataFrame: Una fila por combinación con 'params', 'return' y las
+                          estadísticas de `monte_carlo`
+        """
+        if method not in MONTE_CARLO_METHODS:
+            raise ValueError(f"Método de Monte Carlo no válido: {method}")
+        if ambiguity not in AMBIGUITY_RULES:
+            raise ValueError(f"Regla de ambigüedad no válida: {ambiguity}")
+        with self.log_run(verbosity):
+            top = results_df[results_df['trades'] > 0].nlargest(top_n, 'return')
+            if top.empty:
+                self.log_error("No hay combinaciones con operaciones para la simulación de Monte Carlo")
+                return None
+            
+            strategy = self.strategy
+            param_sets = [strategy.replace(**params) for params in top['params']]
+            if start_date:
+                warmup = max(self._warmup_bars(params=params) for params in param_sets)
+                df = self.fetch_ohlcv_range(start_date, end_date, warmup)
+            else:
+                df = self.fetch_ohlcv_data(limit=1000)
+            if df is None or df.empty:
+                self.log_error("No hay datos para la simulación de Monte Carlo")
+                return None
+            
+            start = df.index.searchsorted(pd.Timestamp(start_date)) if start_date else 0
+            stop = df.index.searchsorted(pd.Timestamp(end_date), side='right') if end_date else len(df)
+            close = np.ascontiguousarray(df['close'].to_numpy(), dtype=np.float64)
+            fingerprint = data_fingerprint(close)
+            fill_factors = self._fill_factors(df)
+            exits = {'intrabar_stops': True, 'ambiguity': ambiguity} if intrabar_stops else None
+            level_exits = self._level_exits(df, exits)
+            returns_list = [trade_returns(close, params.to_dict(), start, stop, self.indicator_cache, fingerprint,
+                                          fill_factors, level_exits) for params in param_sets]
+            
+            self.log_info(f"Monte Carlo de {len(returns_list)} combinaciones con {n_sims} simulaciones cada una")
+            stats = monte_carlo_many(returns_list, n_sims, method, ruin_level, confidence, seed)
+            
+            rows = []
+            for params, result, stats_item in zip(top['params'], top['return'], stats):
+                if stats_item is not None:
+                    rows.append(dict({'params': params, 'return': result}, **stats_item))
+            return pd.DataFrame(rows)
+    
+    def process_live_candles(self, candles, simulation_mode=True):
+        """
+        Evalúa la señal con las velas recibidas y ejecuta la operación si corresponde
+        
+        Args:
+            candles (np.ndarray): Velas cerradas (N, 6) con el timestamp en ms
+            simulation_mode (bool): Simular las operaciones
+        
+        Returns:
+            bool: True si se ejecutó una operación
+        """
+        # Actualizar indicadores de forma incremental y obtener señal actual
+        current = self._update_live_candles(candles)
+        current_price, current_signal, indicators = self._live_result(current)
+        
+        self.log_info(f"Precio actual: {current_price:.2f}, Señal: {current_signal}")
+        
+        # Emitir actualización de precio e indicadores
+        self.signal_price_update.emit(current_price, indicators)
+        
+        # Ejecutar operación si hay señal (en modo simulación o real); el ATR sale del estado incremental
+        executed = self.execute_trade(current_signal, current_price, None, is_backtest=simulation_mode,
+                                      atr=current['atr'])
+        if executed:
+            self.log_info("Operación ejecutada exitosamente")
+        return executed
+    
     def run(self, interval_seconds=60, simulation_mode=True):
-        """Ejecuta el bot en tiempo real"""
-        self.log_info(f"Iniciando bot de trading en {'modo simulación' if simulation_mode else 'modo real'} con intervalo de {interval_seconds} segundos")
+        """
+        Ejecuta el bot en tiempo real (bloquea hasta llamar a `stop`)
+        
+        La señal se evalúa justo después del cierre de cada vela del
+        timeframe; `interval_seconds` es la frecuencia con que se publica el
+        precio de la vela en curso. Para ejecutar varios bots en un mismo
+        bucle de eventos usar `LiveRunner`.
+        """
+        self.log_info(f"Iniciando bot de trading en {'modo simulación' if simulation_mode else 'modo real'} al cierre de cada vela de {self.timeframe}")
         self.running = True
         
-        while self.running:
-            try:
-                # Obtener datos actualizados
-                df = self.fetch_ohlcv_data(limit=100)
-                if df is None or df.empty:
-                    self.log_warning("No se pudieron obtener datos. Reintentando...")
-                    time.sleep(interval_seconds)
-                    continue
-                
-                # Añadir indicadores y obtener señal actual
-                df = self.add_indicators(df)
-                current_price = df['close'].iloc[-1]
-                current_signal = df['signal'].iloc[-1]
-                
-                # Crear diccionario de indicadores para la interfaz
-                indicators = {
-                    'ma_fast': df['ma_fast'].iloc[-1],
-                    'ma_slow': df['ma_slow'].iloc[-1],
-                    'rsi': df['rsi'].iloc[-1], 
-                    'bb_upper': df['bb_upper'].iloc[-1],
-                    'bb_middle': df['bb_middle'].iloc[-1],
-                    'bb_lower': df['bb_lower'].iloc[-1],
-                    'signal': df['signal'].iloc[-1]
-                }
-                
-                self.log_info(f"Precio actual: {current_price:.2f}, Señal: {current_signal}")
-                
-                # Emitir actualización de precio e indicadores
-                self.signal_price_update.emit(current_price, indicators)
-                
-                # Ejecutar operación si hay señal (en modo simulación o real)
-                if self.execute_trade(current_signal, current_price, df, is_backtest=simulation_mode):
-                    self.log_info("Operación ejecutada exitosamente")
-                
-                # Esperar hasta el próximo intervalo
-                time.sleep(interval_seconds)
-                
-            except Exception as e:
-                self.log_error(f"Error en el ciclo principal: {e}")
-                time.sleep(interval_seconds)
+        try:
+            asyncio.run(run_live(self, simulation_mode=simulation_mode, quote_interval=interval_seconds))
+        except asyncio.CancelledError:
+            pass
     
     def stop(self):
         """Detiene la ejecución del bot"""
         self.running = False
+        if self._live_cancel is not None:
+            self._live_cancel()
         self.log_info("Bot detenido")
     
     def apply_parameters(self, params):
         """Aplica un conjunto de parámetros al bot"""
+        # Los de la estrategia se sustituyen de una vez, sin estados intermedios
+        self.strategy = self.strategy.replace(**{
+            param: value for param, value in params.items() if param in STRATEGY_FIELDS
+        })
         for param, value in params.items():
-            if hasattr(self, param):
+            if param not in STRATEGY_FIELDS and hasattr(self, param):
                 setattr(self, param, value)
         
+        # El estado incremental depende de los parámetros
+        self.live_indicators = None
+        
         self.log_info(f"Parámetros aplicados: {params}")
     
     def get_settings(self):
@@ -613,5 +1489,25 @@ class CryptoTradingBot(QObject):
             'bb_period': self.bb_period,
             'bb_std': self.bb_std,
             'risk_per_trade': self.risk_per_trade,
-            'use_ema': self.use_ema
-        }
\ No newline at end of file
+            'use_ema': self.use_ema,
+            'indicator_backend': self.indicator_backend,
+            'atr_period': self.atr_period,
+            'stop_atr': self.stop_atr,
+            'target_atr': self.target_atr,
+            'costs': self.costs.to_dict()
+        }
+
+
+def _strategy_property(name):
+    """Atributo del bot que lee y sustituye el parámetro `name` de `self.strategy`"""
+    def getter(self):
+        return getattr(self.strategy, name)
+
+    def setter(self, value):
+        self.strategy = self.strategy.replace(**{name: value})
+
+    return property(getter, setter, doc=f"Parámetro '{name}' de la estrategia")
+
+
+for _name in STRATEGY_FIELDS:
+    setattr(CryptoTradingBot, _name, _strategy_property(_name))
@@ -0,0 +1,129 @@
+from dataclasses import dataclass, asdict, fields, replace
+import numpy as np
+
+
+@dataclass(frozen=True)
+class CostModel:
+    """
+    Costes de ejecución de los backtests: comisiones, slippage y spread
+
+    Los costes se traducen en multiplicadores del precio de cada vela (ver
+    `fill_factors`) que los motores aplican a los arrays de precios de
+    entrada y salida, así que activarlos no añade bucles. Las entradas, las
+    salidas por señal y los stop loss son órdenes a mercado: pagan la
+    comisión taker, el slippage y medio spread. Los take profit son órdenes
+    límite ya colocadas: solo pagan la comisión maker.
+
+    Todos los valores son fracciones (0.001 = 0.1%).
+
+    Attributes:
+        maker_fee (float): Comisión de las órdenes límite
+        taker_fee (float): Comisión de las órdenes a mercado
+        slippage (float): Slippage fijo de cada orden a mercado
+        volatility_slippage (float): Slippage en proporción al rango
+            (máximo - mínimo) / cierre de la vela de ejecución
+        spread (float): Spread fijo entre compra y venta
+        estimate_spread (bool): Estimar además el spread a partir de los
+            máximos y mínimos (Corwin-Schultz) en lugar de usar solo `spread`
+        spread_window (int): Velas para promediar el spread estimado
+    """
+    maker_fee: float = 0.0
+    taker_fee: float = 0.0
+    slippage: float = 0.0
+    volatility_slippage: float = 0.0
+    spread: float = 0.0
+    estimate_spread: bool = False
+    spread_window: int = 20
+
+    @classmethod
+    def from_dict(cls, values):
+        """Crea el modelo a partir de un diccionario, ignorando las claves desconocidas"""
+        return cls(**{name: value for name, value in (values or {}).items() if name in COST_FIELDS})
+
+    def replace(self, **changes):
+        """Devuelve una copia con los costes indicados cambiados"""
+        return replace(self, **changes)
+
+    def to_dict(self):
+        return asdict(self)
+
+    def is_free(self):
+        """True si el modelo no aplica ningún coste"""
+        return not (self.maker_fee or self.taker_fee or self.slippage or self.volatility_slippage
+                    or self.spread or self.estimate_spread)
+
+    def market_cost(self, high, low, close):
+        """
+        Coste de una orden a mercado en cada vela, sin comisión
+
+        Returns:
+            np.ndarray o float: Medio spread más slippage, como fracción del precio
+        """
+        cost = self.spread / 2 + self.slippage
+        if self.volatility_slippage:
+            close = np.asarray(close, dtype=np.float64)
+            cost = cost + self.volatility_slippage * (np.asarray(high, dtype=np.float64) - low) / close
+        if self.estimate_spread:
+            cost = cost + estimate_spread(high, low, self.spread_window) / 2
+        return cost
+
+    def fill_factors(self, high, low, close):
+        """
+        Multiplicadores del cierre para comprar y vender a mercado en cada vela
+
+        Comprar con comisión `f` al precio `p` equivale a comprar sin
+        comisión a `p / (1 - f)`, y vender, a `p * (1 - f)`.
+
+        Returns:
+            tuple: (entrada, salida), arrays del tamaño de `close` o escalares
+                   si ningún coste depende de la vela
+        """
+        cost = self.market_cost(high, low, close)
+        return (1 + cost) / (1 - self.taker_fee), (1 - cost) * (1 - self.taker_fee)
+
+    def target_factor(self):
+        """Multiplicador del precio de las salidas por take profit (órdenes límite)"""
+        return 1 - self.maker_fee
+
+
+# Todos los campos de `CostModel`
+COST_FIELDS = tuple(field.name for field in fields(CostModel))
+
+
+def estimate_spread(high, low, window=20):
+    """
+    Spread estimado a partir de los máximos y mínimos (Corwin y Schultz, 2012)
+
+    El rango de una vela refleja la volatilidad y el spread, y el de dos
+    velas seguidas, el doble de volatilidad pero el mismo spread: la
+    diferencia da el spread. Cada estimación usa la vela y la anterior (sin
+    mirar al futuro), las negativas cuentan como 0 y se promedian las
+    últimas `window`.
+
+    Returns:
+        np.ndarray: Spread estimado en cada vela, como fracción del precio
+    """
+    high = np.asarray(high, dtype=np.float64)
+    low = np.asarray(low, dtype=np.float64)
+    n = len(high)
+    spread = np.zeros(n)
+    if n < 2:
+        return spread
+
+    range_sq = np.log(high / low) ** 2
+    beta = range_sq[1:] + range_sq[:-1]
+    gamma = np.log(np.maximum(high[1:], high[:-1]) / np.minimum(low[1:], low[:-1])) ** 2
+    denominator = 3 - 2 * np.sqrt(2)
+    alpha = (np.sqrt(2 * beta) - np.sqrt(beta)) / denominator - np.sqrt(gamma / denominator)
+    spread[1:] = np.maximum(2 * np.expm1(alpha) / (1 + np.exp(alpha)), 0)
+    spread = np.nan_to_num(spread)
+
+    # Media de las últimas `window` velas (menos al principio de la serie)
+    cumulative = np.cumsum(spread)
+    cumulative[window:] -= cumulative[:-window].copy()
+    return cumulative / np.minimum(np.arange(1, n + 1), window)
+
+
+def fill_window(fill_factors, start=0, stop=None):
+    """Recorta a [start, stop) unos multiplicadores de `CostModel.fill_factors`"""
+    return tuple(factor[start:stop] if np.ndim(factor) else factor for factor in fill_factors)
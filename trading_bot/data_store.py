@@ -0,0 +1,204 @@
+import os
+import numpy as np
+import pandas as pd
+
+OHLCV_COLUMNS = ['timestamp', 'open', 'high', 'low', 'close', 'volume']
+ROW_WIDTH = len(OHLCV_COLUMNS)
+ROW_BYTES = ROW_WIDTH * 8
+
+
+def ohlcv_to_dataframe(ohlcv):
+    """Convierte un array (N, 6) de velas en un DataFrame indexado por fecha"""
+    ohlcv = np.asarray(ohlcv, dtype=np.float64).reshape(-1, ROW_WIDTH)
+    df = pd.DataFrame(ohlcv[:, 1:], columns=OHLCV_COLUMNS[1:])
+    df.index = pd.to_datetime(ohlcv[:, 0].astype(np.int64), unit='ms')
+    df.index.name = 'timestamp'
+    return df
+
+
+def index_to_ms(index):
+    """
+    Timestamps en ms de un índice de fechas, sea cual sea su resolución
+
+    Equivale a `index.as_unit('ms').asi8`, que solo existe desde pandas 2.0.
+
+    Returns:
+        np.ndarray: Timestamps int64 en ms
+    """
+    return np.asarray((index - pd.Timestamp(0)) // pd.Timedelta(milliseconds=1), dtype=np.int64)
+
+
+class OHLCVStore:
+    """
+    Almacén local de velas OHLCV en disco
+
+    Cada combinación (exchange, símbolo, timeframe) se guarda en un fichero
+    binario de float64 con 6 columnas por vela (timestamp en ms, open, high,
+    low, close, volume), ordenado por timestamp. Los datos se leen mediante
+    memory-map y las velas nuevas se añaden al final del fichero sin
+    reescribirlo.
+    """
+
+    def __init__(self, base_dir=os.path.join('data', 'ohlcv')):
+        self.base_dir = base_dir
+
+    def path_for(self, exchange_id, symbol, timeframe):
+        """Devuelve la ruta del fichero para una combinación de mercado"""
+        safe_symbol = symbol.replace('/', '-').replace(':', '_')
+        return os.path.join(self.base_dir, exchange_id, safe_symbol, f"{timeframe}.ohlcv")
+
+    def load(self, exchange_id, symbol, timeframe):
+        """Devuelve las velas almacenadas como array (N, 6) de solo lectura"""
+        path = self.path_for(exchange_id, symbol, timeframe)
+        if not os.path.exists(path):
+            return np.zeros((0, ROW_WIDTH), dtype=np.float64)
+
+        rows = os.path.getsize(path) // ROW_BYTES
+        if rows == 0:
+            return np.zeros((0, ROW_WIDTH), dtype=np.float64)
+
+        return np.memmap(path, dtype='<f8', mode='r', shape=(rows, ROW_WIDTH))
+
+    def last_timestamp(self, exchange_id, symbol, timeframe):
+        """Devuelve el timestamp (ms) de la última vela almacenada o None"""
+        data = self.load(exchange_id, symbol, timeframe)
+        if len(data) == 0:
+            return None
+        return int(data[-1, 0])
+
+    def write(self, exchange_id, symbol, timeframe, ohlcv):
+        """
+        Guarda velas en el almacén
+
+        Las velas posteriores a la última almacenada se añaden al final y la
+        última vela (posiblemente aún abierta) se sobrescribe en su sitio. Si
+        llegan velas anteriores se fusiona todo y se reescribe el fichero.
+
+        Returns:
+            int: Número de velas almacenadas tras la escritura
+        """
+        rows = np.asarray(ohlcv, dtype='<f8').reshape(-1, ROW_WIDTH)
+        path = self.path_for(exchange_id, symbol, timeframe)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+
+        stored = self.load(exchange_id, symbol, timeframe)
+        if len(rows) == 0:
+            return len(stored)
+
+        rows = deduplicate_candles(rows)
+
+        if len(stored) == 0:
+            _atomic_write(path, rows)
+            return len(rows)
+
+        last_ts = stored[-1, 0]
+        if rows[0, 0] < last_ts:
+            merged = deduplicate_candles(np.concatenate([np.asarray(stored), rows]))
+            del stored
+            _atomic_write(path, merged)
+            return len(merged)
+
+        # Sobrescribir la última vela si se repite y añadir las nuevas
+        count = len(stored)
+        offset = count * ROW_BYTES
+        if rows[0, 0] == last_ts:
+            offset -= ROW_BYTES
+            count -= 1
+        del stored
+
+        with open(path, 'r+b') as f:
+            f.truncate(offset)
+            f.seek(offset)
+            f.write(np.ascontiguousarray(rows).tobytes())
+        return count + len(rows)
+
+    def sync(self, exchange, symbol, timeframe, limit=500, page_limit=1000):
+        """
+        Sincroniza el almacén con el exchange descargando solo velas nuevas
+
+        Si no hay datos se descargan las últimas `limit` velas; si los hay,
+        se piden las velas desde la última almacenada (que se actualiza por
+        si estaba abierta) paginando hasta alcanzar el presente. Si aun así
+        hay menos de `limit` velas, se completan con las más recientes.
+
+        Returns:
+            int: Número de velas recibidas del exchange
+        """
+        last_ts = self.last_timestamp(exchange.id, symbol, timeframe)
+        if last_ts is None:
+            return self._fetch_latest(exchange, symbol, timeframe, limit)
+
+        timeframe_ms = exchange.parse_timeframe(timeframe) * 1000
+        received = 0
+        since = last_ts
+        while True:
+            ohlcv = exchange.fetch_ohlcv(symbol, timeframe, since=since, limit=page_limit)
+            if not ohlcv:
+                break
+            self.write(exchange.id, symbol, timeframe, ohlcv)
+            received += len(ohlcv)
+
+            # Terminar al llegar a la vela actual o si el exchange no avanza
+            newest = ohlcv[-1][0]
+            if newest <= since or newest + timeframe_ms > exchange.milliseconds():
+                break
+            since = newest
+
+        # Completar hacia atrás si el almacén tiene menos velas de las pedidas
+        if len(self.load(exchange.id, symbol, timeframe)) < limit:
+            received += self._fetch_latest(exchange, symbol, timeframe, limit)
+        return received
+
+    def _fetch_latest(self, exchange, symbol, timeframe, limit):
+        """Descarga las últimas `limit` velas y las fusiona con el almacén"""
+        ohlcv = exchange.fetch_ohlcv(symbol, timeframe, limit=limit)
+        self.write(exchange.id, symbol, timeframe, ohlcv)
+        return len(ohlcv)
+
+    def get_dataframe(self, exchange_id, symbol, timeframe, limit=None):
+        """Devuelve las últimas `limit` velas almacenadas como DataFrame"""
+        data = self.load(exchange_id, symbol, timeframe)
+        if limit:
+            data = data[-limit:]
+        return ohlcv_to_dataframe(data)
+
+    def get_range_dataframe(self, exchange_id, symbol, timeframe, since_ms, until_ms):
+        """Devuelve las velas almacenadas con timestamp en [since_ms, until_ms]"""
+        data = self.load(exchange_id, symbol, timeframe)
+        timestamps = data[:, 0]
+        start = np.searchsorted(timestamps, since_ms, side='left')
+        stop = np.searchsorted(timestamps, until_ms, side='right')
+        return ohlcv_to_dataframe(data[start:stop])
+
+
+def deduplicate_candles(rows):
+    """Ordena por timestamp y conserva la última aparición de cada vela"""
+    rows = np.asarray(rows, dtype='<f8').reshape(-1, ROW_WIDTH)
+    # np.unique devuelve la primera aparición; se invierte para quedarse con la más reciente
+    reversed_rows = rows[::-1]
+    _, first = np.unique(reversed_rows[:, 0], return_index=True)
+    return np.ascontiguousarray(reversed_rows[first])
+
+
+def find_gaps(timestamps, timeframe_ms):
+    """
+    Busca huecos entre velas consecutivas
+
+    Args:
+        timestamps (np.ndarray): Aperturas (ms) ordenadas
+        timeframe_ms (int): Duración de una vela en ms
+
+    Returns:
+        list: Tuplas (inicio, fin) en ms, ambos incluidos, de cada tramo sin velas
+    """
+    timestamps = np.asarray(timestamps, dtype=np.int64)
+    holes = np.flatnonzero(np.diff(timestamps) > timeframe_ms)
+    return [(int(timestamps[i]) + timeframe_ms, int(timestamps[i + 1]) - 1) for i in holes]
+
+
+def _atomic_write(path, rows):
+    """Escribe el fichero completo de forma atómica"""
+    tmp_path = path + '.tmp'
+    with open(tmp_path, 'wb') as f:
+        f.write(np.ascontiguousarray(rows, dtype='<f8').tobytes())
+    os.replace(tmp_path, path)
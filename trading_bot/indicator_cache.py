@@ -0,0 +1,83 @@
+import hashlib
+import threading
+from collections import OrderedDict
+import numpy as np
+
+
+def data_fingerprint(values):
+    """Huella (hash) del contenido de un array, para usarla como clave de caché"""
+    values = np.ascontiguousarray(values)
+    digest = hashlib.blake2b(digest_size=16)
+    digest.update(str((values.dtype.str, values.shape)).encode())
+    digest.update(values.data)
+    return digest.hexdigest()
+
+
+class IndicatorCache:
+    """
+    Caché LRU de series de indicadores limitada por memoria
+
+    Las entradas se indexan por (huella de los datos, nombre del indicador,
+    parámetros), de modo que en una optimización cada EMA, RSI o banda de
+    Bollinger distinta se calcula una sola vez y las combinaciones que solo
+    cambian umbrales reutilizan las series ya calculadas. Los arrays se
+    guardan como solo lectura para que nadie los modifique por accidente.
+    """
+
+    def __init__(self, max_bytes=256 * 1024 * 1024):
+        self.max_bytes = max_bytes
+        self.nbytes = 0
+        self.hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._entries)
+
+    def get_or_compute(self, fingerprint, name, params, compute):
+        """
+        Devuelve el valor cacheado o lo calcula con `compute()` y lo guarda
+
+        Args:
+            fingerprint (str): Huella de los datos de entrada
+            name (str): Nombre del indicador
+            params (tuple): Parámetros del indicador (hashables)
+            compute (callable): Función sin argumentos que calcula el valor
+
+        Returns:
+            np.ndarray o tupla de arrays
+        """
+        key = (fingerprint, name, params)
+        with self._lock:
+            if key in self._entries:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return self._entries[key]
+            self.misses += 1
+
+        value = compute()
+        arrays = value if isinstance(value, tuple) else (value,)
+        for array in arrays:
+            array.flags.writeable = False
+        size = sum(array.nbytes for array in arrays)
+
+        with self._lock:
+            if key not in self._entries:
+                self._entries[key] = value
+                self.nbytes += size
+                self._evict()
+        return value
+
+    def _evict(self):
+        """Elimina las entradas menos usadas hasta respetar el límite de memoria"""
+        while self.nbytes > self.max_bytes and len(self._entries) > 1:
+            _, value = self._entries.popitem(last=False)
+            arrays = value if isinstance(value, tuple) else (value,)
+            self.nbytes -= sum(array.nbytes for array in arrays)
+
+    def clear(self):
+        """Vacía la caché"""
+        with self._lock:
+            self._entries.clear()
+            self.nbytes = 0
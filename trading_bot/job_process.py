@@ -0,0 +1,108 @@
+import time
+import queue
+import threading
+import traceback
+import multiprocessing
+from .bot import CryptoTradingBot
+from .log_pipeline import shutdown_logging
+
+
+def _run_job(settings, method, kwargs, channel, progress_interval):
+    """
+    Punto de entrada del proceso hijo
+
+    Crea un bot con `settings`, ejecuta `method(**kwargs)` y envía por
+    `channel` tuplas pequeñas: ('progress', actual, total) como mucho cada
+    `progress_interval` segundos, ('log', mensaje) para los mensajes que
+    el bot muestra en la interfaz y, al final, ('result', valor) o
+    ('error', traza).
+    """
+    last_progress = [0.0]
+
+    def send_progress(current, total):
+        now = time.monotonic()
+        if current >= total or now - last_progress[0] >= progress_interval:
+            last_progress[0] = now
+            channel.put(('progress', current, total))
+
+    try:
+        bot = CryptoTradingBot(**settings)
+        bot.signal_backtest_progress.connect(send_progress)
+        bot.signal_optimization_progress.connect(send_progress)
+        bot.signal_log.connect(lambda message: channel.put(('log', message)))
+        channel.put(('result', getattr(bot, method)(**kwargs)))
+    except Exception:
+        channel.put(('error', traceback.format_exc()))
+    finally:
+        shutdown_logging()
+
+
+class BotJob:
+    """
+    Backtest u optimización ejecutado en un proceso aparte
+
+    El proceso hijo crea su propio bot a partir de la configuración (no
+    comparte estado ni GIL con la interfaz) y solo devuelve el progreso,
+    los mensajes de log y el resultado final. Se usa 'spawn' para no
+    copiar con fork un proceso con Qt y otros hilos en marcha; el proceso
+    no es daemon para que la optimización pueda abrir su propio pool.
+    """
+
+    def __init__(self, settings, method, kwargs=None, progress_interval=0.05):
+        context = multiprocessing.get_context('spawn')
+        self.channel = context.Queue()
+        self.process = context.Process(
+            target=_run_job,
+            args=(dict(settings), method, dict(kwargs or {}), self.channel, progress_interval),
+            name=f"BotJob-{method}"
+        )
+        # Evita arrancar el proceso si se cancela antes de tiempo desde otro hilo
+        self._lock = threading.Lock()
+        self.cancelled = False
+
+    def start(self):
+        """Arranca el proceso salvo que el trabajo ya esté cancelado"""
+        with self._lock:
+            if not self.cancelled:
+                self.process.start()
+
+    def messages(self, poll_interval=0.2):
+        """
+        Devuelve los mensajes del proceso hasta el resultado o el error
+
+        Si el proceso termina sin enviar resultado (p. ej. al cancelarlo) se
+        devuelve ('error', motivo).
+
+        Yields:
+            tuple: Mensajes ('progress', actual, total), ('log', mensaje),
+                   ('result', valor) o ('error', traza)
+        """
+        while True:
+            try:
+                message = self.channel.get(timeout=poll_interval)
+            except queue.Empty:
+                if self.process.is_alive():
+                    continue
+                # Puede quedar un mensaje en tránsito tras terminar el proceso
+                try:
+                    message = self.channel.get(timeout=poll_interval)
+                except queue.Empty:
+                    yield ('error', f"El proceso terminó sin resultado (código {self.process.exitcode})")
+                    return
+            yield message
+            if message[0] in ('result', 'error'):
+                self.process.join()
+                return
+
+    def cancel(self):
+        """Termina el proceso si sigue en marcha; si no había arrancado ya no lo hará"""
+        with self._lock:
+            self.cancelled = True
+            if self.process.pid is None:
+                return
+        if self.process.is_alive():
+            self.process.terminate()
+        self.process.join()
+
+    def is_alive(self):
+        return self.process.is_alive()
@@ -0,0 +1,215 @@
+"""
+Indicadores y señales calculados sobre arrays de NumPy
+
+Las señales se calculan con máscaras y operaciones de NumPy sobre arrays
+contiguos. Las medias exponenciales y las ventanas móviles (EMA, SMA,
+desviación estándar y las medias de Wilder del RSI) usan a propósito las
+rutinas compiladas de pandas, las mismas que usa `ta`: una recursión
+propia en NumPy no es más rápida sin compilar, y una suma acumulada para
+las ventanas no daría los mismos decimales. Así los resultados son
+idénticos bit a bit a los de `ta`, y el motor matricial del optimizador
+puede sustituir al backtest serie a serie sin cambiar la clasificación.
+"""
+import numpy as np
+import pandas as pd
+from .indicator_cache import data_fingerprint
+
+
+def ewm_mean(values, alpha, min_periods):
+    """
+    Media exponencial con la misma recursión que `ewm(adjust=False)` de pandas
+
+    Las medias recursivas y móviles se calculan con las rutinas compiladas
+    de pandas sobre el array sin copiarlo (las mismas que usa `ta`), por lo
+    que el resultado es idéntico bit a bit; el resto del cálculo se hace con
+    operaciones de NumPy.
+    """
+    series = pd.Series(values, copy=False)
+    return series.ewm(alpha=alpha, min_periods=min_periods, adjust=False).mean().to_numpy()
+
+
+def ema(close, window):
+    """EMA equivalente a `ta.trend.EMAIndicator`"""
+    # Con `span`, como `ta`: pandas redondea el factor a partir del centro de masas
+    series = pd.Series(close, copy=False)
+    return series.ewm(span=window, min_periods=window, adjust=False).mean().to_numpy()
+
+
+def sma(close, window):
+    """Media simple equivalente a `ta.trend.SMAIndicator`"""
+    return pd.Series(close, copy=False).rolling(window, min_periods=window).mean().to_numpy()
+
+
+def rolling_std(close, window):
+    """Desviación estándar móvil poblacional (ddof=0)"""
+    return pd.Series(close, copy=False).rolling(window, min_periods=window).std(ddof=0).to_numpy()
+
+
+def rsi(close, window):
+    """RSI de Wilder equivalente a `ta.momentum.RSIIndicator`"""
+    close = np.asarray(close, dtype=np.float64)
+    diff = np.empty_like(close)
+    if len(close):
+        diff[0] = 0.0
+        np.subtract(close[1:], close[:-1], out=diff[1:])
+
+    gains = np.maximum(diff, 0.0)
+    losses = np.maximum(-diff, 0.0)
+    avg_gain = ewm_mean(gains, 1.0 / window, window)
+    avg_loss = ewm_mean(losses, 1.0 / window, window)
+
+    # 100 - 100 / (1 + RS), calculado en el mismo array
+    with np.errstate(divide='ignore', invalid='ignore'):
+        values = np.divide(avg_gain, avg_loss)
+        values += 1
+        np.divide(100, values, out=values)
+        np.subtract(100, values, out=values)
+    values[avg_loss == 0] = 100
+    return values
+
+
+def bollinger_bands(close, window, num_std):
+    """Bandas de Bollinger: (superior, media, inferior)"""
+    middle = sma(close, window)
+    deviation = rolling_std(close, window)
+    return middle + num_std * deviation, middle, middle - num_std * deviation
+
+
+def true_range(high, low, close):
+    """True Range por vela; en la primera (sin cierre previo) es high - low"""
+    high = np.asarray(high, dtype=np.float64)
+    low = np.asarray(low, dtype=np.float64)
+    close = np.asarray(close, dtype=np.float64)
+    tr = high - low
+    if len(tr) > 1:
+        prev_close = close[:-1]
+        np.maximum(tr[1:], np.abs(high[1:] - prev_close), out=tr[1:])
+        np.maximum(tr[1:], np.abs(low[1:] - prev_close), out=tr[1:])
+    return tr
+
+
+def atr(high, low, close, window=14):
+    """ATR como media simple del True Range, igual que `_calculate_atr` del bot"""
+    return sma(true_range(high, low, close), window)
+
+
+def atr_levels(price, atr_values, stop_multiple=2, target_multiple=3):
+    """
+    Niveles de stop loss y take profit a partir del ATR
+
+    Funciona igual con escalares que con arrays (un nivel por vela).
+
+    Returns:
+        tuple: (stop_loss, take_profit)
+    """
+    return price - stop_multiple * atr_values, price + target_multiple * atr_values
+
+
+def crossover_signal(fast, slow):
+    """Señal de cruce: 1 si `fast` cruza por encima de `slow`, -1 si cruza por debajo"""
+    signal = np.zeros(len(fast), dtype=np.int64)
+    if len(fast) < 2:
+        return signal
+
+    # Las comparaciones con NaN son falsas, igual que en la versión con pandas
+    above, below = fast > slow, fast < slow
+    was_below_or_equal = fast[:-1] <= slow[:-1]
+    was_above_or_equal = fast[:-1] >= slow[:-1]
+    signal[1:][below[1:] & was_above_or_equal] = -1
+    signal[1:][above[1:] & was_below_or_equal] = 1
+    return signal
+
+
+def threshold_signal(values, buy_below, sell_above):
+    """Señal por umbrales: 1 si `values` < `buy_below`, -1 si `values` > `sell_above`"""
+    signal = np.zeros(len(values), dtype=np.int64)
+    signal[values > sell_above] = -1
+    signal[values < buy_below] = 1
+    return signal
+
+
+def band_signal(close, upper, lower):
+    """Señal de bandas: 1 si el cierre está por debajo de `lower`, -1 si está por encima de `upper`"""
+    signal = np.zeros(len(close), dtype=np.int64)
+    signal[close > upper] = -1
+    signal[close < lower] = 1
+    return signal
+
+
+def combine_signals(ma_crossover, rsi_signal, bb_signal):
+    """Señal combinada con más peso en el cruce de medias móviles"""
+    # cruce + 0.5 * rsi + 0.5 * bb, escalado por 2 para operar con enteros
+    score = ma_crossover * 2
+    score += rsi_signal
+    score += bb_signal
+    signal = np.zeros(len(score), dtype=np.int64)
+    signal[score <= -2] = -1
+    signal[score >= 2] = 1
+    return signal
+
+
+def series_cache(close, cache=None, fingerprint=None):
+    """
+    Devuelve una función `cached(name, params, compute)` ligada a `close`
+
+    Sin caché se limita a llamar a `compute()`; con caché las series se
+    indexan por la huella de `close`, que se calcula si no se indica.
+    """
+    if cache is None:
+        def cached(name, params, compute):
+            return compute()
+        return cached
+
+    if fingerprint is None:
+        fingerprint = data_fingerprint(close)
+
+    def cached(name, params, compute):
+        return cache.get_or_compute(fingerprint, name, params, compute)
+    return cached
+
+
+def compute_indicator_columns(close, fast_ma=20, slow_ma=50, rsi_period=14, rsi_overbought=70,
+                              rsi_oversold=30, bb_period=20, bb_std=2, use_ema=True,
+                              cache=None, fingerprint=None):
+    """
+    Calcula todos los indicadores y señales de la estrategia sobre arrays
+
+    Args:
+        close (np.ndarray): Precios de cierre
+        cache (IndicatorCache): Caché opcional de series ya calculadas
+        fingerprint (str): Huella de `close`; se calcula si no se indica
+
+    Returns:
+        dict: Columnas en el mismo orden que `add_indicators`
+    """
+    close = np.ascontiguousarray(close, dtype=np.float64)
+    cached = series_cache(close, cache, fingerprint)
+
+    ma_name = 'ema' if use_ema else 'sma'
+    moving_average = ema if use_ema else sma
+    ma_fast = cached(ma_name, (fast_ma,), lambda: moving_average(close, fast_ma))
+    ma_slow = cached(ma_name, (slow_ma,), lambda: moving_average(close, slow_ma))
+    rsi_values = cached('rsi', (rsi_period,), lambda: rsi(close, rsi_period))
+    bb_middle = cached('sma', (bb_period,), lambda: sma(close, bb_period))
+    bb_deviation = cached('rolling_std', (bb_period,), lambda: rolling_std(close, bb_period))
+    bb_upper = bb_middle + bb_std * bb_deviation
+    bb_lower = bb_middle - bb_std * bb_deviation
+
+    ma_crossover = cached(
+        'ma_crossover', (ma_name, fast_ma, slow_ma), lambda: crossover_signal(ma_fast, ma_slow)
+    )
+    rsi_signal = threshold_signal(rsi_values, rsi_oversold, rsi_overbought)
+    bb_signal = band_signal(close, bb_upper, bb_lower)
+
+    return {
+        'ma_fast': ma_fast,
+        'ma_slow': ma_slow,
+        'rsi': rsi_values,
+        'bb_upper': bb_upper,
+        'bb_middle': bb_middle,
+        'bb_lower': bb_lower,
+        'signal': combine_signals(ma_crossover, rsi_signal, bb_signal),
+        'ma_crossover': ma_crossover,
+        'rsi_signal': rsi_signal,
+        'bb_signal': bb_signal
+    }
@@ -0,0 +1,505 @@
+import time
+import asyncio
+import threading
+import numpy as np
+import pandas as pd
+import ccxt.async_support as ccxt_async
+from .data_store import ROW_WIDTH
+from .backfill import backfill_store
+
+
+def create_async_exchange(exchange_id):
+    """Crea una instancia asíncrona de ccxt para el exchange indicado"""
+    return getattr(ccxt_async, exchange_id)({
+        'enableRateLimit': True,
+    })
+
+
+def next_candle_close(now_ms, timeframe_ms):
+    """Devuelve el instante (ms) en que cierra la vela en curso"""
+    return (int(now_ms) // timeframe_ms + 1) * timeframe_ms
+
+
+class CandleWindow:
+    """
+    Ventana deslizante en memoria con las últimas velas de un símbolo
+
+    Las velas se guardan en un buffer fijo del doble de la capacidad y se
+    devuelven como vistas, sin copiar. Las velas nuevas se escriben al
+    final y la vela en curso, que el exchange vuelve a enviar con el mismo
+    timestamp, se actualiza en su sitio; solo cuando el buffer se llena se
+    mueven las últimas velas al principio.
+    """
+
+    def __init__(self, capacity=100):
+        self.capacity = capacity
+        self._buffer = np.empty((2 * capacity, ROW_WIDTH), dtype=np.float64)
+        self._start = 0
+        self._end = 0
+
+    def __len__(self):
+        return self._end - self._start
+
+    @property
+    def candles(self):
+        """Velas de la ventana (N, 6), la última posiblemente en curso"""
+        return self._buffer[self._start:self._end]
+
+    @property
+    def last_timestamp(self):
+        """Apertura (ms) de la última vela de la ventana o None"""
+        if self._end == self._start:
+            return None
+        return int(self._buffer[self._end - 1, 0])
+
+    def clear(self):
+        """Vacía la ventana"""
+        self._start = self._end = 0
+
+    def merge(self, ohlcv):
+        """
+        Incorpora velas recibidas del exchange (ordenadas por timestamp)
+
+        Las anteriores a la última vela de la ventana se ignoran, la que
+        coincide con ella la sustituye y las posteriores se añaden.
+
+        Returns:
+            int: Número de velas añadidas
+        """
+        rows = np.asarray(ohlcv, dtype=np.float64).reshape(-1, ROW_WIDTH)
+        if self._end > self._start:
+            last = self._buffer[self._end - 1, 0]
+            rows = rows[np.searchsorted(rows[:, 0], last):]
+            if len(rows) and rows[0, 0] == last:
+                self._buffer[self._end - 1] = rows[0]
+                rows = rows[1:]
+        rows = rows[-self.capacity:]
+
+        added = len(rows)
+        if self._end + added > len(self._buffer):
+            keep = min(len(self), self.capacity - added)
+            self._buffer[:keep] = self._buffer[self._end - keep:self._end]
+            self._start, self._end = 0, keep
+        self._buffer[self._end:self._end + added] = rows
+        self._end += added
+        self._start = max(self._start, self._end - self.capacity)
+        return added
+
+    def closed(self, close_ms, timeframe_ms):
+        """Velas de la ventana cerradas en `close_ms` (vista)"""
+        candles = self.candles
+        return candles[:np.searchsorted(candles[:, 0], close_ms - timeframe_ms, side='right')]
+
+
+async def fetch_new_candles(exchange, symbol, timeframe, timeframe_ms, window):
+    """
+    Actualiza la ventana pidiendo solo las velas desde la última conocida
+
+    La última vela de la ventana se pide de nuevo para actualizarla si
+    seguía en curso. Con la ventana vacía, o si el hueco hasta ahora no
+    cabe en ella, se descargan las últimas `window.capacity` velas.
+
+    Returns:
+        int: Número de velas nuevas
+    """
+    since = window.last_timestamp
+    if since is None or time.time() * 1000 - since >= window.capacity * timeframe_ms:
+        window.clear()
+        ohlcv = await exchange.fetch_ohlcv(symbol, timeframe, limit=window.capacity)
+    else:
+        ohlcv = await exchange.fetch_ohlcv(symbol, timeframe, since=since, limit=window.capacity)
+    return window.merge(ohlcv)
+
+
+async def fetch_closed_candles(exchange, symbol, timeframe, timeframe_ms, close_ms, window,
+                               retries=3, retry_delay=1.0):
+    """
+    Actualiza la ventana y devuelve sus velas cerradas hasta `close_ms`
+
+    Si el exchange todavía no incluye la vela que acaba de cerrar se vuelve
+    a pedir hasta `retries` veces, para no evaluar dos veces la misma vela.
+
+    Returns:
+        np.ndarray: Vista de las velas cerradas (N, 6) o None si la vela no llegó a tiempo
+    """
+    for attempt in range(retries + 1):
+        await fetch_new_candles(exchange, symbol, timeframe, timeframe_ms, window)
+        rows = window.closed(close_ms, timeframe_ms)
+        if len(rows) and rows[-1, 0] >= close_ms - timeframe_ms:
+            return rows
+        if attempt < retries:
+            await asyncio.sleep(retry_delay)
+    return None
+
+
+async def _fetch_symbols(symbols, fetch):
+    """Descarga en paralelo las velas de varios símbolos; los errores se devuelven como resultado"""
+    symbols = list(symbols)
+    results = await asyncio.gather(*(fetch(symbol) for symbol in symbols), return_exceptions=True)
+    return dict(zip(symbols, results))
+
+
+async def _publish_quotes(exchange, bots, timeframe, timeframe_ms, windows):
+    """Publica el precio y los indicadores de la vela en curso de cada bot"""
+    updates = await _fetch_symbols(
+        {bot.symbol for bot in bots},
+        lambda symbol: fetch_new_candles(exchange, symbol, timeframe, timeframe_ms, windows[symbol])
+    )
+
+    async def publish(bot):
+        if isinstance(updates[bot.symbol], Exception):
+            bot.log_error(f"Error al obtener el precio actual: {updates[bot.symbol]}")
+            return
+        candles = windows[bot.symbol].candles
+        if len(candles):
+            price, _, indicators = await asyncio.to_thread(bot.update_live_candles, candles)
+            bot.signal_price_update.emit(price, indicators)
+
+    await asyncio.gather(*(publish(bot) for bot in bots))
+
+
+def _store_closed(bot, rows, timeframe_ms):
+    """
+    Guarda en el almacén las velas cerradas que aún no tiene, sin dejar huecos
+
+    Las velas nuevas se toman a partir de la última almacenada (que se
+    reescribe por si estaba abierta), no de la última evaluación del runner.
+    Si la ventana ya no llega hasta ella (almacén desactualizado al arrancar
+    o tras una parada), las velas que faltan se descargan antes.
+    """
+    last_ts = bot.data_store.last_timestamp(bot.exchange_id, bot.symbol, bot.timeframe)
+    if last_ts is not None:
+        rows = rows[np.searchsorted(rows[:, 0], last_ts):]
+        if len(rows) and rows[0, 0] > last_ts + timeframe_ms:
+            backfill_store(bot.data_store, bot.exchange, bot.symbol, bot.timeframe, last_ts, int(rows[0, 0]) - 1)
+    bot.data_store.write(bot.exchange_id, bot.symbol, bot.timeframe, rows)
+
+
+async def _evaluate_bot(bot, rows, simulation_mode, state, timeframe_ms):
+    """Evalúa un bot con las velas cerradas de su símbolo y registra el resultado"""
+    error = isinstance(rows, Exception)
+    executed = False
+    if error:
+        bot.log_error(f"Error al obtener velas: {rows}")
+    elif rows is None:
+        bot.log_warning("La vela cerrada no está disponible todavía; se evaluará en el próximo cierre")
+        return
+    else:
+        try:
+            await asyncio.to_thread(_store_closed, bot, rows, timeframe_ms)
+            # El bot puede consultar el exchange (balance, órdenes): fuera del bucle de eventos
+            executed = await asyncio.to_thread(bot.process_live_candles, rows, simulation_mode)
+        except Exception as e:
+            bot.log_error(f"Error en el ciclo principal: {e}")
+            error = True
+
+    if state is not None:
+        state.record(bot, None if error else rows[-1], executed, error)
+
+
+async def run_live_group(members, exchange, timeframe, settle_seconds=2.0, limit=100, state=None):
+    """
+    Bucle en vivo de varios bots que comparten exchange y timeframe
+
+    Cada símbolo mantiene en memoria una ventana de las últimas `limit`
+    velas y en cada consulta solo se piden las velas desde la última
+    conocida. Tras el cierre de cada vela se actualizan en paralelo las
+    ventanas de todos los símbolos (una petición por símbolo aunque varios
+    bots lo compartan) y cada bot evalúa su señal. `members` puede
+    modificarse mientras el bucle está en marcha: los cambios se aplican en
+    la vela siguiente. El bucle termina al cancelarse o cuando ningún bot
+    sigue en marcha.
+
+    Args:
+        members (dict): {bot: (simulation_mode, quote_interval)}
+        exchange: Instancia asíncrona de ccxt
+        timeframe (str): Timeframe común de los bots
+        settle_seconds (float): Espera tras el cierre de la vela
+        limit (int): Velas de la ventana de cada símbolo
+        state (SymbolTable): Tabla opcional donde registrar el estado de cada bot
+    """
+    timeframe_ms = int(exchange.parse_timeframe(timeframe) * 1000)
+    windows = {}
+
+    while any(bot.running for bot in list(members)):
+        try:
+            for bot in list(members):
+                if bot.symbol not in windows:
+                    windows[bot.symbol] = CandleWindow(limit)
+
+            close_ms = next_candle_close(time.time() * 1000, timeframe_ms)
+            evaluate_at = close_ms / 1000 + settle_seconds
+
+            # Publicar la vela en curso mientras se espera al cierre
+            while True:
+                quoting = [bot for bot, (_, interval) in list(members.items()) if interval and bot.running]
+                quote_interval = min((members[bot][1] for bot in quoting), default=None)
+                if not quote_interval or evaluate_at - time.time() <= quote_interval:
+                    break
+                await asyncio.sleep(quote_interval)
+                await _publish_quotes(exchange, quoting, timeframe, timeframe_ms, windows)
+
+            await asyncio.sleep(max(0.0, evaluate_at - time.time()))
+
+            active = [(bot, mode) for bot, (mode, _) in list(members.items()) if bot.running]
+            candles = await _fetch_symbols(
+                {bot.symbol for bot, _ in active},
+                lambda symbol: fetch_closed_candles(
+                    exchange, symbol, timeframe, timeframe_ms, close_ms, windows[symbol]
+                )
+            )
+            await asyncio.gather(*(
+                _evaluate_bot(bot, candles[bot.symbol], mode, state, timeframe_ms)
+                for bot, mode in active
+            ))
+
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            for bot in list(members):
+                bot.log_error(f"Error en el ciclo principal: {e}")
+            await asyncio.sleep(settle_seconds)
+
+
+async def run_live(bot, exchange=None, simulation_mode=True, quote_interval=None,
+                   settle_seconds=2.0, limit=100):
+    """
+    Bucle en vivo de un bot alineado con el cierre de las velas
+
+    La señal se evalúa una vez por vela, `settle_seconds` después de su
+    cierre, con las velas ya cerradas. Si se indica `quote_interval`, entre
+    cierres se publica cada `quote_interval` segundos el precio y los
+    indicadores de la vela en curso, sin operar. La corrutina termina al
+    cancelarse o cuando `bot.running` pasa a False.
+
+    Args:
+        bot (CryptoTradingBot): Bot a ejecutar
+        exchange: Instancia asíncrona de ccxt (se crea y cierra si no se indica)
+        simulation_mode (bool): Simular las operaciones
+        quote_interval (float): Segundos entre actualizaciones de precio
+        settle_seconds (float): Espera tras el cierre de la vela
+        limit (int): Velas de la ventana en memoria
+    """
+    own_exchange = exchange is None
+    if own_exchange:
+        exchange = create_async_exchange(bot.exchange_id)
+
+    # Permite a bot.stop() cancelar la espera desde otro hilo
+    loop, task = asyncio.get_running_loop(), asyncio.current_task()
+    bot._live_cancel = lambda: loop.call_soon_threadsafe(task.cancel)
+
+    try:
+        await run_live_group(
+            {bot: (simulation_mode, quote_interval)}, exchange, bot.timeframe, settle_seconds, limit
+        )
+    finally:
+        bot._live_cancel = None
+        if own_exchange:
+            await exchange.close()
+
+
+# Estado en vivo de cada bot: una fila de tamaño fijo por bot
+SYMBOL_STATE_DTYPE = np.dtype([
+    ('candle', np.int64),         # Apertura (ms) de la última vela cerrada evaluada
+    ('close', np.float64),        # Cierre de esa vela
+    ('position', np.int8),        # 1 = long, 0 = sin posición
+    ('entry_price', np.float64),
+    ('stop_loss', np.float64),
+    ('take_profit', np.float64),
+    ('trades', np.int32),         # Operaciones ejecutadas desde que se añadió el bot
+    ('errors', np.int32)          # Ciclos con error
+])
+
+
+class SymbolTable:
+    """
+    Estado en vivo de todos los bots de un runner en un único array estructurado
+
+    Cada bot ocupa una fila de `rows` (las filas libres se reutilizan) en
+    lugar de repartir el estado en objetos por símbolo, de modo que 40
+    pares ocupan unos pocos KB y se pueden consultar de una vez.
+    """
+
+    def __init__(self, capacity=16):
+        self.rows = np.zeros(capacity, dtype=SYMBOL_STATE_DTYPE)
+        self.labels = [None] * capacity
+        self._slots = {}
+        self._free = list(range(capacity - 1, -1, -1))
+
+    def __len__(self):
+        return len(self._slots)
+
+    def add(self, bot):
+        """Reserva (o devuelve) la fila de un bot"""
+        if bot in self._slots:
+            return self._slots[bot]
+        if not self._free:
+            capacity = len(self.rows)
+            self.rows = np.concatenate([self.rows, np.zeros(capacity, dtype=SYMBOL_STATE_DTYPE)])
+            self.labels.extend([None] * capacity)
+            self._free = list(range(2 * capacity - 1, capacity - 1, -1))
+        slot = self._free.pop()
+        self.rows[slot] = 0
+        self.labels[slot] = (bot.exchange_id, bot.symbol, bot.timeframe)
+        self._slots[bot] = slot
+        return slot
+
+    def remove(self, bot):
+        """Libera la fila de un bot"""
+        slot = self._slots.pop(bot, None)
+        if slot is not None:
+            self.labels[slot] = None
+            self._free.append(slot)
+
+    def record(self, bot, candle=None, executed=False, error=False):
+        """
+        Guarda el resultado de una evaluación
+
+        Args:
+            bot (CryptoTradingBot): Bot evaluado
+            candle (np.ndarray): Última vela cerrada evaluada (None si hubo error)
+            executed (bool): Si se ejecutó una operación
+            error (bool): Si el ciclo falló
+        """
+        slot = self._slots.get(bot)
+        if slot is None:
+            return
+        rows = self.rows
+        if candle is not None:
+            rows['candle'][slot] = candle[0]
+            rows['close'][slot] = candle[4]
+        long = bot.position == "long"
+        rows['position'][slot] = long
+        rows['entry_price'][slot] = bot.entry_price if long else 0
+        rows['stop_loss'][slot] = bot.stop_loss if long else 0
+        rows['take_profit'][slot] = bot.take_profit if long else 0
+        rows['trades'][slot] += executed
+        rows['errors'][slot] += error
+
+    def to_dataframe(self):
+        """Devuelve una copia del estado con una fila por bot"""
+        slots = sorted(self._slots.values())
+        df = pd.DataFrame(self.rows[slots])
+        labels = [self.labels[slot] for slot in slots]
+        df.insert(0, 'exchange', [label[0] for label in labels])
+        df.insert(1, 'symbol', [label[1] for label in labels])
+        df.insert(2, 'timeframe', [label[2] for label in labels])
+        df['candle'] = pd.to_datetime(df['candle'], unit='ms')
+        return df
+
+
+class LiveRunner:
+    """
+    Ejecuta varios bots en vivo sobre un único bucle asyncio
+
+    El bucle vive en un hilo propio, de modo que la interfaz no se bloquea.
+    Los bots se agrupan por (exchange, timeframe): cada grupo es una sola
+    tarea que, al cierre de cada vela, descarga en paralelo los símbolos de
+    todos sus bots con una instancia asíncrona de ccxt compartida por
+    exchange. El estado de cada bot se resume en `self.state`.
+    """
+
+    def __init__(self, settle_seconds=2.0, limit=100):
+        self.settle_seconds = settle_seconds
+        self.limit = limit
+        self.loop = None
+        self.state = SymbolTable()
+        self._thread = None
+        self._groups = {}
+        self._tasks = {}
+        self._keys = {}
+        self._exchanges = {}
+
+    def start(self):
+        """Arranca el hilo del bucle de eventos si no está en marcha"""
+        if self._thread is not None and self._thread.is_alive():
+            return
+        self.loop = asyncio.new_event_loop()
+        self._thread = threading.Thread(target=self.loop.run_forever, name='LiveRunner', daemon=True)
+        self._thread.start()
+
+    def _submit(self, coroutine):
+        return asyncio.run_coroutine_threadsafe(coroutine, self.loop).result()
+
+    def add_bot(self, bot, simulation_mode=True, quote_interval=None):
+        """Empieza a ejecutar un bot (si ya estaba en marcha se reinicia)"""
+        self.start()
+        self.remove_bot(bot)
+        bot.running = True
+        bot.log_info(f"Iniciando bot de trading en {'modo simulación' if simulation_mode else 'modo real'} "
+                     f"al cierre de cada vela de {bot.timeframe}")
+        self._submit(self._add(bot, simulation_mode, quote_interval))
+
+    def add_bots(self, bots, simulation_mode=True, quote_interval=None):
+        """Empieza a ejecutar varios bots"""
+        for bot in bots:
+            self.add_bot(bot, simulation_mode, quote_interval)
+
+    async def _add(self, bot, simulation_mode, quote_interval):
+        key = (bot.exchange_id, bot.timeframe)
+        members = self._groups.setdefault(key, {})
+        members[bot] = (simulation_mode, quote_interval)
+        self._keys[bot] = key
+        self.state.add(bot)
+        # bot.stop() lo retira del grupo desde cualquier hilo
+        bot._live_cancel = lambda: self.loop.call_soon_threadsafe(self._discard, bot)
+
+        task = self._tasks.get(key)
+        if task is None or task.done():
+            exchange = self._exchanges.get(bot.exchange_id)
+            if exchange is None:
+                exchange = self._exchanges[bot.exchange_id] = create_async_exchange(bot.exchange_id)
+            self._tasks[key] = asyncio.create_task(run_live_group(
+                members, exchange, bot.timeframe, self.settle_seconds, self.limit, self.state
+            ))
+
+    def _discard(self, bot):
+        """Retira un bot de su grupo; devuelve la tarea del grupo si se ha quedado vacío"""
+        key = self._keys.pop(bot, None)
+        if key is None:
+            return None
+        bot._live_cancel = None
+        self.state.remove(bot)
+        members = self._groups[key]
+        del members[bot]
+        if members:
+            return None
+        del self._groups[key]
+        task = self._tasks.pop(key)
+        task.cancel()
+        return task
+
+    def remove_bot(self, bot):
+        """Detiene un bot; si era el último de su grupo espera a que la tarea termine"""
+        if self.loop is None or bot not in self._keys:
+            return
+        bot.running = False
+        self._submit(self._remove(bot))
+
+    async def _remove(self, bot):
+        task = self._discard(bot)
+        if task is not None:
+            try:
+                await task
+            except asyncio.CancelledError:
+                pass
+
+    def is_running(self, bot):
+        """Indica si el bot está en un grupo con la tarea activa"""
+        task = self._tasks.get(self._keys.get(bot))
+        return task is not None and not task.done()
+
+    def shutdown(self):
+        """Detiene todos los bots, cierra los exchanges y el bucle de eventos"""
+        if self.loop is None:
+            return
+        for bot in list(self._keys):
+            self.remove_bot(bot)
+        for exchange in self._exchanges.values():
+            self._submit(exchange.close())
+        self._exchanges.clear()
+        self.loop.call_soon_threadsafe(self.loop.stop)
+        self._thread.join()
+        self.loop.close()
+        self.loop = None
+        self._thread = None
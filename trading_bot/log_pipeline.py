@@ -0,0 +1,165 @@
+import os
+import time
+import queue
+import atexit
+import logging
+import threading
+from collections import deque
+from logging.handlers import QueueHandler
+
+LOG_FORMAT = '%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+
+# Escritor en segundo plano del proceso (uno por proceso)
+_writer = None
+_writer_lock = threading.Lock()
+
+
+class BatchLogWriter(threading.Thread):
+    """
+    Hilo que escribe en lotes los registros de log encolados
+
+    Los registros se acumulan en una cola sin bloquear a quien registra; el
+    hilo los recoge en lotes de hasta `batch_size` (o los que haya tras
+    `flush_interval` segundos) y los escribe en cada handler con una sola
+    escritura y un solo flush por lote.
+    """
+
+    _STOP = object()
+
+    def __init__(self, log_queue, handlers, batch_size=500, flush_interval=0.2):
+        super().__init__(name='BatchLogWriter', daemon=True)
+        self.queue = log_queue
+        self.handlers = list(handlers)
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+
+    def run(self):
+        stopping = False
+        while not stopping:
+            batch = [self.queue.get()]
+            deadline = time.monotonic() + self.flush_interval
+            while len(batch) < self.batch_size:
+                timeout = deadline - time.monotonic()
+                try:
+                    record = self.queue.get(timeout=timeout) if timeout > 0 else self.queue.get_nowait()
+                except queue.Empty:
+                    break
+                batch.append(record)
+
+            stopping = any(record is self._STOP for record in batch)
+            records = [record for record in batch if record is not self._STOP]
+            if records:
+                self._write(records)
+
+    def _write(self, records):
+        """Escribe un lote de registros en todos los handlers"""
+        for handler in self.handlers:
+            handler.acquire()
+            try:
+                stream = getattr(handler, 'stream', None)
+                if isinstance(handler, logging.StreamHandler) and stream is not None:
+                    text = ''.join(
+                        handler.format(record) + handler.terminator
+                        for record in records
+                        if record.levelno >= handler.level and handler.filter(record)
+                    )
+                    if text:
+                        stream.write(text)
+                        handler.flush()
+                else:
+                    for record in records:
+                        handler.handle(record)
+            except Exception:
+                handler.handleError(records[-1])
+            finally:
+                handler.release()
+
+    def stop(self):
+        """Escribe los registros pendientes y termina el hilo"""
+        self.queue.put(self._STOP)
+        self.join()
+        for handler in self.handlers:
+            handler.close()
+
+
+class LogBuffer:
+    """
+    Buffer en memoria de mensajes de log (nivel, mensaje)
+
+    Guarda los eventos de un backtest u optimización (operaciones,
+    combinaciones probadas...) sin enviarlos al fichero ni a la interfaz.
+    Conserva como máximo `maxlen` mensajes, descartando los más antiguos.
+    """
+
+    def __init__(self, maxlen=100000):
+        self._entries = deque(maxlen=maxlen)
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._entries)
+
+    def append(self, level, message):
+        """Añade un mensaje"""
+        with self._lock:
+            self._entries.append((level, message))
+
+    def extend(self, level, messages):
+        """Añade varios mensajes del mismo nivel"""
+        with self._lock:
+            self._entries.extend((level, message) for message in messages)
+
+    def messages(self, min_level=logging.NOTSET):
+        """Devuelve los mensajes con nivel igual o superior a `min_level`"""
+        with self._lock:
+            return [message for level, message in self._entries if level >= min_level]
+
+    def clear(self):
+        """Vacía el buffer"""
+        with self._lock:
+            self._entries.clear()
+
+
+def configure_logging(log_file=os.path.join('logs', 'trading_bot.log'), level=logging.INFO,
+                      batch_size=500, flush_interval=0.2):
+    """
+    Configura el logging raíz para escribir de forma asíncrona
+
+    El logger raíz solo encola los registros (QueueHandler); un
+    `BatchLogWriter` los escribe en lotes en `log_file` y en la consola.
+    Llamadas posteriores no vuelven a configurar nada.
+
+    Returns:
+        BatchLogWriter: Escritor en segundo plano del proceso
+    """
+    global _writer
+    with _writer_lock:
+        if _writer is not None:
+            return _writer
+
+        log_dir = os.path.dirname(log_file)
+        if log_dir and not os.path.exists(log_dir):
+            os.makedirs(log_dir)
+
+        formatter = logging.Formatter(LOG_FORMAT)
+        handlers = [logging.FileHandler(log_file), logging.StreamHandler()]
+        for handler in handlers:
+            handler.setFormatter(formatter)
+
+        log_queue = queue.SimpleQueue()
+        _writer = BatchLogWriter(log_queue, handlers, batch_size, flush_interval)
+        _writer.start()
+        # El formato completo lo aplica el escritor; la cola solo lleva el mensaje
+        queue_handler = QueueHandler(log_queue)
+        queue_handler.setFormatter(logging.Formatter('%(message)s'))
+        logging.basicConfig(level=level, handlers=[queue_handler])
+        atexit.register(shutdown_logging)
+        return _writer
+
+
+def shutdown_logging():
+    """Vacía la cola de logs pendiente y detiene el escritor"""
+    global _writer
+    with _writer_lock:
+        if _writer is not None:
+            _writer.stop()
+            _writer = None
@@ -0,0 +1,135 @@
+import numpy as np
+
+MONTE_CARLO_METHODS = ('bootstrap', 'permutation')
+
+
+def simulate_equity_paths(returns, n_sims=10000, method='bootstrap', rng=None):
+    """
+    Genera de una vez `n_sims` secuencias de operaciones y su equity
+
+    Con 'bootstrap' cada secuencia toma las operaciones con reemplazo (el
+    retorno final varía); con 'permutation' reordena las mismas operaciones
+    (el retorno final es siempre el mismo y solo varía el camino, es decir,
+    el drawdown).
+
+    Args:
+        returns (np.ndarray): Retorno de cada operación (0.05 = +5%)
+        n_sims (int): Número de simulaciones
+        method (str): 'bootstrap' o 'permutation'
+        rng (np.random.Generator): Generador aleatorio
+
+    Returns:
+        np.ndarray: Equity (n_sims, operaciones + 1) relativa a un balance inicial de 1
+    """
+    if method not in MONTE_CARLO_METHODS:
+        raise ValueError(f"Método de Monte Carlo no válido: {method}")
+    rng = rng if rng is not None else np.random.default_rng()
+    growth = 1.0 + np.asarray(returns, dtype=np.float64)
+    n_trades = len(growth)
+
+    if method == 'bootstrap':
+        samples = growth[rng.integers(0, n_trades, size=(n_sims, n_trades))]
+    else:
+        samples = rng.permuted(np.broadcast_to(growth, (n_sims, n_trades)), axis=1)
+
+    equity = np.empty((n_sims, n_trades + 1))
+    equity[:, 0] = 1.0
+    np.cumprod(samples, axis=1, out=equity[:, 1:])
+    return equity
+
+
+def path_statistics(equity):
+    """
+    Retorno final, mínimo y drawdown máximo de cada curva de equity
+
+    Args:
+        equity (np.ndarray): Equity (simulaciones, pasos) relativa a un balance inicial de 1
+
+    Returns:
+        tuple: (equity final, equity mínima, drawdown máximo en tanto por uno), un valor por simulación
+    """
+    peak = np.maximum.accumulate(equity, axis=1)
+    return equity[:, -1], equity.min(axis=1), ((equity - peak) / peak).min(axis=1)
+
+
+def summarize_paths(final, minimum, max_drawdown, ruin_level=0.5, confidence=0.95):
+    """
+    Estadísticas de las simulaciones a partir de `path_statistics`
+
+    Args:
+        ruin_level (float): Pérdida desde el balance inicial que se considera ruina (0.5 = -50%)
+        confidence (float): Nivel del intervalo de confianza del retorno
+
+    Returns:
+        dict: Retornos ('return_*') y drawdowns ('drawdown_*') en %, y
+              'prob_loss' y 'risk_of_ruin' en % de las simulaciones
+    """
+    final_return = (final - 1.0) * 100
+    tail = (1 - confidence) / 2 * 100
+    return_low, return_median, return_high = np.percentile(final_return, [tail, 50, 100 - tail])
+    # El drawdown es negativo: los peores casos son los percentiles bajos
+    drawdown_p99, drawdown_p95, drawdown_median = np.percentile(max_drawdown * 100, [1, 5, 50])
+
+    return {
+        'simulations': len(final),
+        'return_mean': float(final_return.mean()),
+        'return_median': float(return_median),
+        'return_ci_low': float(return_low),
+        'return_ci_high': float(return_high),
+        'prob_loss': float(np.mean(final_return < 0) * 100),
+        'drawdown_median': float(drawdown_median),
+        'drawdown_p95': float(drawdown_p95),
+        'drawdown_p99': float(drawdown_p99),
+        'risk_of_ruin': float(np.mean(minimum <= 1.0 - ruin_level) * 100)
+    }
+
+
+def monte_carlo(returns, n_sims=10000, method='bootstrap', ruin_level=0.5, confidence=0.95,
+                seed=None, max_cells=2 ** 24):
+    """
+    Distribución del retorno y del drawdown remuestreando las operaciones
+
+    Las simulaciones se generan como matrices (simulaciones, operaciones)
+    de como mucho `max_cells` celdas para acotar la memoria.
+
+    Args:
+        returns (np.ndarray): Retorno de cada operación (0.05 = +5%)
+        n_sims (int): Número de simulaciones
+        method (str): 'bootstrap' o 'permutation'
+        ruin_level (float): Pérdida que se considera ruina (0.5 = -50%)
+        confidence (float): Nivel del intervalo de confianza del retorno
+        seed (int): Semilla
+
+    Returns:
+        dict: Estadísticas de `summarize_paths` y 'trades' (None si no hay operaciones)
+    """
+    returns = np.asarray(returns, dtype=np.float64)
+    if len(returns) == 0:
+        return None
+    rng = np.random.default_rng(seed)
+    batch = max(1, min(n_sims, max_cells // (len(returns) + 1)))
+
+    statistics = [
+        path_statistics(simulate_equity_paths(returns, min(batch, n_sims - offset), method, rng))
+        for offset in range(0, n_sims, batch)
+    ]
+    summary = summarize_paths(*(np.concatenate(values) for values in zip(*statistics)),
+                              ruin_level=ruin_level, confidence=confidence)
+    summary['trades'] = len(returns)
+    return summary
+
+
+def monte_carlo_many(returns_list, n_sims=10000, method='bootstrap', ruin_level=0.5, confidence=0.95,
+                     seed=None, max_cells=2 ** 24):
+    """
+    `monte_carlo` para muchas listas de operaciones (p. ej. las mejores de una optimización)
+
+    Returns:
+        list: Estadísticas de cada lista, en el mismo orden
+    """
+    rng = np.random.default_rng(seed)
+    seeds = rng.integers(0, 2 ** 63, size=len(returns_list))
+    return [
+        monte_carlo(returns, n_sims, method, ruin_level, confidence, int(child), max_cells)
+        for returns, child in zip(returns_list, seeds)
+    ]
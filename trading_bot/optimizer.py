@@ -0,0 +1,533 @@
+import os
+import operator
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from multiprocessing import get_context, shared_memory
+import numpy as np
+from .backtest_engine import (run_vectorized_backtest, run_event_backtest, compute_backtest_metrics,
+                              level_exit_table, AMBIGUITY_RULES)
+from .batch_engine import build_signal_matrix, combine_components, run_batch_backtest, combinations_per_batch
+from .indicator_cache import IndicatorCache, data_fingerprint
+from .kernels import compute_indicator_columns, atr, atr_levels
+from .strategy import STRATEGY_PARAMS, LEVEL_PARAMS, StrategyParams
+from .costs import fill_window
+
+PRICE_COLUMNS = ('open', 'high', 'low', 'close', 'volume')
+
+CONSTRAINT_OPERATORS = {
+    '<': operator.lt,
+    '<=': operator.le,
+    '>': operator.gt,
+    '>=': operator.ge,
+    '==': operator.eq,
+    '!=': operator.ne
+}
+# Combinaciones sin sentido que el optimizador descarta por defecto
+DEFAULT_CONSTRAINTS = ('fast_ma < slow_ma', 'rsi_oversold < rsi_overbought')
+
+# Celdas (velas x combinaciones) a partir de las que compensa arrancar el pool de procesos
+PARALLEL_MIN_CELLS = 2 ** 27
+
+
+def parse_constraint(constraint):
+    """
+    Convierte una restricción en (izquierda, operador, derecha)
+
+    Acepta 'fast_ma < slow_ma' o ('fast_ma', '<', 'slow_ma'). Cada lado es
+    el nombre de un parámetro o un número.
+    """
+    parts = constraint.split() if isinstance(constraint, str) else list(constraint)
+    if len(parts) != 3 or parts[1] not in CONSTRAINT_OPERATORS:
+        raise ValueError(f"Restricción no válida: {constraint}")
+    return tuple(_constraint_operand(part) if index != 1 else part for index, part in enumerate(parts))
+
+
+def _constraint_operand(operand):
+    """Número literal o nombre de parámetro"""
+    if isinstance(operand, str):
+        try:
+            return float(operand)
+        except ValueError:
+            return operand
+    return operand
+
+
+def _constraint_names(constraint, known):
+    """Parámetros de una restricción; ValueError si alguno no está en `known`"""
+    operands = [operand for operand in (constraint[0], constraint[2]) if isinstance(operand, str)]
+    unknown = [operand for operand in operands if operand not in known]
+    if unknown:
+        raise ValueError(f"Parámetro desconocido en la restricción {constraint}: {unknown[0]}")
+    return operands
+
+
+def constraint_checker(constraints, base_params=None, param_grid=None):
+    """
+    Función que indica si una combinación cumple todas las restricciones
+
+    Los parámetros que no están en la combinación se toman de `base_params`.
+    Como en `expand_grid`, una restricción sobre un parámetro que no está
+    en `param_grid` ni en `base_params` es un ValueError al crear la función.
+    """
+    parsed = [parse_constraint(constraint) for constraint in constraints]
+    base_params = base_params or {}
+    known = set(base_params) | set(param_grid or {})
+    for constraint in parsed:
+        _constraint_names(constraint, known)
+
+    def is_valid(params):
+        values = dict(base_params, **params)
+        return all(_holds(constraint, values) for constraint in parsed)
+
+    return is_valid
+
+
+def _holds(constraint, values):
+    left, op, right = constraint
+    left = values[left] if isinstance(left, str) else left
+    right = values[right] if isinstance(right, str) else right
+    return CONSTRAINT_OPERATORS[op](left, right)
+
+
+def expand_grid(param_grid, constraints=(), base_params=None):
+    """
+    Genera las combinaciones de un grid de parámetros
+
+    El orden es el mismo que el del grid search recursivo: el primer
+    parámetro del grid es el que cambia más despacio. Los valores
+    repetidos de un parámetro (p. ej. 2 y 2.0) se evalúan una sola vez y
+    cada restricción se comprueba en cuanto tienen valor sus parámetros,
+    así que las ramas del producto que la incumplen no llegan a generarse.
+
+    Args:
+        param_grid (dict): Valores a probar para cada parámetro
+        constraints (iterable): Restricciones como 'fast_ma < slow_ma'
+        base_params (dict): Valores de los parámetros que no están en el grid
+
+    Returns:
+        list: Diccionarios {parámetro: valor}
+    """
+    names = list(param_grid.keys())
+    values = [list(dict.fromkeys(param_values)) for param_values in param_grid.values()]
+    base_params = {name: value for name, value in (base_params or {}).items() if name not in param_grid}
+
+    # Cada restricción se comprueba al fijar el último de sus parámetros en el grid
+    checks = [[] for _ in names]
+    known = set(param_grid) | set(base_params)
+    for constraint in map(parse_constraint, constraints):
+        operands = _constraint_names(constraint, known)
+        positions = [names.index(operand) for operand in operands if operand in param_grid]
+        if positions:
+            checks[max(positions)].append(constraint)
+        elif not _holds(constraint, base_params):
+            return []
+
+    combinations = []
+    current = dict(base_params)
+
+    def extend(level):
+        if level == len(names):
+            combinations.append({name: current[name] for name in names})
+            return
+        for value in values[level]:
+            current[names[level]] = value
+            if all(_holds(constraint, current) for constraint in checks[level]):
+                extend(level + 1)
+
+    extend(0)
+    return combinations
+
+
+def count_valid(param_grid, constraints=(), base_params=None, max_exact=100000, samples=10000, seed=0):
+    """
+    Número de combinaciones del grid (sin repetidos) que cumplen las restricciones
+
+    Hasta `max_exact` combinaciones se cuentan con `expand_grid`; en grids
+    mayores se estima con `samples` combinaciones aleatorias, sin generarlos.
+
+    Returns:
+        tuple: (combinaciones válidas, True si el número es exacto)
+    """
+    values = [list(dict.fromkeys(param_values)) for param_values in param_grid.values()]
+    size = 1
+    for param_values in values:
+        size *= len(param_values)
+    if size <= max_exact:
+        return len(expand_grid(param_grid, constraints, base_params)), True
+
+    valid = constraint_checker(constraints, base_params, param_grid)
+    rng = np.random.default_rng(seed)
+    draws = [rng.integers(0, len(param_values), size=samples) for param_values in values]
+    names = list(param_grid.keys())
+    hits = sum(
+        valid({name: param_values[i] for name, param_values, i in zip(names, values, indices)})
+        for indices in zip(*draws)
+    )
+    return int(round(size * hits / samples)), False
+
+
+class LevelExits:
+    """
+    Salidas por stop loss y take profit de una serie de velas para el optimizador
+
+    Los niveles de cada entrada solo dependen de `atr_period`, `stop_atr` y
+    `target_atr`, así que el ATR de cada periodo y la tabla de salidas de
+    cada trío (ver `level_exit_table`) se calculan una vez sobre toda la
+    serie, igual que en `backtest`, y se recortan al periodo de cada
+    evaluación. Los parámetros que falten toman el valor por defecto de
+    `StrategyParams`.
+    """
+
+    def __init__(self, open_, high, low, close, ambiguity='stop', costs=None):
+        if ambiguity not in AMBIGUITY_RULES:
+            raise ValueError(f"Regla de ambigüedad no válida: {ambiguity}")
+        self.open, self.high, self.low, self.close = (
+            np.ascontiguousarray(values, dtype=np.float64) for values in (open_, high, low, close)
+        )
+        self.ambiguity = ambiguity
+        self.exit_factor, self.target_factor = 1.0, 1.0
+        if costs is not None and not costs.is_free():
+            self.exit_factor = costs.fill_factors(self.high, self.low, self.close)[1]
+            self.target_factor = costs.target_factor()
+        self._atr = {}
+        self._tables = {}
+
+    @classmethod
+    def from_prices(cls, prices, ambiguity='stop', costs=None):
+        """Crea las salidas a partir de un bloque de `SharedOHLCV`"""
+        return cls(*(prices[PRICE_COLUMNS.index(column)] for column in ('open', 'high', 'low', 'close')),
+                   ambiguity, costs)
+
+    @staticmethod
+    def key(params):
+        """(atr_period, stop_atr, target_atr) de una combinación"""
+        return tuple(params.get(name, getattr(StrategyParams, name)) for name in LEVEL_PARAMS)
+
+    def levels(self, params):
+        """Stop loss y take profit de una entrada en cada vela de la serie"""
+        atr_period, stop_atr, target_atr = self.key(params)
+        if atr_period not in self._atr:
+            self._atr[atr_period] = atr(self.high, self.low, self.close, atr_period)
+        return atr_levels(self.close, self._atr[atr_period], stop_atr, target_atr)
+
+    def table(self, params):
+        """Tabla de salidas de `level_exit_table` de toda la serie"""
+        key = self.key(params)
+        if key not in self._tables:
+            self._tables[key] = level_exit_table(self.open, self.high, self.low, *self.levels(params),
+                                                 self.ambiguity, self.exit_factor, self.target_factor)
+        return self._tables[key]
+
+    def tables(self, param_sets):
+        """
+        Tablas de salidas de los niveles distintos de `param_sets`, apiladas
+
+        Returns:
+            tuple: (claves de `key`, velas de salida (claves, velas), precios (claves, velas))
+        """
+        keys = list(dict.fromkeys(self.key(params) for params in param_sets))
+        tables = [self.table(dict(zip(LEVEL_PARAMS, key))) for key in keys]
+        n = len(self.close)
+        if not tables:
+            return keys, np.zeros((0, n), dtype=np.int64), np.zeros((0, n))
+        return keys, np.vstack([bars for bars, _ in tables]), np.vstack([prices for _, prices in tables])
+
+    def add_tables(self, keys, exit_bars, exit_prices):
+        """Reutiliza tablas ya calculadas (p. ej. por otro proceso, ver `tables`)"""
+        self._tables.update(zip(keys, zip(exit_bars, exit_prices)))
+
+    def window(self, params, start=0, stop=None):
+        """Tabla de salidas recortada a [start, stop), con las velas relativas al periodo"""
+        exit_bar, exit_price = self.table(params)
+        # Las salidas posteriores a `stop` quedan fuera del periodo: no llegan a ocurrir
+        return exit_bar[start:stop] - start, exit_price[start:stop]
+
+
+def backtest_window(close, signal, params, initial_balance=1000, start=0, stop=None,
+                    fill_factors=None, level_exits=None):
+    """
+    Backtest de una señal de todo `close` sobre el periodo [start, stop)
+
+    Sin `level_exits` solo se sale con la señal de venta
+    (`run_vectorized_backtest`); con ellas, también por stop loss y take
+    profit con los niveles de `params` (`run_event_backtest`).
+
+    Returns:
+        tuple: (precios de cierre del periodo, resultado del motor)
+    """
+    prices = close[start:stop]
+    entry_factor, exit_factor = fill_window(fill_factors or (1.0, 1.0), start, stop)
+    if level_exits is None:
+        return prices, run_vectorized_backtest(prices, signal[start:stop], initial_balance,
+                                               entry_factor, exit_factor)
+    stop_loss, take_profit = level_exits.levels(params)
+    return prices, run_event_backtest(
+        level_exits.open[start:stop], level_exits.high[start:stop], level_exits.low[start:stop], prices,
+        signal[start:stop], stop_loss[start:stop], take_profit[start:stop], initial_balance,
+        level_exits.ambiguity, entry_factor, exit_factor, level_exits.target_factor
+    )
+
+
+def evaluate_parameters(close, params, initial_balance=1000, start=0, stop=None,
+                        cache=None, fingerprint=None, fill_factors=None, level_exits=None):
+    """
+    Evalúa una combinación de parámetros sin modificar ningún bot
+
+    Los indicadores se calculan sobre todo `close` (incluidas las velas de
+    calentamiento) y el backtest se ejecuta sobre `close[start:stop]`.
+
+    Args:
+        close (np.ndarray): Precios de cierre
+        params (dict): Parámetros de la estrategia
+        initial_balance (float): Balance inicial
+        start (int): Primera vela del backtest
+        stop (int): Vela final del backtest (excluida)
+        cache (IndicatorCache): Caché opcional de series ya calculadas
+        fingerprint (str): Huella de `close`
+        fill_factors (tuple): Multiplicadores de entrada y salida de todo
+            `close` (ver `CostModel.fill_factors`); por defecto, sin costes
+        level_exits (LevelExits): Salir también por stop loss / take profit,
+            como `backtest` con `intrabar_stops`; por defecto, solo con la señal
+
+    Returns:
+        dict: 'return', 'win_rate', 'trades' y 'max_drawdown'
+    """
+    strategy = {name: params[name] for name in STRATEGY_PARAMS if name in params}
+    columns = compute_indicator_columns(close, cache=cache, fingerprint=fingerprint, **strategy)
+
+    prices, engine_result = backtest_window(close, columns['signal'], params, initial_balance, start, stop,
+                                            fill_factors, level_exits)
+    metrics = compute_backtest_metrics(prices, engine_result, initial_balance)
+
+    return {
+        'return': float(metrics['total_return_pct']),
+        'win_rate': float(metrics['win_rate']),
+        'trades': int(metrics['total_trades']),
+        'max_drawdown': float(metrics['max_drawdown'])
+    }
+
+
+def trade_returns(close, params, start=0, stop=None, cache=None, fingerprint=None, fill_factors=None,
+                  level_exits=None):
+    """
+    Retorno de cada operación de una combinación de parámetros (0.05 = +5%)
+
+    Usa el mismo motor, periodo y costes que `evaluate_parameters`, p. ej. para
+    remuestrear las operaciones de las mejores combinaciones.
+
+    Returns:
+        np.ndarray: Retornos en el orden de las operaciones
+    """
+    strategy = {name: params[name] for name in STRATEGY_PARAMS if name in params}
+    columns = compute_indicator_columns(close, cache=cache, fingerprint=fingerprint, **strategy)
+    _, engine_result = backtest_window(close, columns['signal'], params, start=start, stop=stop,
+                                       fill_factors=fill_factors, level_exits=level_exits)
+    return engine_result['profit_pct'] / 100
+
+
+def batch_grid_search(close, combinations, base_params=None, initial_balance=1000, start=0,
+                      stop=None, cache=None, fingerprint=None, max_cells=2 ** 21, fill_factors=None,
+                      level_exits=None, components=None):
+    """
+    Evalúa combinaciones de parámetros por lotes con el motor matricial
+
+    Cada lote se resuelve con una matriz de señales (velas, combinaciones)
+    y un único backtest sobre todas sus columnas. El tamaño del lote se
+    ajusta para que cada matriz tenga como máximo `max_cells` celdas. Los
+    costes (`fill_factors` de todo `close`) se recortan una vez al periodo
+    y se aplican a todos los lotes. Con `level_exits` (LevelExits) también
+    se sale por stop loss / take profit: las columnas de un lote se agrupan
+    por sus niveles y cada grupo comparte la tabla de salidas. Con
+    `components` (`signal_components` de todas las combinaciones sobre todo
+    `close`) las señales se recortan de esas filas sin calcular indicadores.
+
+    Yields:
+        tuple: (índice de la combinación, parámetros, resultado), en el orden del grid
+    """
+    close = np.ascontiguousarray(close, dtype=np.float64)
+    prices = close[start:stop]
+    batch_size = combinations_per_batch(len(prices), max_cells)
+    base_params = base_params or {}
+    entry_factor, exit_factor = fill_window(fill_factors or (1.0, 1.0), start, stop)
+
+    for offset in range(0, len(combinations), batch_size):
+        batch = combinations[offset:offset + batch_size]
+        param_sets = [dict(base_params, **params) for params in batch]
+        if components is None:
+            signals = build_signal_matrix(close, param_sets, start, stop, cache, fingerprint)
+        else:
+            rows, index = components
+            signals = combine_components(rows, index[offset:offset + batch_size], start, stop)
+        if level_exits is None:
+            groups = {None: np.arange(len(batch))}
+        else:
+            keys = [LevelExits.key(params) for params in param_sets]
+            groups = {key: np.flatnonzero([other == key for other in keys]) for key in dict.fromkeys(keys)}
+
+        results = [None] * len(batch)
+        for key, columns in groups.items():
+            window = None if key is None else level_exits.window(param_sets[columns[0]], start, stop)
+            group_signals = signals if len(columns) == len(batch) else signals[:, columns]
+            metrics = run_batch_backtest(prices, group_signals, initial_balance, entry_factor, exit_factor,
+                                         window)
+            for position, column in enumerate(columns):
+                results[column] = {
+                    'return': float(metrics['total_return_pct'][position]),
+                    'win_rate': float(metrics['win_rate'][position]),
+                    'trades': int(metrics['total_trades'][position]),
+                    'max_drawdown': float(metrics['max_drawdown'][position])
+                }
+        for column, params in enumerate(batch):
+            yield offset + column, params, results[column]
+
+
+class SharedArray:
+    """
+    Array copiado una vez a memoria compartida
+
+    Los procesos del optimizador lo leen sin copiarlo con `attach_array`.
+    El bloque se libera al cerrar el objeto (o al salir del bloque `with`).
+    """
+
+    def __init__(self, values):
+        values = np.ascontiguousarray(values)
+        self.shape = values.shape
+        self.dtype = values.dtype.str
+        self._shm = shared_memory.SharedMemory(create=True, size=max(values.nbytes, 1))
+        np.ndarray(self.shape, dtype=values.dtype, buffer=self._shm.buf)[:] = values
+        self.name = self._shm.name
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    def close(self):
+        """Libera la memoria compartida"""
+        if self._shm is not None:
+            self._shm.close()
+            self._shm.unlink()
+            self._shm = None
+
+
+class SharedOHLCV(SharedArray):
+    """
+    Columnas OHLCV de un DataFrame copiadas a memoria compartida
+
+    Los datos se copian una sola vez en un bloque (columnas, velas) de
+    float64 que los procesos del optimizador leen sin copiarlo.
+    """
+
+    def __init__(self, df):
+        super().__init__(np.vstack([df[column].to_numpy(dtype=np.float64) for column in PRICE_COLUMNS]))
+
+
+def attach_array(name, shape, dtype=np.float64):
+    """Devuelve (memoria compartida, array) de un bloque creado por `SharedArray`"""
+    shm = shared_memory.SharedMemory(name=name)
+    return shm, np.ndarray(shape, dtype=dtype, buffer=shm.buf)
+
+
+def attach_prices(name, shape):
+    """Devuelve (memoria compartida, array de precios) de un bloque creado por `SharedOHLCV`"""
+    return attach_array(name, shape)
+
+
+# Estado de cada proceso del pool, inicializado una vez por proceso
+_worker = {}
+
+
+def price_fill_factors(prices, costs):
+    """Multiplicadores de `costs` sobre un bloque de `SharedOHLCV` (None si no hay costes)"""
+    if costs is None or costs.is_free():
+        return None
+    return costs.fill_factors(*(prices[PRICE_COLUMNS.index(column)] for column in ('high', 'low', 'close')))
+
+
+def _init_worker(shm_name, shape, base_params, initial_balance, start, stop, costs=None, ambiguity=None):
+    """Conecta el proceso a la memoria compartida y prepara su caché de indicadores y de salidas"""
+    shm, prices = attach_prices(shm_name, shape)
+    close = prices[PRICE_COLUMNS.index('close')]
+    _worker.update({
+        'shm': shm,
+        'close': close,
+        'fingerprint': data_fingerprint(close),
+        'fill_factors': price_fill_factors(prices, costs),
+        'cache': IndicatorCache(),
+        'level_exits': None if ambiguity is None else LevelExits.from_prices(prices, ambiguity, costs),
+        'base_params': base_params,
+        'initial_balance': initial_balance,
+        'start': start,
+        'stop': stop
+    })
+
+
+def _evaluate_chunk(chunk):
+    """Evalúa un lote de combinaciones (índice, parámetros) en el proceso actual"""
+    indices = [index for index, _ in chunk]
+    results = batch_grid_search(
+        _worker['close'], [params for _, params in chunk], _worker['base_params'],
+        _worker['initial_balance'], _worker['start'], _worker['stop'],
+        cache=_worker['cache'], fingerprint=_worker['fingerprint'], fill_factors=_worker['fill_factors'],
+        level_exits=_worker['level_exits']
+    )
+    return [(indices[position], params, result) for position, params, result in results]
+
+
+def parallel_grid_search(df, combinations, base_params=None, initial_balance=1000,
+                         start=0, stop=None, max_workers=None, chunk_size=None, costs=None,
+                         intrabar_stops=False, ambiguity='stop'):
+    """
+    Evalúa combinaciones de parámetros en un pool de procesos
+
+    Las velas se colocan una vez en memoria compartida y cada proceso
+    mantiene su propia caché de indicadores. Las combinaciones se reparten
+    en lotes consecutivos (que comparten medias y RSI), cada proceso los
+    evalúa con `batch_grid_search` y los resultados se devuelven a medida
+    que terminan, no en el orden del grid.
+
+    Args:
+        df (pd.DataFrame): Velas OHLCV, incluidas las de calentamiento
+        combinations (list): Diccionarios de parámetros a evaluar
+        base_params (dict): Parámetros fijos de la estrategia
+        initial_balance (float): Balance inicial
+        start (int): Primera vela del backtest
+        stop (int): Vela final del backtest (excluida)
+        max_workers (int): Procesos del pool (por defecto, núcleos disponibles)
+        chunk_size (int): Combinaciones por tarea
+        costs (CostModel): Costes de ejecución; cada proceso calcula sus
+            multiplicadores a partir de las velas compartidas
+        intrabar_stops (bool): Salir también por stop loss / take profit
+            (cada proceso calcula sus tablas de salidas, ver `LevelExits`)
+        ambiguity (str): Si una vela toca ambos niveles: 'stop', 'target' o 'nearest'
+
+    Yields:
+        tuple: (índice de la combinación, parámetros, resultado)
+    """
+    if not combinations:
+        return
+
+    max_workers = max_workers or os.cpu_count() or 1
+    if chunk_size is None:
+        # Varios lotes por proceso para repartir bien la carga y notificar el progreso
+        chunk_size = max(1, -(-len(combinations) // (max_workers * 4)))
+
+    indexed = list(enumerate(combinations))
+    chunks = [indexed[i:i + chunk_size] for i in range(0, len(indexed), chunk_size)]
+
+    with SharedOHLCV(df) as shared:
+        # 'spawn' evita copiar con fork un proceso con hilos (Qt, ccxt) en marcha
+        executor = ProcessPoolExecutor(
+            max_workers=min(max_workers, len(chunks)),
+            mp_context=get_context('spawn'),
+            initializer=_init_worker,
+            initargs=(shared.name, shared.shape, dict(base_params or {}), initial_balance, start, stop, costs,
+                      ambiguity if intrabar_stops else None)
+        )
+        try:
+            futures = [executor.submit(_evaluate_chunk, chunk) for chunk in chunks]
+            for future in as_completed(futures):
+                for item in future.result():
+                    yield item
+        finally:
+            executor.shutdown(wait=True, cancel_futures=True)
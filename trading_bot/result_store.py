@@ -0,0 +1,254 @@
+import os
+import json
+import time
+import pickle
+import hashlib
+import sqlite3
+
+METRIC_COLUMNS = ('return', 'win_rate', 'trades', 'max_drawdown')
+
+
+def params_key(params):
+    """Clave estable de un conjunto de parámetros"""
+    return json.dumps(params, sort_keys=True)
+
+
+class OptimizationStore:
+    """
+    Resultados de optimización guardados en SQLite a medida que se evalúan
+
+    Cada ejecución se identifica por una clave derivada de los datos y del
+    periodo del backtest (ver `run_key`) y cada resultado por el conjunto
+    completo de parámetros de la estrategia, así que una optimización
+    interrumpida, o una nueva con un grid que se solapa con otra anterior
+    sobre los mismos datos, no vuelve a evaluar los puntos ya guardados.
+    """
+
+    def __init__(self, path=os.path.join('data', 'optimizations.sqlite'), timeout=30.0):
+        self.path = path
+        self.timeout = timeout
+        self._initialized = False
+
+    def _connect(self):
+        directory = os.path.dirname(self.path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        conn = sqlite3.connect(self.path, timeout=self.timeout)
+        if not self._initialized:
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS runs ("
+                "run TEXT PRIMARY KEY, description TEXT, created REAL)"
+            )
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS results ("
+                "run TEXT NOT NULL, params TEXT NOT NULL, return REAL, win_rate REAL, "
+                "trades INTEGER, max_drawdown REAL, PRIMARY KEY (run, params))"
+            )
+            conn.commit()
+            self._initialized = True
+        return conn
+
+    @staticmethod
+    def run_key(fingerprint, start, stop, initial_balance, costs=None, exits=None):
+        """
+        Clave de una ejecución
+
+        Args:
+            fingerprint (str): Huella de las velas (incluidas las de calentamiento)
+            start (int): Primera vela del backtest
+            stop (int): Vela final del backtest (excluida)
+            initial_balance (float): Balance inicial
+            costs (dict): Costes de ejecución (None si no hay; así las claves sin
+                costes no cambian)
+            exits (dict): Modo de salida si no es solo con la señal de venta,
+                p. ej. {'intrabar_stops': True, 'ambiguity': 'stop'}
+        """
+        values = [fingerprint, int(start), int(stop), float(initial_balance)]
+        if costs is not None:
+            values.append(costs)
+        if exits is not None:
+            values.append({'exits': exits})
+        payload = json.dumps(values, sort_keys=True)
+        return hashlib.blake2b(payload.encode(), digest_size=16).hexdigest()
+
+    def register(self, run, description):
+        """Guarda una descripción legible de la ejecución"""
+        conn = self._connect()
+        try:
+            with conn:
+                conn.execute("INSERT OR IGNORE INTO runs VALUES (?, ?, ?)", (run, description, time.time()))
+        finally:
+            conn.close()
+
+    def load(self, run):
+        """
+        Resultados ya guardados de una ejecución
+
+        Returns:
+            dict: {clave de los parámetros: métricas}
+        """
+        conn = self._connect()
+        try:
+            rows = conn.execute(
+                "SELECT params, return, win_rate, trades, max_drawdown FROM results WHERE run = ?", (run,)
+            ).fetchall()
+        finally:
+            conn.close()
+        return {row[0]: dict(zip(METRIC_COLUMNS, row[1:])) for row in rows}
+
+    def append(self, run, items):
+        """Guarda una lista de (clave de los parámetros, métricas) en una transacción"""
+        if not items:
+            return
+        conn = self._connect()
+        try:
+            with conn:
+                conn.executemany(
+                    "INSERT OR REPLACE INTO results VALUES (?, ?, ?, ?, ?, ?)",
+                    [(run, key) + tuple(metrics[column] for column in METRIC_COLUMNS) for key, metrics in items]
+                )
+        finally:
+            conn.close()
+
+    def writer(self, run, flush_interval=1.0, max_pending=1000):
+        """Escritor que agrupa los resultados y los guarda cada `flush_interval` segundos"""
+        return CheckpointWriter(self, run, flush_interval, max_pending)
+
+    def clear(self, run=None):
+        """Borra los resultados de una ejecución (o todos)"""
+        conn = self._connect()
+        try:
+            with conn:
+                if run is None:
+                    conn.execute("DELETE FROM results")
+                    conn.execute("DELETE FROM runs")
+                else:
+                    conn.execute("DELETE FROM results WHERE run = ?", (run,))
+                    conn.execute("DELETE FROM runs WHERE run = ?", (run,))
+        finally:
+            conn.close()
+
+
+class CheckpointWriter:
+    """
+    Acumula resultados y los escribe por lotes
+
+    Escribir cada resultado en su propia transacción costaría más que
+    evaluarlo con el motor matricial; como mucho se pierden los resultados
+    del último `flush_interval` si el proceso muere. Al salir del bloque
+    `with` (también por una excepción) se guarda lo pendiente.
+    """
+
+    def __init__(self, store, run, flush_interval=1.0, max_pending=1000):
+        self.store = store
+        self.run = run
+        self.flush_interval = flush_interval
+        self.max_pending = max_pending
+        self._pending = []
+        self._last_flush = time.monotonic()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.flush()
+
+    def add(self, key, metrics):
+        self._pending.append((key, metrics))
+        if len(self._pending) >= self.max_pending or time.monotonic() - self._last_flush >= self.flush_interval:
+            self.flush()
+
+    def flush(self):
+        self.store.append(self.run, self._pending)
+        self._pending = []
+        self._last_flush = time.monotonic()
+
+
+class BacktestCache:
+    """
+    Caché en disco de resultados de backtest, direccionada por contenido
+
+    La clave es un hash de la configuración, el periodo, el balance y la
+    huella de las velas (ver `key`), así que repetir un backtest ya hecho
+    devuelve el resultado guardado y, al sincronizar velas nuevas, la clave
+    cambia y el resultado antiguo deja de usarse. Los resultados (métricas,
+    operaciones y curvas, no las velas) se guardan serializados en SQLite;
+    si el total supera `max_bytes` se eliminan los usados hace más tiempo.
+    """
+
+    def __init__(self, path=os.path.join('data', 'backtest_cache.sqlite'), max_bytes=512 * 1024 * 1024,
+                 timeout=30.0):
+        self.path = path
+        self.max_bytes = max_bytes
+        self.timeout = timeout
+        self._initialized = False
+
+    def _connect(self):
+        directory = os.path.dirname(self.path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        conn = sqlite3.connect(self.path, timeout=self.timeout)
+        if not self._initialized:
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS entries ("
+                "key TEXT PRIMARY KEY, value BLOB NOT NULL, size INTEGER NOT NULL, last_used REAL NOT NULL)"
+            )
+            conn.execute("CREATE INDEX IF NOT EXISTS entries_last_used ON entries (last_used)")
+            conn.commit()
+            self._initialized = True
+        return conn
+
+    @staticmethod
+    def key(payload):
+        """Clave de un diccionario serializable a JSON"""
+        text = json.dumps(payload, sort_keys=True, default=str)
+        return hashlib.blake2b(text.encode(), digest_size=16).hexdigest()
+
+    def get(self, key):
+        """Devuelve el valor guardado (y lo marca como usado) o None"""
+        conn = self._connect()
+        try:
+            with conn:
+                row = conn.execute("SELECT value FROM entries WHERE key = ?", (key,)).fetchone()
+                if row is None:
+                    return None
+                conn.execute("UPDATE entries SET last_used = ? WHERE key = ?", (time.time(), key))
+        finally:
+            conn.close()
+        return pickle.loads(row[0])
+
+    def put(self, key, value):
+        """Guarda un valor y elimina los menos usados si se supera el tamaño máximo"""
+        blob = pickle.dumps(value, protocol=pickle.HIGHEST_PROTOCOL)
+        if len(blob) > self.max_bytes:
+            return
+        conn = self._connect()
+        try:
+            with conn:
+                conn.execute("INSERT OR REPLACE INTO entries VALUES (?, ?, ?, ?)",
+                             (key, sqlite3.Binary(blob), len(blob), time.time()))
+                self._evict(conn)
+        finally:
+            conn.close()
+
+    def _evict(self, conn):
+        total = conn.execute("SELECT COALESCE(SUM(size), 0) FROM entries").fetchone()[0]
+        if total <= self.max_bytes:
+            return
+        expired = []
+        for key, size in conn.execute("SELECT key, size FROM entries ORDER BY last_used"):
+            if total <= self.max_bytes:
+                break
+            expired.append((key,))
+            total -= size
+        conn.executemany("DELETE FROM entries WHERE key = ?", expired)
+
+    def clear(self):
+        conn = self._connect()
+        try:
+            with conn:
+                conn.execute("DELETE FROM entries")
+        finally:
+            conn.close()
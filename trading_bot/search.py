@@ -0,0 +1,242 @@
+import math
+import time
+import numpy as np
+
+SEARCH_METHODS = ('grid', 'random', 'halving', 'tpe')
+
+# Evaluaciones por defecto de los modos con presupuesto si no se indica ninguno
+DEFAULT_MAX_EVALS = 256
+
+
+def grid_size(param_grid):
+    """Número de combinaciones del grid (sin valores repetidos), sin generarlas"""
+    return math.prod(len(dict.fromkeys(values)) for values in param_grid.values())
+
+
+def score(result):
+    """Valor a maximizar: el retorno, solo si la combinación operó"""
+    return result['return'] if result['trades'] > 0 else -float('inf')
+
+
+class SearchBudget:
+    """
+    Presupuesto de una búsqueda: evaluaciones y/o segundos
+
+    Las evaluaciones se cuentan en backtests completos equivalentes: un
+    backtest sobre un tercio del periodo gasta 1/3. Sin `max_evals` el
+    límite es el tamaño del grid (o `DEFAULT_MAX_EVALS` si tampoco hay
+    límite de tiempo).
+    """
+
+    def __init__(self, param_grid, max_evals=None, time_budget=None):
+        size = grid_size(param_grid)
+        if max_evals is None:
+            max_evals = size if time_budget is not None else min(size, DEFAULT_MAX_EVALS)
+        self.max_evals = max(1, min(max_evals, size))
+        self.time_budget = time_budget
+        self.spent = 0.0
+        self.started = time.monotonic()
+
+    def spend(self, evaluations):
+        self.spent += evaluations
+
+    def remaining(self):
+        """Evaluaciones completas que quedan (0 si se acabó el tiempo)"""
+        if self.time_budget is not None and time.monotonic() - self.started >= self.time_budget:
+            return 0
+        return max(0, int(round(self.max_evals - self.spent)))
+
+    def exhausted(self):
+        return self.remaining() == 0
+
+
+class GridSampler:
+    """
+    Muestrea combinaciones del grid sin generarlo entero
+
+    Cada combinación se identifica por su posición en el orden de
+    `expand_grid` (el primer parámetro cambia más despacio) y se representa
+    como una tupla de índices en la lista de valores de cada parámetro.
+    Los valores repetidos se eliminan y las combinaciones que no cumplen
+    `valid` se descartan al muestrearlas, sin evaluarlas.
+    """
+
+    def __init__(self, param_grid, rng, valid=None):
+        self.names = list(param_grid.keys())
+        self.values = [list(dict.fromkeys(values)) for values in param_grid.values()]
+        self.sizes = tuple(len(values) for values in self.values)
+        self.size = grid_size(param_grid)
+        self.rng = rng
+        self.valid = valid
+        self.seen = set()
+
+    def params(self, indices):
+        """Diccionario {parámetro: valor} de una tupla de índices"""
+        return {name: values[i] for name, values, i in zip(self.names, self.values, indices)}
+
+    def exhausted(self):
+        return len(self.seen) >= self.size
+
+    def mark(self, candidates):
+        self.seen.update(candidates)
+
+    def sample(self, count):
+        """Hasta `count` combinaciones aleatorias distintas, válidas y no evaluadas"""
+        chosen = {}
+        while len(chosen) < count and len(self.seen) + len(chosen) < self.size:
+            flat = self.rng.integers(0, self.size, size=2 * (count - len(chosen)))
+            for indices in zip(*np.unravel_index(flat, self.sizes)):
+                indices = tuple(int(i) for i in indices)
+                if indices in self.seen or indices in chosen:
+                    continue
+                if self.valid is not None and not self.valid(self.params(indices)):
+                    self.seen.add(indices)
+                    continue
+                chosen[indices] = None
+                if len(chosen) == count:
+                    break
+        return list(chosen)
+
+
+def random_search(evaluate, param_grid, budget, rng, valid=None, batch_size=64):
+    """
+    Búsqueda aleatoria sin repetición hasta agotar el presupuesto
+
+    Args:
+        evaluate (callable): evaluate(combinaciones) -> resultados sobre todo el periodo
+        param_grid (dict): Valores posibles de cada parámetro
+        budget (SearchBudget): Presupuesto de la búsqueda
+        rng (np.random.Generator): Generador aleatorio
+        valid (callable): Restricciones: valid(parámetros) -> bool
+        batch_size (int): Combinaciones por lote del motor matricial
+
+    Yields:
+        tuple: (parámetros, resultado) de cada combinación evaluada
+    """
+    sampler = GridSampler(param_grid, rng, valid)
+    while not budget.exhausted() and not sampler.exhausted():
+        candidates = sampler.sample(min(batch_size, budget.remaining()))
+        if not candidates:
+            break
+        sampler.mark(candidates)
+        combinations = [sampler.params(indices) for indices in candidates]
+        yield from zip(combinations, evaluate(combinations))
+
+
+def successive_halving(evaluate, param_grid, budget, rng, length, valid=None, eta=3, min_bars=500):
+    """
+    Successive halving sobre tramos crecientes del periodo
+
+    Se evalúan muchas combinaciones aleatorias en un tramo corto al
+    principio del periodo y solo la mejor 1/`eta` pasa al siguiente tramo,
+    `eta` veces más largo, hasta llegar al periodo completo. El número de
+    combinaciones iniciales se ajusta para que el coste total sea el
+    presupuesto. Si se acaba el tiempo, las supervivientes pasan
+    directamente al periodo completo.
+
+    Args:
+        evaluate (callable): evaluate(combinaciones, velas) -> resultados
+            sobre las primeras `velas` velas del periodo
+        length (int): Velas del periodo completo
+        eta (int): Factor de reducción entre tramos
+        min_bars (int): Velas mínimas del tramo más corto
+
+    Yields:
+        tuple: (parámetros, resultado) de las combinaciones evaluadas en el periodo completo
+    """
+    rungs = 0
+    while length // eta ** (rungs + 1) >= min_bars:
+        rungs += 1
+
+    sampler = GridSampler(param_grid, rng, valid)
+    # Cada tramo cuesta lo mismo: n / eta^rungs backtests completos
+    count = budget.max_evals * eta ** rungs // (rungs + 1)
+    candidates = [sampler.params(indices) for indices in sampler.sample(max(1, count))]
+    if not candidates:
+        return
+
+    for rung in range(rungs):
+        bars = length // eta ** (rungs - rung)
+        results = evaluate(candidates, bars)
+        ranking = sorted(range(len(candidates)), key=lambda i: score(results[i]), reverse=True)
+        candidates = [candidates[i] for i in ranking[:max(1, len(candidates) // eta)]]
+        if budget.exhausted():
+            break
+
+    yield from zip(candidates, evaluate(candidates, length))
+
+
+def tpe_search(evaluate, param_grid, budget, rng, valid=None, startup=None, gamma=0.25,
+               candidates=64, batch_size=8):
+    """
+    Búsqueda guiada por un modelo TPE (Tree-structured Parzen Estimator)
+
+    Tras unas combinaciones aleatorias iniciales, los resultados se separan
+    en buenos (el mejor `gamma`) y malos, y para cada parámetro se estima la
+    frecuencia de sus valores en ambos grupos (suavizada con los valores
+    vecinos). Se muestrean `candidates` combinaciones según la densidad de
+    los buenos y se evalúan las `batch_size` con mayor cociente
+    buenos/malos.
+
+    Yields:
+        tuple: (parámetros, resultado) de cada combinación evaluada
+    """
+    sampler = GridSampler(param_grid, rng, valid)
+    startup = startup or max(10, 2 * len(sampler.names))
+    history = []
+    scores = []
+
+    while not budget.exhausted() and not sampler.exhausted():
+        count = min(batch_size if history else startup, budget.remaining())
+        if len(history) < startup:
+            batch = sampler.sample(count)
+        else:
+            batch = _tpe_candidates(sampler, np.array(history), np.array(scores), gamma, candidates, count)
+        if not batch:
+            break
+        sampler.mark(batch)
+        combinations = [sampler.params(indices) for indices in batch]
+        results = evaluate(combinations)
+        for indices, params, result in zip(batch, combinations, results):
+            history.append(indices)
+            # Las combinaciones sin operaciones cuentan como las peores
+            scores.append(score(result))
+            yield params, result
+
+
+def _parzen(indices, size, prior=1.0):
+    """Frecuencia suavizada de los índices de un parámetro"""
+    density = np.bincount(indices, minlength=size) + prior
+    if size > 2:
+        density = np.convolve(density, [0.25, 0.5, 0.25], mode='same') + 0.25 * prior
+    return density / density.sum()
+
+
+def _tpe_candidates(sampler, history, scores, gamma, candidates, count):
+    """Elige `count` combinaciones no evaluadas con el mayor cociente l(x)/g(x)"""
+    n_good = max(1, int(math.ceil(gamma * len(scores))))
+    order = np.argsort(-scores, kind='stable')
+    good, bad = history[order[:n_good]], history[order[n_good:]]
+
+    draws = np.empty((candidates, len(sampler.sizes)), dtype=np.int64)
+    ratio = np.zeros(candidates)
+    for dim, size in enumerate(sampler.sizes):
+        good_density = _parzen(good[:, dim], size)
+        bad_density = _parzen(bad[:, dim], size)
+        draws[:, dim] = sampler.rng.choice(size, size=candidates, p=good_density)
+        ratio += np.log(good_density[draws[:, dim]]) - np.log(bad_density[draws[:, dim]])
+
+    chosen = []
+    for position in np.argsort(-ratio, kind='stable'):
+        indices = tuple(int(i) for i in draws[position])
+        if indices in sampler.seen or indices in chosen:
+            continue
+        if sampler.valid is not None and not sampler.valid(sampler.params(indices)):
+            sampler.seen.add(indices)
+            continue
+        chosen.append(indices)
+        if len(chosen) == count:
+            return chosen
+    # El modelo solo propone combinaciones ya evaluadas: completar al azar
+    sampler.mark(chosen)
+    return chosen + sampler.sample(count - len(chosen))
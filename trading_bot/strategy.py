@@ -0,0 +1,49 @@
+from dataclasses import dataclass, asdict, fields, replace
+
+# Parámetros que determinan las señales (los que recibe `compute_indicator_columns`)
+STRATEGY_PARAMS = ('fast_ma', 'slow_ma', 'rsi_period', 'rsi_overbought',
+                   'rsi_oversold', 'bb_period', 'bb_std', 'use_ema')
+# Parámetros que determinan los niveles de stop loss y take profit de cada entrada
+LEVEL_PARAMS = ('atr_period', 'stop_atr', 'target_atr')
+
+
+@dataclass(frozen=True)
+class StrategyParams:
+    """
+    Parámetros de la estrategia, inmutables y hashables
+
+    Cada backtest, combinación del optimizador o vela en vivo recibe su
+    propia instancia, así que varias ejecuciones pueden compartir el mismo
+    bot sin pisarse los parámetros. Para variar uno se crea una copia con
+    `replace`.
+    """
+    fast_ma: int = 20
+    slow_ma: int = 50
+    rsi_period: int = 14
+    rsi_overbought: float = 70
+    rsi_oversold: float = 30
+    bb_period: int = 20
+    bb_std: float = 2
+    use_ema: bool = True
+    atr_period: int = 14
+    stop_atr: float = 2
+    target_atr: float = 3
+
+    @classmethod
+    def from_dict(cls, values):
+        """Crea los parámetros a partir de un diccionario, ignorando las claves desconocidas"""
+        return cls(**{name: value for name, value in values.items() if name in STRATEGY_FIELDS})
+
+    def replace(self, **changes):
+        """Devuelve una copia con los parámetros indicados cambiados"""
+        return replace(self, **changes)
+
+    def to_dict(self):
+        return asdict(self)
+
+    def signal_params(self):
+        """Parámetros de las señales como argumentos de `compute_indicator_columns`"""
+        return {name: getattr(self, name) for name in STRATEGY_PARAMS}
+
+# Todos los campos de `StrategyParams`
+STRATEGY_FIELDS = tuple(field.name for field in fields(StrategyParams))
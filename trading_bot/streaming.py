@@ -0,0 +1,288 @@
+import math
+from collections import deque
+
+NAN = float('nan')
+
+
+class StreamingEWM:
+    """
+    Media exponencial incremental
+
+    Reproduce `Series.ewm(com=..., adjust=False, min_periods=...).mean()`
+    de pandas, que es lo que usa `ta` para la EMA y el RSI. pandas pasa
+    `span` y `alpha` a centro de masas antes de calcular el factor, así que
+    se recibe el centro de masas para redondear igual (ver `ewm_com`).
+    """
+    __slots__ = ('alpha', 'min_periods', 'value', 'count')
+
+    def __init__(self, com, min_periods):
+        self.alpha = 1.0 / (1.0 + com)
+        self.min_periods = min_periods
+        self.value = NAN
+        self.count = 0
+
+    def _next(self, x):
+        if self.count == 0 or self.value == x:
+            return x
+        old_wt = 1.0 - self.alpha
+        return (old_wt * self.value + self.alpha * x) / (old_wt + self.alpha)
+
+    def _output(self, value, count):
+        return value if count >= self.min_periods else NAN
+
+    def peek(self, x):
+        """Valor que tendría la media al añadir `x`, sin modificar el estado"""
+        return self._output(self._next(x), self.count + 1)
+
+    def update(self, x):
+        """Añade una observación y devuelve el nuevo valor"""
+        self.value = self._next(x)
+        self.count += 1
+        return self._output(self.value, self.count)
+
+
+def ewm_com(span=None, alpha=None):
+    """Centro de masas de `ewm(span=...)` o `ewm(alpha=...)`, calculado como pandas"""
+    if span is not None:
+        return (span - 1) / 2
+    return (1 - alpha) / alpha
+
+
+class StreamingEMA(StreamingEWM):
+    """EMA incremental equivalente a `ta.trend.EMAIndicator`"""
+    __slots__ = ()
+
+    def __init__(self, window):
+        super().__init__(ewm_com(span=window), window)
+
+
+class StreamingSMA:
+    """Media simple incremental con buffer circular y suma acumulada"""
+    __slots__ = ('window', 'buffer', 'total', 'compensation')
+
+    def __init__(self, window):
+        self.window = window
+        self.buffer = deque(maxlen=window)
+        self.total = 0.0
+        self.compensation = 0.0
+
+    def _next_total(self, x):
+        # Suma compensada (Neumaier) para evitar la deriva de la suma acumulada
+        total, compensation = self.total, self.compensation
+        values = (x, -self.buffer[0]) if len(self.buffer) == self.window else (x,)
+        for value in values:
+            t = total + value
+            if abs(total) >= abs(value):
+                compensation += (total - t) + value
+            else:
+                compensation += (value - t) + total
+            total = t
+        return total, compensation
+
+    def peek(self, x):
+        """Valor de la media al añadir `x`, sin modificar el estado"""
+        if len(self.buffer) + 1 < self.window:
+            return NAN
+        total, compensation = self._next_total(x)
+        return (total + compensation) / self.window
+
+    def update(self, x):
+        """Añade una observación y devuelve la nueva media"""
+        self.total, self.compensation = self._next_total(x)
+        self.buffer.append(x)
+        if len(self.buffer) < self.window:
+            return NAN
+        return (self.total + self.compensation) / self.window
+
+
+class StreamingRSI:
+    """RSI de Wilder incremental equivalente a `ta.momentum.RSIIndicator`"""
+    __slots__ = ('avg_gain', 'avg_loss', 'prev_close')
+
+    def __init__(self, window):
+        self.avg_gain = StreamingEWM(ewm_com(alpha=1.0 / window), window)
+        self.avg_loss = StreamingEWM(ewm_com(alpha=1.0 / window), window)
+        self.prev_close = None
+
+    def _moves(self, x):
+        if self.prev_close is None:
+            return 0.0, 0.0
+        diff = x - self.prev_close
+        return (diff if diff > 0 else 0.0), (-diff if diff < 0 else 0.0)
+
+    @staticmethod
+    def _rsi(gain, loss):
+        if loss == 0:
+            return 100.0
+        return 100 - (100 / (1 + gain / loss))
+
+    def peek(self, x):
+        """RSI al añadir el cierre `x`, sin modificar el estado"""
+        up, down = self._moves(x)
+        return self._rsi(self.avg_gain.peek(up), self.avg_loss.peek(down))
+
+    def update(self, x):
+        """Añade un cierre y devuelve el nuevo RSI"""
+        up, down = self._moves(x)
+        self.prev_close = x
+        return self._rsi(self.avg_gain.update(up), self.avg_loss.update(down))
+
+
+class StreamingBollinger:
+    """
+    Bandas de Bollinger incrementales
+
+    Mantiene la media y la suma de cuadrados de las desviaciones de la
+    ventana (Welford deslizante), estable numéricamente con precios altos.
+    """
+    __slots__ = ('window', 'num_std', 'buffer', 'mean', 'm2')
+
+    def __init__(self, window, num_std):
+        self.window = window
+        self.num_std = num_std
+        self.buffer = deque(maxlen=window)
+        self.mean = 0.0
+        self.m2 = 0.0
+
+    def _next(self, x):
+        n = len(self.buffer)
+        if n < self.window:
+            mean = self.mean + (x - self.mean) / (n + 1)
+            m2 = self.m2 + (x - self.mean) * (x - mean)
+        else:
+            old = self.buffer[0]
+            mean = self.mean + (x - old) / self.window
+            m2 = self.m2 + (x - old) * (x - mean + old - self.mean)
+        return mean, max(m2, 0.0)
+
+    def _bands(self, mean, m2, count):
+        if count < self.window:
+            return NAN, NAN, NAN
+        std = math.sqrt(m2 / self.window)
+        return mean + self.num_std * std, mean, mean - self.num_std * std
+
+    def peek(self, x):
+        """(superior, media, inferior) al añadir `x`, sin modificar el estado"""
+        mean, m2 = self._next(x)
+        return self._bands(mean, m2, len(self.buffer) + 1)
+
+    def update(self, x):
+        """Añade un cierre y devuelve (superior, media, inferior)"""
+        self.mean, self.m2 = self._next(x)
+        self.buffer.append(x)
+        return self._bands(self.mean, self.m2, len(self.buffer))
+
+
+class StreamingATR:
+    """ATR incremental: media simple del True Range, como `_calculate_atr` del bot"""
+    __slots__ = ('sma', 'prev_close')
+
+    def __init__(self, window=14):
+        self.sma = StreamingSMA(window)
+        self.prev_close = None
+
+    def _true_range(self, high, low):
+        if self.prev_close is None:
+            return high - low
+        return max(high - low, abs(high - self.prev_close), abs(low - self.prev_close))
+
+    def peek(self, high, low, close):
+        """ATR al añadir la vela, sin modificar el estado"""
+        return self.sma.peek(self._true_range(high, low))
+
+    def update(self, high, low, close):
+        """Añade una vela y devuelve el nuevo ATR"""
+        value = self.sma.update(self._true_range(high, low))
+        self.prev_close = close
+        return value
+
+
+class StreamingIndicators:
+    """
+    Estado incremental de todos los indicadores de la estrategia
+
+    Cada vela cerrada se procesa en tiempo constante con `update`, y la
+    vela en curso puede evaluarse con `peek` sin alterar el estado, de modo
+    que el coste por tick no depende del tiempo que lleve el bot en marcha.
+    """
+    __slots__ = ('ma_fast', 'ma_slow', 'rsi', 'bb', 'atr', 'rsi_overbought',
+                 'rsi_oversold', 'prev_fast', 'prev_slow', 'last_timestamp', 'last')
+
+    def __init__(self, fast_ma=20, slow_ma=50, rsi_period=14, rsi_overbought=70,
+                 rsi_oversold=30, bb_period=20, bb_std=2, use_ema=True, atr_period=14):
+        ma_class = StreamingEMA if use_ema else StreamingSMA
+        self.ma_fast = ma_class(fast_ma)
+        self.ma_slow = ma_class(slow_ma)
+        self.rsi = StreamingRSI(rsi_period)
+        self.bb = StreamingBollinger(bb_period, bb_std)
+        self.atr = StreamingATR(atr_period)
+        self.rsi_overbought = rsi_overbought
+        self.rsi_oversold = rsi_oversold
+        self.prev_fast = NAN
+        self.prev_slow = NAN
+        self.last_timestamp = None
+        self.last = None
+
+    def _snapshot(self, close, ma_fast, ma_slow, rsi, bands, atr):
+        bb_upper, bb_middle, bb_lower = bands
+
+        # Mismas reglas que add_indicators (las comparaciones con NaN son falsas)
+        if ma_fast > ma_slow and self.prev_fast <= self.prev_slow:
+            ma_crossover = 1
+        elif ma_fast < ma_slow and self.prev_fast >= self.prev_slow:
+            ma_crossover = -1
+        else:
+            ma_crossover = 0
+
+        rsi_signal = 1 if rsi < self.rsi_oversold else (-1 if rsi > self.rsi_overbought else 0)
+        bb_signal = 1 if close < bb_lower else (-1 if close > bb_upper else 0)
+
+        combined = ma_crossover + 0.5 * rsi_signal + 0.5 * bb_signal
+        signal = 1 if combined >= 1 else (-1 if combined <= -1 else 0)
+
+        return {
+            'close': close,
+            'ma_fast': ma_fast,
+            'ma_slow': ma_slow,
+            'rsi': rsi,
+            'bb_upper': bb_upper,
+            'bb_middle': bb_middle,
+            'bb_lower': bb_lower,
+            'atr': atr,
+            'ma_crossover': ma_crossover,
+            'rsi_signal': rsi_signal,
+            'bb_signal': bb_signal,
+            'signal': signal
+        }
+
+    def peek(self, high, low, close):
+        """Indicadores y señal de la vela en curso, sin modificar el estado"""
+        return self._snapshot(
+            close,
+            self.ma_fast.peek(close),
+            self.ma_slow.peek(close),
+            self.rsi.peek(close),
+            self.bb.peek(close),
+            self.atr.peek(high, low, close)
+        )
+
+    def update(self, timestamp, high, low, close):
+        """Procesa una vela cerrada y devuelve sus indicadores y señal"""
+        self.last = self._snapshot(
+            close,
+            self.ma_fast.update(close),
+            self.ma_slow.update(close),
+            self.rsi.update(close),
+            self.bb.update(close),
+            self.atr.update(high, low, close)
+        )
+        self.prev_fast = self.last['ma_fast']
+        self.prev_slow = self.last['ma_slow']
+        self.last_timestamp = timestamp
+        return self.last
+
+    def update_many(self, timestamps, highs, lows, closes):
+        """Procesa una secuencia de velas cerradas (p. ej. para inicializar el estado)"""
+        for timestamp, high, low, close in zip(timestamps, highs, lows, closes):
+            self.update(timestamp, high, low, close)
+        return self.last
@@ -5,6 +5,7 @@ from matplotlib.figure import Figure
 from matplotlib.backends.backend_qt5agg import FigureCanvasQTAgg
 from PyQt5.QtWidgets import QVBoxLayout, QWidget
 from datetime import datetime, timedelta
+from .backtest_engine import compute_drawdown
 
 def get_available_exchanges():
     """Devuelve una lista de exchanges disponibles en ccxt"""
@@ -95,8 +96,7 @@ def get_performance_metrics(equity_curve, initial_balance):
     sharpe_ratio = (daily_returns.mean() / daily_returns.std()) * np.sqrt(252) if daily_returns.std() != 0 else 0
     
     # Maximum Drawdown
-    peak = equity_curve.cummax()
-    drawdown = (equity_curve - peak) / peak * 100
+    drawdown = compute_drawdown(equity_curve.to_numpy())
     max_drawdown = drawdown.min()
     
     # Calmar Ratio
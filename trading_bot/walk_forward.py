@@ -0,0 +1,220 @@
+import os
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from contextlib import ExitStack
+from multiprocessing import get_context
+import numpy as np
+from .backtest_engine import compute_backtest_metrics, compute_drawdown
+from .batch_engine import signal_components, combine_components
+from .indicator_cache import data_fingerprint
+from .kernels import compute_indicator_columns
+from .strategy import STRATEGY_PARAMS
+from .optimizer import (PRICE_COLUMNS, SharedArray, SharedOHLCV, LevelExits, attach_array, backtest_window,
+                        batch_grid_search, price_fill_factors)
+
+
+def walk_forward_windows(start, stop, train_bars, test_bars, anchored=False):
+    """
+    Divide el periodo [start, stop) en ventanas de entrenamiento y prueba
+
+    Las ventanas de prueba son consecutivas y no se solapan (la última puede
+    ser más corta). Cada una va precedida de su ventana de entrenamiento:
+    las últimas `train_bars` velas o, con `anchored`, todas desde `start`.
+
+    Returns:
+        list: Tuplas (inicio entrenamiento, fin entrenamiento, inicio prueba, fin prueba)
+    """
+    windows = []
+    test_start = start + train_bars
+    while test_start < stop:
+        test_stop = min(test_start + test_bars, stop)
+        train_start = start if anchored else test_start - train_bars
+        windows.append((train_start, test_start, test_start, test_stop))
+        test_start = test_stop
+    return windows
+
+
+def evaluate_fold(close, window, combinations, base_params=None, initial_balance=1000,
+                  cache=None, fingerprint=None, fill_factors=None, level_exits=None, components=None):
+    """
+    Optimiza en la ventana de entrenamiento y evalúa la mejor combinación en la de prueba
+
+    Los indicadores se calculan sobre toda la serie (y se guardan en
+    `cache`), así que las ventanas que se solapan no los recalculan; con
+    `components` (`signal_components` de `combinations` sobre toda la
+    serie) ni siquiera se calculan: las señales se recortan de esas filas.
+    Los costes (`fill_factors` de toda la serie) y las salidas por stop
+    loss / take profit (`level_exits`, LevelExits) se aplican en ambas
+    ventanas.
+
+    Returns:
+        dict: 'params', 'train' y 'test' (métricas) y 'equity' de la ventana
+              de prueba relativa a un balance de 1
+    """
+    train_start, train_stop, test_start, test_stop = window
+    base_params = base_params or {}
+
+    # Mejor combinación en el orden del grid (solo las que operaron), como en la optimización
+    best_index, best_params, best_train = None, {}, None
+    for index, params, result in batch_grid_search(close, combinations, base_params, initial_balance,
+                                                   train_start, train_stop, cache, fingerprint,
+                                                   fill_factors=fill_factors, level_exits=level_exits,
+                                                   components=components):
+        if result['trades'] > 0 and (best_train is None or result['return'] > best_train['return']):
+            best_index, best_params, best_train = index, params, result
+
+    params = dict(base_params, **best_params)
+    if components is not None and best_index is not None:
+        rows, index = components
+        signal = combine_components(rows, index[[best_index]])[:, 0]
+    else:
+        strategy = {name: params[name] for name in STRATEGY_PARAMS if name in params}
+        signal = compute_indicator_columns(close, cache=cache, fingerprint=fingerprint, **strategy)['signal']
+    prices, engine_result = backtest_window(close, signal, params, initial_balance, test_start, test_stop,
+                                            fill_factors, level_exits)
+    metrics = compute_backtest_metrics(prices, engine_result, initial_balance)
+    equity = metrics['equity'] / initial_balance if metrics['equity'] is not None else np.ones(len(prices))
+
+    return {
+        'params': best_params,
+        'train': best_train,
+        'test': {
+            'return': float(metrics['total_return_pct']),
+            'win_rate': float(metrics['win_rate']),
+            'trades': int(metrics['total_trades']),
+            'max_drawdown': float(metrics['max_drawdown'])
+        },
+        'equity': equity
+    }
+
+
+# Estado de cada proceso del pool, inicializado una vez por proceso
+_worker = {}
+
+
+def _init_worker(blocks, index, combinations, base_params, initial_balance, costs=None, ambiguity=None,
+                 level_keys=None):
+    """
+    Conecta el proceso a los bloques de memoria compartida de `walk_forward`
+
+    `blocks` tiene (nombre, forma, tipo) de las velas ('prices'), de las
+    filas de señales ('rows', con los índices `index` de cada combinación)
+    y, con `ambiguity`, de las tablas de salidas de los niveles de
+    `level_keys` ('exit_bars' y 'exit_prices').
+    """
+    handles, arrays = [], {}
+    for name, (shm_name, shape, dtype) in blocks.items():
+        shm, arrays[name] = attach_array(shm_name, shape, dtype)
+        handles.append(shm)
+
+    prices = arrays['prices']
+    level_exits = None
+    if ambiguity is not None:
+        level_exits = LevelExits.from_prices(prices, ambiguity, costs)
+        level_exits.add_tables(level_keys, arrays['exit_bars'], arrays['exit_prices'])
+
+    close = prices[PRICE_COLUMNS.index('close')]
+    _worker.update({
+        'shm': handles,
+        'close': close,
+        'fingerprint': data_fingerprint(close),
+        'fill_factors': price_fill_factors(prices, costs),
+        'components': (arrays['rows'], index),
+        'level_exits': level_exits,
+        'combinations': combinations,
+        'base_params': base_params,
+        'initial_balance': initial_balance
+    })
+
+
+def _evaluate_fold(task):
+    index, window = task
+    return index, evaluate_fold(
+        _worker['close'], window, _worker['combinations'], _worker['base_params'],
+        _worker['initial_balance'], None, _worker['fingerprint'], _worker['fill_factors'],
+        _worker['level_exits'], _worker['components']
+    )
+
+
+def walk_forward(df, windows, combinations, base_params=None, initial_balance=1000,
+                 max_workers=1, cache=None, costs=None, intrabar_stops=False, ambiguity='stop'):
+    """
+    Ejecuta las ventanas de un walk-forward, en paralelo si `max_workers` > 1
+
+    Las señales distintas de cruce, RSI y bandas de todas las combinaciones
+    (`signal_components`) y, con `intrabar_stops`, las tablas de salidas
+    por stop loss / take profit se calculan una sola vez sobre toda la
+    serie; cada ventana solo las recorta. Con un pool, las velas, las
+    señales y las tablas se colocan una vez en memoria compartida y ningún
+    proceso recalcula indicadores. Los backtests aplican los costes de
+    ejecución de `costs` (CostModel) y salen también por stop loss / take
+    profit con la regla `ambiguity`, como `backtest`, si `intrabar_stops`.
+
+    Yields:
+        tuple: (índice de la ventana, resultado de `evaluate_fold`), a medida que terminan
+    """
+    if not windows:
+        return
+
+    base_params = dict(base_params or {})
+    param_sets = [dict(base_params, **params) for params in combinations]
+    close = np.ascontiguousarray(df['close'].to_numpy(), dtype=np.float64)
+    fingerprint = data_fingerprint(close)
+    components = signal_components(close, param_sets, cache=cache, fingerprint=fingerprint)
+    level_exits = None
+    if intrabar_stops:
+        level_exits = LevelExits(df['open'].to_numpy(), df['high'].to_numpy(), df['low'].to_numpy(), close,
+                                 ambiguity, costs)
+
+    max_workers = min(max_workers or os.cpu_count() or 1, len(windows))
+    if max_workers <= 1:
+        fill_factors = None
+        if costs is not None and not costs.is_free():
+            fill_factors = costs.fill_factors(df['high'].to_numpy(), df['low'].to_numpy(), close)
+        for index, window in enumerate(windows):
+            yield index, evaluate_fold(close, window, combinations, base_params, initial_balance,
+                                       cache, fingerprint, fill_factors, level_exits, components)
+        return
+
+    with ExitStack() as stack:
+        shared = {
+            'prices': stack.enter_context(SharedOHLCV(df)),
+            'rows': stack.enter_context(SharedArray(components[0]))
+        }
+        level_keys = None
+        if level_exits is not None:
+            level_keys, exit_bars, exit_prices = level_exits.tables(param_sets)
+            shared['exit_bars'] = stack.enter_context(SharedArray(exit_bars))
+            shared['exit_prices'] = stack.enter_context(SharedArray(exit_prices))
+        blocks = {name: (block.name, block.shape, block.dtype) for name, block in shared.items()}
+
+        executor = ProcessPoolExecutor(
+            max_workers=max_workers,
+            mp_context=get_context('spawn'),
+            initializer=_init_worker,
+            initargs=(blocks, components[1], combinations, base_params, initial_balance, costs,
+                      ambiguity if intrabar_stops else None, level_keys)
+        )
+        try:
+            futures = [executor.submit(_evaluate_fold, task) for task in enumerate(windows)]
+            for future in as_completed(futures):
+                yield future.result()
+        finally:
+            executor.shutdown(wait=True, cancel_futures=True)
+
+
+def stitch_equity(fold_results, initial_balance=1000):
+    """
+    Une las curvas de equity de las ventanas de prueba en una sola
+
+    Cada ventana empieza con el balance con que terminó la anterior.
+
+    Returns:
+        tuple: (equity, drawdown) como arrays
+    """
+    pieces = []
+    balance = initial_balance
+    for result in fold_results:
+        pieces.append(result['equity'] * balance)
+        balance = pieces[-1][-1]
+    equity = np.concatenate(pieces) if pieces else np.zeros(0)
+    return equity, compute_drawdown(equity)